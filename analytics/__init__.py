@@ -1,9 +1,23 @@
 """
 analytics module initialization
+
+DataProcessor and dashboard_bp are imported on first access, so importing one
+submodule (e.g. analytics.store) or running one as a script does not pull in
+the whole package.
 """
 
-from .data_processing import DataProcessor
-from .dashboard import dashboard_bp
+import importlib
+
+_EXPORTS = {
+    'DataProcessor': '.data_processing',
+    'dashboard_bp': '.dashboard',
+}
 
 __all__ = ['DataProcessor', 'dashboard_bp']
-__version__ = '1.0.0'
\ No newline at end of file
+__version__ = '1.0.0'
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
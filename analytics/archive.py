@@ -0,0 +1,254 @@
+"""
+archive.py
+Purpose: Cold tier for old moods: per-user, per-month compressed Arrow IPC files
+Integrated with: data_processing.py (transparent reads), rollups.py (rebuilds)
+
+Moods older than a horizon are copied to
+    <db dir>/archive/user=<id>/<YYYY-MM>.<n>.arrow   (zstd-compressed Arrow IPC)
+and deleted from moods in the same transaction that points the mood_archive
+manifest at the new file. Readers only open files named in the manifest, so a
+crash before that commit leaves an ignored orphan file and the rows still hot.
+Files are memory-mapped on read. The rollups keep counting archived rows, so
+dashboard aggregations never have to open them.
+
+pyarrow is only needed, and only imported, once something has been archived.
+
+Usage:
+    python -m analytics.archive --db path/to/neurowell.db [--older-than-days 90] [--user 1]
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import store
+from .db import ConnectionPool, get_pool
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+# Bound by _require_pyarrow() on first use
+pa = pc = ipc = None
+
+COLUMNS = ["id", "ts_ms", "emotion_code", "intensity", "source"]
+BATCH_ROWS = 65536
+
+# (id, ts_ms, emotion_code, intensity, source)
+ColdRow = Tuple[int, int, int, int, str]
+
+
+def _schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("ts_ms", pa.int64()),
+        ("emotion_code", pa.int32()),
+        ("intensity", pa.int32()),
+        ("source", pa.string()),
+    ])
+
+
+def _require_pyarrow():
+    global pa, pc, ipc
+    if not HAS_PYARROW:
+        raise RuntimeError("Archived moods need pyarrow (pip install pyarrow)")
+    if ipc is None:
+        pa = importlib.import_module("pyarrow")
+        pc = importlib.import_module("pyarrow.compute")
+        ipc = importlib.import_module("pyarrow.ipc")
+
+
+def archive_root(db_path: str) -> str:
+    """Default archive directory, next to the database file"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive")
+
+
+def _month_bounds(ts_ms: int) -> Tuple[str, int, int]:
+    """('YYYY-MM', first ms of the month, first ms of the next month)"""
+    start = store.from_epoch_ms(ts_ms).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime("%Y-%m"), store.to_epoch_ms(start), store.to_epoch_ms(end)
+
+
+# -------------------- WRITE PATH --------------------
+
+def archive_moods(pool: ConnectionPool, root: str, older_than_days: int = 90, user_id: int = None,
+                  now: datetime = None) -> Dict[str, Any]:
+    """Move moods older than the horizon into month files; returns rows and files written.
+
+    Run one archive job at a time; concurrent mood writes are fine.
+    """
+    _require_pyarrow()
+    horizon_ms = store.to_epoch_ms((now or datetime.now()) - timedelta(days=older_than_days))
+    with pool.connection() as conn:
+        if user_id is not None:
+            users = [user_id]
+        else:
+            users = [row[0] for row in conn.execute("SELECT user_id FROM mood_versions ORDER BY user_id")]
+
+    moved, files = 0, 0
+    for user in users:
+        while True:
+            with pool.connection() as conn:
+                oldest = conn.execute("SELECT MIN(ts_ms) FROM moods WHERE user_id=? AND ts_ms < ?",
+                                      (user, horizon_ms)).fetchone()[0]
+            if oldest is None:
+                break
+            month, start_ms, end_ms = _month_bounds(oldest)
+            count = _archive_month(pool, root, user, month, start_ms, min(end_ms, horizon_ms))
+            if count == 0:
+                break
+            moved += count
+            files += 1
+    return {"rows": moved, "files": files, "horizon": store.from_epoch_ms(horizon_ms).isoformat()}
+
+
+def _archive_month(pool: ConnectionPool, root: str, user_id: int, month: str, start_ms: int, end_ms: int) -> int:
+    """Rewrite one month file with its hot rows in [start_ms, end_ms) added, then drop them from moods"""
+    with pool.connection() as conn:
+        previous = conn.execute("SELECT path, row_count, min_ts_ms, max_ts_ms FROM mood_archive "
+                                "WHERE user_id=? AND month=?", (user_id, month)).fetchone()
+        generation = int(previous[0].rsplit(".", 2)[1]) + 1 if previous else 1
+        relpath = os.path.join(f"user={user_id}", f"{month}.{generation}.arrow")
+        path = os.path.join(root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        reader = conn.execute("""
+        SELECT id, ts_ms, emotion_code, intensity, source FROM moods
+        WHERE user_id=? AND ts_ms >= ? AND ts_ms < ? ORDER BY ts_ms, id
+        """, (user_id, start_ms, end_ms))
+        count, max_id = 0, 0
+        min_ts, max_ts = (previous[2], previous[3]) if previous else (None, None)
+        options = ipc.IpcWriteOptions(compression="zstd")
+        with open(path, "wb") as sink:
+            with ipc.new_file(sink, _schema(), options=options) as writer:
+                if previous:
+                    for batch in _open(os.path.join(root, previous[0])).to_batches():
+                        writer.write_batch(batch)
+                while True:
+                    rows = reader.fetchmany(BATCH_ROWS)
+                    if not rows:
+                        break
+                    columns = list(zip(*rows))
+                    writer.write_batch(pa.record_batch([pa.array(c) for c in columns], schema=_schema()))
+                    count += len(rows)
+                    max_id = max(max_id, max(columns[0]))
+                    min_ts = columns[1][0] if min_ts is None else min(min_ts, columns[1][0])
+                    max_ts = columns[1][-1] if max_ts is None else max(max_ts, columns[1][-1])
+            sink.flush()
+            os.fsync(sink.fileno())
+
+    total = count + (previous[1] if previous else 0)
+    with pool.transaction() as conn:
+        current = conn.execute("SELECT path FROM mood_archive WHERE user_id=? AND month=?",
+                               (user_id, month)).fetchone()
+        if (current[0] if current else None) != (previous[0] if previous else None):
+            raise RuntimeError(f"archive of user {user_id} {month} changed underneath this job")
+        # Ids only grow, so id <= max_id is exactly the set copied above even if moods were logged meanwhile
+        deleted = conn.execute("DELETE FROM moods WHERE user_id=? AND ts_ms >= ? AND ts_ms < ? AND id <= ?",
+                               (user_id, start_ms, end_ms, max_id)).rowcount
+        if deleted != count:
+            raise RuntimeError(f"archived {count} rows of user {user_id} {month} but {deleted} matched")
+        conn.execute("""
+        INSERT OR REPLACE INTO mood_archive (user_id, month, path, row_count, min_ts_ms, max_ts_ms)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, month, relpath, total, min_ts, max_ts))
+
+    if previous:
+        try:
+            os.remove(os.path.join(root, previous[0]))
+        except OSError as e:
+            print(f"Archive cleanup error: {e}")
+    return count
+
+
+# -------------------- READ PATH --------------------
+
+def _open(path: str) -> "pa.Table":
+    """Memory-map one month file"""
+    return ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def _months(conn: sqlite3.Connection, user_id: int, since_ms: Optional[int], until_ms: Optional[int],
+            newest_first: bool = False) -> List[Tuple[str, int, int]]:
+    """(path, min_ts_ms, max_ts_ms) of the month files overlapping [since_ms, until_ms)"""
+    clause, params = "", ()
+    if since_ms is not None:
+        clause, params = clause + " AND max_ts_ms >= ?", params + (since_ms,)
+    if until_ms is not None:
+        clause, params = clause + " AND min_ts_ms < ?", params + (until_ms,)
+    order = "DESC" if newest_first else "ASC"
+    return conn.execute(f"SELECT path, min_ts_ms, max_ts_ms FROM mood_archive WHERE user_id=?{clause} "
+                        f"ORDER BY month {order}", (user_id,) + params).fetchall()
+
+
+def _window(table: "pa.Table", since_ms: Optional[int], until_ms: Optional[int]) -> "pa.Table":
+    if since_ms is not None:
+        table = table.filter(pc.greater_equal(table["ts_ms"], since_ms))
+    if until_ms is not None:
+        table = table.filter(pc.less(table["ts_ms"], until_ms))
+    return table
+
+
+def read_archived(conn: sqlite3.Connection, root: str, user_id: int, since_ms: Optional[int] = None,
+                  until_ms: Optional[int] = None) -> Optional["pa.Table"]:
+    """Archived moods of a user in [since_ms, until_ms), or None if nothing archived overlaps"""
+    months = _months(conn, user_id, since_ms, until_ms)
+    if not months:
+        return None
+    _require_pyarrow()
+    tables = [_window(_open(os.path.join(root, path)), since_ms, until_ms) for path, _, _ in months]
+    return pa.concat_tables(tables)
+
+
+def archived_page(conn: sqlite3.Connection, root: str, user_id: int, since_ms: Optional[int],
+                  until_ms: Optional[int], before: Optional[Tuple[int, int]], limit: int) -> List[ColdRow]:
+    """Up to limit archived rows older than the (ts_ms, id) keyset position, newest first"""
+    if before is not None:
+        until_ms = before[0] + 1 if until_ms is None else min(until_ms, before[0] + 1)
+    rows = []
+    for path, _, _ in _months(conn, user_id, since_ms, until_ms, newest_first=True):
+        _require_pyarrow()
+        table = _window(_open(os.path.join(root, path)), since_ms, until_ms)
+        month = sorted(zip(*(table[c].to_pylist() for c in COLUMNS)), key=lambda r: (r[1], r[0]), reverse=True)
+        if before is not None:
+            month = [r for r in month if (r[1], r[0]) < before]
+        rows += month
+        # Months do not overlap in time, so older files cannot beat a full page from newer ones
+        if len(rows) >= limit:
+            break
+    return rows[:limit]
+
+
+def iter_archived_rows(conn: sqlite3.Connection, root: str, user_id: int = None) -> Iterator[List[tuple]]:
+    """Archived moods as rollups.MoodRow chunks (mood_id, user_id, ts_ms, emotion_code, intensity)"""
+    where, params = ("WHERE user_id=?", (user_id,)) if user_id is not None else ("", ())
+    for user, path in conn.execute(f"SELECT user_id, path FROM mood_archive {where} ORDER BY user_id, month",
+                                   params).fetchall():
+        _require_pyarrow()
+        for batch in _open(os.path.join(root, path)).to_batches():
+            columns = [batch.column(name).to_pylist() for name in ("id", "ts_ms", "emotion_code", "intensity")]
+            yield [(mood_id, user, ts_ms, code, intensity) for mood_id, ts_ms, code, intensity in zip(*columns)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old NeuroWell moods into per-user monthly Arrow files")
+    parser.add_argument("--db", default="neurowell.db", help="SQLite database path")
+    parser.add_argument("--dir", default=None, help="Archive directory (default: archive/ next to the database)")
+    parser.add_argument("--older-than-days", type=int, default=90, help="Archive moods older than this")
+    parser.add_argument("--user", type=int, default=None, help="Only archive this user_id")
+    args = parser.parse_args()
+
+    from .migrations import migrate
+
+    pool = get_pool(args.db, size=1)
+    with pool.connection() as conn:
+        migrate(conn)
+    result = archive_moods(pool, args.dir or archive_root(args.db), args.older_than_days, args.user)
+    pool.close()
+    print(f"Archived {result['rows']} moods older than {result['horizon']} into {result['files']} month file(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+cache.py
+Purpose: Versioned response cache for analytics queries
+Integrated with: data_processing.py, dashboard.py (/cache/stats)
+
+Entries are keyed by (user, query, params, data version). store.insert_moods
+bumps a user's data version in the same transaction as the write, so a new
+mood makes every older entry of that user unreachable: nothing stale is ever
+served and nothing has to be deleted explicitly. LRU and TTL eviction only
+bound memory.
+
+Backends implement get/set/clear; MemoryBackend is the in-process default and
+the same interface can front a shared store (e.g. Redis) later.
+"""
+
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+# Returned by CacheBackend.get when a key is absent or expired
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Storage interface used by ResponseCache"""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Cached value, or MISSING"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float):
+        """Store value for ttl seconds"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry"""
+
+    def __len__(self) -> int:
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """get_or_compute() keyed by user, query name, params and data version, with hit/miss counters"""
+
+    def __init__(self, backend: CacheBackend = None, ttl: float = 300.0):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(user_id: str, name: str, params: Dict[str, Any], version: int) -> str:
+        return f"{user_id}|{name}|{version}|{json.dumps(params, sort_keys=True, default=str)}"
+
+    def get_or_compute(self, user_id: str, name: str, params: Dict[str, Any], version: int,
+                       compute: Callable[[], Any]) -> Any:
+        """Cached result for this data version, computing and storing it on a miss.
+
+        Callers share the returned object, so treat it as read-only.
+        """
+        key = self.key(user_id, name, params, version)
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self._count(hit=True)
+            return value
+        self._count(hit=False)
+        value = compute()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self.backend),
+            "evictions": getattr(self.backend, "evictions", 0),
+        }
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
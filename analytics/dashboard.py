@@ -4,15 +4,74 @@ Author: Jayasri
 Purpose: API endpoints for Neurowell dashboard
 Integrated with: script.js frontend calls
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 from datetime import datetime
+import json
+import threading
+import time
+import zlib
+from . import events, store
 from .data_processing import DataProcessor
+from .import_moods import iter_ndjson, parse_events
 
 # Create Flask Blueprint for analytics API
 dashboard_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
-# Initialize data processor
-processor = DataProcessor()
+# Data processor, created on first use by get_processor() so importing the blueprint opens no database
+processor: DataProcessor = None
+_processor_lock = threading.Lock()
+
+
+def get_processor() -> DataProcessor:
+    """The shared DataProcessor, created on first call"""
+    global processor
+    if processor is None:
+        with _processor_lock:
+            if processor is None:
+                processor = DataProcessor()
+    return processor
+
+MAX_PAGE_SIZE = 500
+
+
+def _window() -> dict:
+    """since/until query parameters (ISO date/datetime or epoch ms; since inclusive, until exclusive)"""
+    return {"since": request.args.get("since"), "until": request.args.get("until")}
+
+# -------------------- CONDITIONAL GET --------------------
+
+# Reads whose payload depends only on the user's moods and the request URL. The report is left out: it
+# embeds the profile, whose edits do not bump the mood version, and its generation time.
+VERSIONED_ENDPOINTS = {
+    "get_dashboard", "radar_chart", "bar_chart", "pie_chart", "dashboard_bundle",
+    "progress", "stats", "list_moods",
+}
+
+
+@dashboard_bp.before_request
+def _not_modified():
+    """Answer 304 from the user's data version alone when the client's ETag is current"""
+    if request.method != "GET" or (request.endpoint or "").rpartition(".")[2] not in VERSIONED_ENDPOINTS:
+        return None
+    try:
+        version = get_processor().data_version(str(request.args.get("user_id", "1")))
+    except ValueError:
+        return None  # let the route report the bad user_id
+    g.etag = f"{version}-{zlib.crc32(request.full_path.encode()):08x}"
+    if request.if_none_match.contains(g.etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(g.etag)
+        return response
+    return None
+
+
+@dashboard_bp.after_request
+def _add_etag(response):
+    etag = g.pop("etag", None)
+    if etag and response.status_code == 200:
+        response.set_etag(etag)
+    return response
+
 
 # -------------------- DASHBOARD ENDPOINTS --------------------
 
@@ -21,11 +80,13 @@ def get_dashboard():
     """Return complete dashboard data"""
     try:
         user_id = str(request.args.get('user_id', "1"))
-        data = processor.prepare_dashboard_data(user_id)
+        data = get_processor().prepare_dashboard_data(user_id, **_window())
         return jsonify({
             "success": True,
             "dashboard": data
         })
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -35,19 +96,9 @@ def get_profile():
     """Return user profile info"""
     try:
         user_id = str(request.args.get('user_id', "1"))
-        processor.cursor.execute("SELECT full_name, email, age, phone, gender, member_since FROM users WHERE id=?",
-                                 (user_id,))
-        row = processor.cursor.fetchone()
-        if not row:
+        profile = get_processor().get_profile(user_id)
+        if not profile:
             return jsonify({"success": False, "error": "User not found"}), 404
-        profile = {
-            "full_name": row[0],
-            "email": row[1],
-            "age": row[2],
-            "phone": row[3],
-            "gender": row[4],
-            "member_since": row[5]
-        }
         return jsonify({"success": True, "profile": profile})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -55,17 +106,27 @@ def get_profile():
 
 # -------------------- CHART ENDPOINTS --------------------
 
+def _radar_chart(freq: dict) -> dict:
+    return {"labels": list(freq.keys()), "data": list(freq.values())}
+
+
+def _bar_chart(weekly: list) -> dict:
+    return {"labels": [w["week"] for w in weekly], "data": [w["avg_intensity"] for w in weekly]}
+
+
+def _pie_chart(freq: dict) -> list:
+    return [{"emotion": k, "count": v} for k, v in freq.items()]
+
+
 @dashboard_bp.route('/charts/radar', methods=['GET'])
 def radar_chart():
     """Return simple radar chart data"""
     try:
         user_id = str(request.args.get('user_id', "1"))
-        freq = processor.emotion_frequency(user_id)
-        chart_data = {
-            "labels": list(freq.keys()),
-            "data": list(freq.values())
-        }
-        return jsonify({"success": True, "chart": chart_data})
+        freq = get_processor().emotion_frequency(user_id, **_window())
+        return jsonify({"success": True, "chart": _radar_chart(freq)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -75,12 +136,10 @@ def bar_chart():
     """Return simple bar chart data"""
     try:
         user_id = str(request.args.get('user_id', "1"))
-        weekly = processor.weekly_trends(user_id)
-        chart_data = {
-            "labels": [w["week"] for w in weekly],
-            "data": [w["avg_intensity"] for w in weekly]
-        }
-        return jsonify({"success": True, "chart": chart_data})
+        weekly = get_processor().weekly_trends(user_id, **_window())
+        return jsonify({"success": True, "chart": _bar_chart(weekly)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -90,9 +149,49 @@ def pie_chart():
     """Return pie chart data"""
     try:
         user_id = str(request.args.get('user_id', "1"))
-        freq = processor.emotion_frequency(user_id)
-        chart_data = [{"emotion": k, "count": v} for k, v in freq.items()]
-        return jsonify({"success": True, "chart": chart_data})
+        freq = get_processor().emotion_frequency(user_id, **_window())
+        return jsonify({"success": True, "chart": _pie_chart(freq)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -------------------- BUNDLE --------------------
+
+BUNDLE_FIELDS = ("radar", "bar", "pie", "progress", "stats")
+
+
+@dashboard_bp.route('/bundle', methods=['GET'])
+def dashboard_bundle():
+    """Return every dashboard payload (or the ?fields= subset) from one shared computation"""
+    try:
+        user_id = str(request.args.get("user_id", "1"))
+        window = _window()
+        fields = [f.strip() for f in request.args.get("fields", ",".join(BUNDLE_FIELDS)).split(",") if f.strip()]
+        unknown = sorted(set(fields) - set(BUNDLE_FIELDS))
+        if unknown:
+            return jsonify({"success": False, "error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+        # Unaligned windows read raw rows: fetch them once for every field, from one data version
+        processor = get_processor()
+        snapshot = processor.window_snapshot(user_id, **window)
+        bundle = {}
+        if {"radar", "pie", "progress"} & set(fields):
+            freq = processor.emotion_frequency(user_id, snapshot, **window)
+            if "radar" in fields:
+                bundle["radar"] = _radar_chart(freq)
+            if "pie" in fields:
+                bundle["pie"] = _pie_chart(freq)
+            if "progress" in fields:
+                bundle["progress"] = DataProcessor.progress_from_frequency(freq)
+        if "bar" in fields:
+            bundle["bar"] = _bar_chart(processor.weekly_trends(user_id, snapshot, **window))
+        if "stats" in fields:
+            bundle["stats"] = processor.get_statistics(user_id, snapshot, **window)
+        return jsonify({"success": True, "bundle": bundle})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -108,8 +207,31 @@ def log_mood():
         emotion = data.get("emotion", "neutral")
         intensity = int(data.get("intensity", 5))
         source = data.get("source", "chat")
-        processor.insert_mood(user_id, emotion, intensity, source=source)
+        get_processor().insert_mood(user_id, emotion, intensity, source=source)
         return jsonify({"success": True, "message": "Mood logged"})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@dashboard_bp.route('/log_mood/bulk', methods=['POST'])
+def log_mood_bulk():
+    """Log many mood entries (JSON array or NDJSON body) in one transaction"""
+    try:
+        if request.is_json:
+            payload = request.get_json(silent=True)
+            if payload is None:
+                return jsonify({"success": False, "error": "Request body is not valid JSON"}), 400
+            moods = payload.get("moods", []) if isinstance(payload, dict) else payload
+            if not isinstance(moods, list):
+                return jsonify({"success": False, "error": "Expected a JSON array of moods"}), 400
+            numbered = enumerate(moods)
+        else:
+            numbered = iter_ndjson(request.get_data(as_text=True).splitlines())
+        rows, rejected = parse_events(numbered)
+        inserted = get_processor().insert_moods(rows)
+        return jsonify({"success": True, "inserted": inserted, "rejected": rejected})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -121,8 +243,11 @@ def generate_report():
     """Generate PDF mood report"""
     try:
         user_id = str(request.args.get("user_id", "1"))
-        html_content = processor.generate_pdf_report(user_id)
+        snapshot = get_processor().load_snapshot(user_id, **_window())
+        html_content = get_processor().generate_pdf_report(user_id, snapshot=snapshot)
         return jsonify({"success": True, "html": html_content})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -134,8 +259,10 @@ def progress():
     """Return progress bar data"""
     try:
         user_id = str(request.args.get("user_id", "1"))
-        data = processor.get_progress_data(user_id)
+        data = get_processor().get_progress_data(user_id, **_window())
         return jsonify({"success": True, "progress": data})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -145,14 +272,73 @@ def stats():
     """Return statistics data"""
     try:
         user_id = str(request.args.get("user_id", "1"))
-        data = processor.get_statistics(user_id)
+        data = get_processor().get_statistics(user_id, **_window())
         return jsonify({"success": True, "stats": data})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@dashboard_bp.route('/moods', methods=['GET'])
+def list_moods():
+    """Return one page of mood history, newest first (limit/cursor pagination)"""
+    try:
+        user_id = str(request.args.get("user_id", "1"))
+        limit = min(max(int(request.args.get("limit", 50)), 1), MAX_PAGE_SIZE)
+        page = get_processor().list_moods(user_id, limit=limit, cursor=request.args.get("cursor"), **_window())
+        return jsonify({"success": True, **page})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# -------------------- LIVE STREAM --------------------
+
+STREAM_HEARTBEAT = 15.0  # seconds between keep-alive comments on an idle stream
+STREAM_POLL = 2.0        # upper bound on the delay for moods written by another process
+
+
+@dashboard_bp.route('/stream', methods=['GET'])
+def stream():
+    """Server-sent events: one "moods" event per committed batch for the user, resumable via Last-Event-ID"""
+    try:
+        user_id = str(request.args.get("user_id", "1"))
+        key = store.user_key(user_id)
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        after_id = int(last_event_id) if last_event_id else get_processor().latest_mood_id(user_id)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    def generate():
+        last_id, last_sent = after_id, time.monotonic()
+        yield "retry: 3000\n\n"
+        while True:
+            seen = events.bus.counter(key)
+            changes = get_processor().mood_changes(user_id, last_id)
+            if changes:
+                changes["progress"] = DataProcessor.progress_from_frequency(changes["frequency"])
+                last_id, last_sent = changes["last_id"], time.monotonic()
+                yield f"id: {last_id}\nevent: moods\ndata: {json.dumps(changes, default=str)}\n\n"
+                continue
+            if time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"
+            events.bus.wait(key, seen, min(STREAM_POLL, STREAM_HEARTBEAT))
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # -------------------- HEALTH CHECK --------------------
 
+@dashboard_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache hit/miss counters"""
+    return jsonify({"success": True, "cache": get_processor().cache.stats()})
+
+
 @dashboard_bp.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -165,4 +351,4 @@ def health():
 
 # -------------------- CLOSE CONNECTION ON EXIT --------------------
 import atexit
-atexit.register(lambda: processor.close())
\ No newline at end of file
+atexit.register(lambda: processor is not None and processor.close())
\ No newline at end of file
@@ -5,154 +5,351 @@ Purpose: Process and analyze emotional data for NeuroWell dashboard
 Integrated with: index.html, dashboard.html, create_profile.html, script.js
 """
 
-import json
-import sqlite3
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
-import statistics
-from fpdf import FPDF  # pip install fpdf2
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+from functools import cached_property, wraps
 
 import os
 import tempfile
 
+from . import archive, db, events, migrations, numpy_engine, rollups, store
+from .cache import ResponseCache
+from .numpy_engine import MoodArrays
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ENGINES = ("pandas", "numpy")
+
+
+def _mood_frame(arrays: MoodArrays) -> "pd.DataFrame":
+    """The emotion/intensity/timestamp/source DataFrame the pandas aggregations work on"""
+    # Imported here so processes that never build a frame don't pay for pandas at startup
+    import pandas as pd
+
+    columns = ["emotion", "intensity", "timestamp", "source"]
+    if not len(arrays):
+        return pd.DataFrame([], columns=columns)
+    df = pd.DataFrame({
+        "emotion": arrays.emotions(),
+        "intensity": arrays.intensity,
+        "timestamp": arrays.ts_ms,
+        "source": arrays.sources,
+    }, columns=columns)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+
+class UserSnapshot:
+    """Mood history of one user, loaded and parsed once and shared by every aggregation of a request"""
+
+    def __init__(self, user_id: str, arrays: MoodArrays, since: int = None, until: int = None):
+        self.user_id = user_id
+        self.arrays = arrays
+        self.since = since
+        self.until = until
+
+    @cached_property
+    def df(self) -> "pd.DataFrame":
+        """Built on first use; the numpy engine never needs it"""
+        return _mood_frame(self.arrays)
+
+    @property
+    def empty(self) -> bool:
+        return not len(self.arrays)
+
+    @cached_property
+    def emotion_counts(self) -> "pd.Series":
+        """Emotion value counts, most frequent first"""
+        return self.df['emotion'].value_counts()
+
+
+def _cached_query(method):
+    """Serve a user-level aggregation from DataProcessor.cache unless a snapshot is supplied"""
+    @wraps(method)
+    def wrapper(self, user_id: str, snapshot: UserSnapshot = None, since=None, until=None):
+        if snapshot is not None or self.cache is None:
+            return method(self, user_id, snapshot, since, until)
+        params = dict(zip(("since", "until"), store.time_window(since, until)))
+        key = store.user_key(user_id)
+        return self.cache.get_or_compute(key, method.__name__, params, self.data_version(user_id),
+                                         lambda: method(self, user_id, None, since, until))
+    return wrapper
+
+
 class DataProcessor:
     """Process emotional data for NeuroWell dashboard"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, cache: ResponseCache = None, engine: str = "pandas"):
         if db_path is None:
             db_path = os.path.join(os.path.expanduser("~"), "AppData", "Local", "neurowell", "neurowell.db")
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.pool = db.get_pool(self.db_path)
+        self.archive_dir = archive.archive_root(self.db_path)
+        self.cache = cache if cache is not None else ResponseCache()
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+        self.engine = engine
         self.create_tables()
         self.insert_sample_user()
 
     def create_tables(self):
-        """Create the necessary tables if they don't exist"""
-        # Moods table
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS moods (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            emotion TEXT,
-            intensity INTEGER,
-            timestamp TEXT
-        )
-        """)
-        
-        # Adding 'source' column dynamically to avoid breaking existing DBs
-        try:
-            self.cursor.execute("ALTER TABLE moods ADD COLUMN source TEXT DEFAULT 'chat'")
-            self.conn.commit()
-        except sqlite3.OperationalError:
-            pass
-
-        # Users table
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            full_name TEXT NOT NULL,
-            email TEXT NOT NULL,
-            age INTEGER,
-            phone TEXT,
-            gender TEXT,
-            member_since TEXT
-        )
-        """)
-        
-        # Reports table
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS reports (
-            report_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            report_type TEXT,
-            generated_at TEXT,
-            summary TEXT,
-            insights TEXT,
-            recommendations TEXT
-        )
-        """)
-        
-        self.conn.commit()
+        """Bring the schema up to date by applying any pending migrations"""
+        with self.pool.connection() as conn:
+            migrations.migrate(conn)
 
     def insert_sample_user(self):
         """Insert a default user if none exists"""
-        self.cursor.execute("SELECT COUNT(*) FROM users")
-        if self.cursor.fetchone()[0] == 0:
-            self.cursor.execute("""
-            INSERT INTO users (full_name, email, age, phone, gender, member_since)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """, ("Jayasri", "jayasri@example.com", 21, "1234567890", "Female", datetime.now().date()))
-            self.conn.commit()
+        with self.pool.transaction() as conn:
+            if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+                conn.execute("""
+                INSERT INTO users (full_name, email, age, phone, gender, member_since)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """, ("Jayasri", "jayasri@example.com", 21, "1234567890", "Female", datetime.now().date().isoformat()))
+
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        """Return a user's profile, or None if there is no such user"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT full_name, email, age, phone, gender, member_since FROM users WHERE id=?",
+                               (user_id,)).fetchone()
+        if not row:
+            return None
+        return dict(zip(["full_name", "email", "age", "phone", "gender", "member_since"], row))
+
+    def data_version(self, user_id: str) -> int:
+        """Per-user change counter, bumped by every mood write (one primary-key lookup)"""
+        with self.pool.connection() as conn:
+            return store.data_version(conn, store.user_key(user_id))
+
+    def latest_mood_id(self, user_id: str) -> int:
+        """Id of the user's most recent mood (0 if none)"""
+        with self.pool.connection() as conn:
+            return store.latest_mood_id(conn, store.user_key(user_id))
 
     def insert_mood(self, user_id: str, emotion: str, intensity: int, timestamp: str = None, source: str = "chat"):
-        """Insert a new mood entry"""
+        """Insert a new mood entry and fold it into the rollups"""
         if timestamp is None:
             timestamp = datetime.now().isoformat()
-        self.cursor.execute("""
-        INSERT INTO moods (user_id, emotion, intensity, timestamp, source)
-        VALUES (?, ?, ?, ?, ?)
-        """, (user_id, emotion, intensity, timestamp, source))
-        self.conn.commit()
-    
-    def fetch_user_data(self, user_id: str) -> pd.DataFrame:
-        """Fetch all mood data for a user as a DataFrame — fresh connection to get latest data"""
-        conn = sqlite3.connect(self.db_path)
-        rows = conn.execute("SELECT emotion, intensity, timestamp, source FROM moods WHERE user_id=?", (user_id,)).fetchall()
-        conn.close()
-        df = pd.DataFrame(rows, columns=["emotion", "intensity", "timestamp", "source"])
-        if not df.empty:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-        return df
+        with self.pool.transaction() as conn:
+            store.insert_moods(conn.cursor(), [(user_id, emotion, intensity, timestamp, source)])
+        events.publish([store.user_key(user_id)])
+
+    def insert_moods(self, rows: List[tuple]) -> int:
+        """Insert many (user_id, emotion, intensity, timestamp, source) rows in one transaction"""
+        if rows:
+            with self.pool.transaction() as conn:
+                store.insert_moods(conn.cursor(), rows)
+            events.publish(store.user_key(row[0]) for row in rows)
+        return len(rows)
+
+    def mood_changes(self, user_id: str, after_id: int = 0, limit: int = 500) -> Dict[str, Any]:
+        """Moods logged after mood id after_id plus the frequency and daily buckets they touched, or None"""
+        key = store.user_key(user_id)
+        with self.pool.connection() as conn:
+            # id range on the primary key; "+" keeps SQLite from scanning the user's whole index range
+            rows = conn.execute("""
+            SELECT m.id, m.ts_ms, e.name, m.intensity, m.source FROM moods m
+            LEFT JOIN emotions e ON e.code = m.emotion_code
+            WHERE m.id > ? AND +m.user_id = ? ORDER BY m.id LIMIT ?
+            """, (after_id, key, limit)).fetchall()
+            if not rows:
+                return None
+            days = {ts_ms // store.MS_PER_DAY for _, ts_ms, _, _, _ in rows}
+            touched = {rollups.EPOCH_DATE + timedelta(days=day) for day in days}
+            daily = [bucket for bucket in rollups.daily_summary(conn, key, min(days), max(days) + 1)
+                     if bucket["date"] in touched]
+            frequency = rollups.emotion_counts(conn, key)
+        return {
+            "last_id": rows[-1][0],
+            "moods": [{
+                "id": mood_id,
+                "timestamp": store.from_epoch_ms(ts_ms).isoformat(),
+                "emotion": emotion,
+                "intensity": intensity,
+                "source": source
+            } for mood_id, ts_ms, emotion, intensity, source in rows],
+            "frequency": frequency,
+            "daily": daily
+        }
     
-    def daily_mood_summary(self, user_id: str) -> Dict[str, Any]:
-        """Calculate daily mood summary"""
-        df = self.fetch_user_data(user_id)
+    def fetch_user_data(self, user_id: str, since=None, until=None) -> "pd.DataFrame":
+        """Fetch a user's mood data (hot rows plus any archived months) as a DataFrame"""
+        return _mood_frame(self.fetch_user_arrays(user_id, since, until))
+
+    def fetch_user_arrays(self, user_id: str, since=None, until=None) -> MoodArrays:
+        """A user's moods in [since, until) as integer-coded column arrays, in mood-id order"""
+        since_ms, until_ms = store.time_window(since, until)
+        window, params = self._window_sql(since_ms, until_ms)
+        key = store.user_key(user_id)
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"""
+            SELECT m.id, m.ts_ms, m.emotion_code, m.intensity, m.source FROM moods m
+            WHERE m.user_id=?{window} ORDER BY m.id
+            """, (key,) + params).fetchall()
+            cold = archive.read_archived(conn, self.archive_dir, key, since_ms, until_ms)
+            names = self._emotion_names(conn)
+        arrays = MoodArrays.from_rows(rows, names)
+        if cold is not None and cold.num_rows:
+            ids, ts_ms, codes, intensity, sources = (cold[c].to_numpy(zero_copy_only=False) for c in archive.COLUMNS)
+            arrays = arrays.concat(MoodArrays(ids.astype(np.int64), ts_ms.astype(np.int64), codes.astype(np.int64),
+                                              intensity.astype(np.int64), sources, names))
+        return arrays
+
+    def list_moods(self, user_id: str, since=None, until=None, limit: int = 50,
+                   cursor: str = None) -> Dict[str, Any]:
+        """One page of mood entries, newest first; pass next_cursor back to get the following page"""
+        since_ms, until_ms = store.time_window(since, until)
+        window, params = self._window_sql(since_ms, until_ms)
+        before = store.decode_cursor(cursor) if cursor else None
+        if before:
+            window += " AND (m.ts_ms, m.id) < (?, ?)"
+            params += before
+        key = store.user_key(user_id)
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"""
+            SELECT m.id, m.ts_ms, e.name, m.intensity, m.source FROM moods m
+            LEFT JOIN emotions e ON e.code = m.emotion_code
+            WHERE m.user_id=?{window} ORDER BY m.ts_ms DESC, m.id DESC LIMIT ?
+            """, (key,) + params + (limit + 1,)).fetchall()
+            cold = archive.archived_page(conn, self.archive_dir, key, since_ms, until_ms, before, limit + 1)
+            if cold:
+                names = self._emotion_names(conn)
+                rows = sorted(rows + [(i, ts, names.get(code), intensity, source)
+                                      for i, ts, code, intensity, source in cold],
+                              key=lambda r: (r[1], r[0]), reverse=True)[:limit + 1]
+        page = rows[:limit]
+        moods = [{
+            "timestamp": store.from_epoch_ms(ts_ms).isoformat(),
+            "emotion": emotion,
+            "intensity": intensity,
+            "source": source
+        } for _, ts_ms, emotion, intensity, source in page]
+        next_cursor = store.encode_cursor(page[-1][1], page[-1][0]) if len(rows) > limit else None
+        return {"moods": moods, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _emotion_names(conn) -> Dict[int, str]:
+        return dict(conn.execute("SELECT code, name FROM emotions").fetchall())
+
+    @staticmethod
+    def _window_sql(since=None, until=None):
+        """Index-friendly ts_ms predicates for a [since, until) window"""
+        since_ms, until_ms = store.time_window(since, until)
+        clause, params = "", ()
+        if since_ms is not None:
+            clause, params = clause + " AND m.ts_ms >= ?", params + (since_ms,)
+        if until_ms is not None:
+            clause, params = clause + " AND m.ts_ms < ?", params + (until_ms,)
+        return clause, params
+
+    def load_snapshot(self, user_id: str, since=None, until=None) -> UserSnapshot:
+        """Load a user's mood history (or just a window of it) once so a whole request can reuse it"""
+        since_ms, until_ms = store.time_window(since, until)
+        return UserSnapshot(user_id, self.fetch_user_arrays(user_id, since_ms, until_ms), since_ms, until_ms)
+
+    def _snapshot(self, user_id: str, snapshot: UserSnapshot = None, since=None, until=None) -> UserSnapshot:
+        return snapshot if snapshot is not None else self.load_snapshot(user_id, since, until)
+
+    def _rollup_days(self, since=None, until=None):
+        """[first_day, end_day) for the rollups, or None if the window does not fall on day boundaries"""
+        since_ms, until_ms = store.time_window(since, until)
+        if any(ms is not None and ms % store.MS_PER_DAY for ms in (since_ms, until_ms)):
+            return None
+        return tuple(ms // store.MS_PER_DAY if ms is not None else None for ms in (since_ms, until_ms))
+
+    def window_snapshot(self, user_id: str, since=None, until=None) -> Optional[UserSnapshot]:
+        """One snapshot for several aggregations over an unaligned window; None when the rollups answer it"""
+        if self._rollup_days(since, until) is not None:
+            return None
+        return self.load_snapshot(user_id, since, until)
+
+    def _use_rollups(self, user_id: str, snapshot: UserSnapshot, since, until):
+        """Day range to read from the rollups, or the snapshot to aggregate instead"""
+        if snapshot is None:
+            days = self._rollup_days(since, until)
+            if days is not None:
+                return days, None
+            snapshot = self.load_snapshot(user_id, since, until)
+        return None, snapshot
+
+    @_cached_query
+    def daily_mood_summary(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                           until=None) -> Dict[str, Any]:
+        """Calculate daily mood summary (from the rollups unless a snapshot is given)"""
+        days, snapshot = self._use_rollups(user_id, snapshot, since, until)
+        if days is not None:
+            with self.pool.connection() as conn:
+                return rollups.daily_summary(conn, store.user_key(user_id), *days) or {}
+        if self.engine == "numpy":
+            return numpy_engine.daily_summary(snapshot.arrays) or {}
+        df = snapshot.df
         if df.empty:
             return {}
-        df['date'] = df['timestamp'].dt.date
-        daily_summary = df.groupby('date').agg({
+        daily_summary = df.groupby(df['timestamp'].dt.date.rename('date')).agg({
             'intensity': ['mean', 'max'],
             'emotion': lambda x: x.value_counts().idxmax()
         })
         daily_summary.columns = ['avg_intensity', 'max_intensity', 'dominant_emotion']
         return daily_summary.reset_index().to_dict(orient='records')
     
-    def weekly_trends(self, user_id: str) -> Dict[str, Any]:
-        """Calculate weekly trends"""
-        df = self.fetch_user_data(user_id)
+    @_cached_query
+    def weekly_trends(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                      until=None) -> Dict[str, Any]:
+        """Calculate weekly trends (from the rollups unless a snapshot is given)"""
+        days, snapshot = self._use_rollups(user_id, snapshot, since, until)
+        if days is not None:
+            with self.pool.connection() as conn:
+                return rollups.weekly_summary(conn, store.user_key(user_id), *days) or {}
+        if self.engine == "numpy":
+            return numpy_engine.weekly_summary(snapshot.arrays) or {}
+        df = snapshot.df
         if df.empty:
             return {}
-        df['week'] = df['timestamp'].dt.isocalendar().week
-        weekly_summary = df.groupby('week').agg({
+        weekly_summary = df.groupby(df['timestamp'].dt.isocalendar().week.rename('week')).agg({
             'intensity': ['mean', 'max'],
             'emotion': lambda x: x.value_counts().idxmax()
         })
         weekly_summary.columns = ['avg_intensity', 'max_intensity', 'dominant_emotion']
         return weekly_summary.reset_index().to_dict(orient='records')
     
-    def emotion_frequency(self, user_id: str) -> Dict[str, int]:
-        """Calculate frequency of each emotion"""
-        df = self.fetch_user_data(user_id)
-        if df.empty:
+    @_cached_query
+    def emotion_frequency(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                          until=None) -> Dict[str, int]:
+        """Calculate frequency of each emotion (from the rollups unless a snapshot is given)"""
+        days, snapshot = self._use_rollups(user_id, snapshot, since, until)
+        if days is not None:
+            with self.pool.connection() as conn:
+                return rollups.emotion_counts(conn, store.user_key(user_id), *days)
+        if self.engine == "numpy":
+            return numpy_engine.emotion_counts(snapshot.arrays)
+        if snapshot.empty:
             return {}
-        return df['emotion'].value_counts().to_dict()
+        return snapshot.emotion_counts.to_dict()
     
-    def prepare_dashboard_data(self, user_id: str) -> Dict[str, Any]:
+    def prepare_dashboard_data(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                               until=None) -> Dict[str, Any]:
         """Prepare all data needed for dashboard visualization"""
+        if snapshot is None:
+            snapshot = self.window_snapshot(user_id, since, until)
         return {
-            "daily_summary": self.daily_mood_summary(user_id),
-            "weekly_trends": self.weekly_trends(user_id),
-            "emotion_frequency": self.emotion_frequency(user_id)
+            "daily_summary": self.daily_mood_summary(user_id, snapshot, since, until),
+            "weekly_trends": self.weekly_trends(user_id, snapshot, since, until),
+            "emotion_frequency": self.emotion_frequency(user_id, snapshot, since, until)
         }
     
     # ------------------ NEW: PROGRESS & STATS ------------------
     
-    def get_progress_data(self, user_id: str) -> Dict[str, Any]:
+    @_cached_query
+    def get_progress_data(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                          until=None) -> Dict[str, Any]:
         """Return progress bar data based on emotion frequency"""
-        freq = self.emotion_frequency(user_id)
+        return self.progress_from_frequency(self.emotion_frequency(user_id, snapshot, since, until))
+
+    @staticmethod
+    def progress_from_frequency(freq: Dict[str, int]) -> Dict[str, Any]:
+        """Progress bar entries for already computed emotion counts"""
         progress = {}
         for emotion, count in freq.items():
             progress[emotion] = {
@@ -162,9 +359,26 @@ class DataProcessor:
             }
         return progress
 
-    def get_statistics(self, user_id: str) -> Dict[str, Any]:
-        """Return user statistics"""
-        df = self.fetch_user_data(user_id)
+    @_cached_query
+    def get_statistics(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                       until=None) -> Dict[str, Any]:
+        """Return user statistics (from the rollups unless a snapshot is given)"""
+        days, snapshot = self._use_rollups(user_id, snapshot, since, until)
+        if days is not None:
+            with self.pool.connection() as conn:
+                count, total = rollups.totals(conn, store.user_key(user_id), *days)
+                if count == 0:
+                    return {}
+                freq = rollups.emotion_counts(conn, store.user_key(user_id), *days)
+            top = max(freq.values())
+            return {
+                "total_entries": count,
+                "dominant_emotion": min(e for e, c in freq.items() if c == top),
+                "average_intensity": total / count
+            }
+        if self.engine == "numpy":
+            return numpy_engine.statistics(snapshot.arrays)
+        df = snapshot.df
         if df.empty:
             return {}
         stats = {
@@ -174,13 +388,14 @@ class DataProcessor:
         }
         return stats
 
-    def generate_insights(self, user_id: str) -> List[str]:
+    def generate_insights(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                          until=None) -> List[str]:
         """Generate simple insights based on mood data"""
-        df = self.fetch_user_data(user_id)
+        snapshot = self._snapshot(user_id, snapshot, since, until)
         insights = []
-        if df.empty:
+        if snapshot.empty:
             return ["No mood data available."]
-        freq = df['emotion'].value_counts()
+        freq = snapshot.emotion_counts
         dominant = freq.idxmax()
         insights.append(f"Your most frequent emotion is {dominant}.")
         if 'anxious' in freq and freq['anxious'] > 3:
@@ -189,9 +404,10 @@ class DataProcessor:
             insights.append("Great! You have been mostly happy this week.")
         return insights
 
-    def generate_recommendations(self, user_id: str) -> List[str]:
+    def generate_recommendations(self, user_id: str, snapshot: UserSnapshot = None, since=None,
+                                 until=None) -> List[str]:
         """Generate simple recommendations"""
-        df = self.fetch_user_data(user_id)
+        df = self._snapshot(user_id, snapshot, since, until).df
         recs = []
         if df.empty:
             return ["Start logging your moods for better insights."]
@@ -201,20 +417,21 @@ class DataProcessor:
             recs.append("Engage in enjoyable activities to improve your mood.")
         return recs
     
-    def generate_pdf_report(self, user_id: str, filename: str = None):
+    def generate_pdf_report(self, user_id: str, filename: str = None, snapshot: UserSnapshot = None,
+                            since=None, until=None):
         """Generate doctor-style PDF report with insights & recommendations as HTML"""
-        data = self.prepare_dashboard_data(user_id)
-        insights = self.generate_insights(user_id)
-        recs = self.generate_recommendations(user_id)
-        df = self.fetch_user_data(user_id)
+        snapshot = self._snapshot(user_id, snapshot, since, until)
+        data = self.prepare_dashboard_data(user_id, snapshot)
+        insights = self.generate_insights(user_id, snapshot)
+        recs = self.generate_recommendations(user_id, snapshot)
+        df = snapshot.df
 
         if filename is None:
             filename = os.path.join(tempfile.gettempdir(), f"{user_id}_mood_report.html")
 
         # Fetch Patient Details
-        self.cursor.execute("SELECT full_name FROM users WHERE id=?", (user_id,))
-        row = self.cursor.fetchone()
-        patient_name = row[0] if row else "Unknown Patient"
+        profile = self.get_profile(user_id)
+        patient_name = profile["full_name"] if profile else "Unknown Patient"
         medical_id = f"NW-{user_id.zfill(6)}"
         
         if not df.empty:
@@ -266,7 +483,7 @@ class DataProcessor:
             wellness_rating = "Moderate"
 
         # Generate Table Rows for Distribution
-        freq = self.emotion_frequency(user_id)
+        freq = self.emotion_frequency(user_id, snapshot)
         all_emotions = ["angry", "calm", "disgust", "fear", "happy", "neutral", "sad", "surprise"]
         dist_rows = ""
         for e in all_emotions:
@@ -409,5 +626,5 @@ class DataProcessor:
         return html_content
     
     def close(self):
-        """Close database connection"""
-        self.conn.close()
\ No newline at end of file
+        """Close pooled database connections"""
+        self.pool.close()
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+events.py
+Purpose: In-process notification that a user's moods changed
+Integrated with: data_processing.py, ingest.py (publishers), dashboard.py (/stream)
+
+Writers publish the user ids of a batch after it commits; stream handlers block
+in wait() instead of polling the database. The notification carries no data:
+subscribers re-read everything after the last mood id they sent, so a missed
+or coalesced wake-up only delays an update, it never loses one. Writes from
+another process are picked up when wait() times out.
+"""
+
+import threading
+from typing import Dict, Iterable
+
+
+class MoodEventBus:
+    """Per-user change counters plus a condition variable to wait on them"""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._counters: Dict[int, int] = {}
+
+    def publish(self, user_ids: Iterable[int]):
+        with self._changed:
+            for user_id in set(user_ids):
+                self._counters[user_id] = self._counters.get(user_id, 0) + 1
+            self._changed.notify_all()
+
+    def counter(self, user_id: int) -> int:
+        with self._changed:
+            return self._counters.get(user_id, 0)
+
+    def wait(self, user_id: int, seen: int, timeout: float) -> int:
+        """Block until the user's counter moves past seen or timeout passes; returns the counter"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._counters.get(user_id, 0) != seen, timeout)
+            return self._counters.get(user_id, 0)
+
+
+bus = MoodEventBus()
+
+
+def publish(user_ids: Iterable[int]):
+    """Wake stream subscribers of these users (call after the write has committed)"""
+    bus.publish(user_ids)
@@ -0,0 +1,134 @@
+"""
+import_moods.py
+Purpose: Validate and bulk-insert mood events (JSON arrays, NDJSON/JSONL files)
+Integrated with: dashboard.py (/log_mood/bulk), command line backfills
+
+Each event is an object like the /log_mood body:
+    {"user_id": "1", "emotion": "happy", "intensity": 70,
+     "timestamp": "2025-01-31T09:15:00", "source": "face"}
+Missing fields get the same defaults as /log_mood; timestamp defaults to now.
+
+Usage:
+    python -m analytics.import_moods moods.jsonl --db path/to/neurowell.db [--batch-size 50000]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from . import events, store
+from .db import ConnectionPool, get_pool
+from .migrations import migrate
+
+# (user_id, emotion, intensity, epoch-ms timestamp, source)
+MoodEvent = Tuple[str, str, int, int, str]
+
+
+def parse_event(event: Any) -> MoodEvent:
+    """Validate one event into a MoodEvent; raises ValueError"""
+    if isinstance(event, ValueError):
+        raise event
+    if not isinstance(event, dict):
+        raise ValueError("event must be a JSON object")
+    user_id = str(event.get("user_id", "1"))
+    store.user_key(user_id)
+    emotion = event.get("emotion", "neutral")
+    if not isinstance(emotion, str) or not emotion.strip():
+        raise ValueError("emotion must be a non-empty string")
+    intensity = store.sqlite_int(event.get("intensity", 5), "intensity")
+    timestamp = store.to_epoch_ms(event.get("timestamp") or datetime.now())
+    source = event.get("source", "chat")
+    if not isinstance(source, str):
+        raise ValueError("source must be a string")
+    return user_id, emotion, intensity, timestamp, source
+
+
+def parse_events(events: Iterable[Tuple[int, Any]]) -> Tuple[List[MoodEvent], List[Dict[str, Any]]]:
+    """Split numbered raw events into valid rows and {index, error} rejections"""
+    rows, rejected = [], []
+    for index, event in events:
+        try:
+            rows.append(parse_event(event))
+        except (TypeError, ValueError, OverflowError) as e:
+            rejected.append({"index": index, "error": str(e)})
+    return rows, rejected
+
+
+def iter_ndjson(lines: Iterable[str], start: int = 1) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, decoded object) for each non-blank line; undecodable lines yield the error"""
+    for number, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, ValueError(f"invalid JSON: {e.msg}")
+
+
+def insert_events(pool: ConnectionPool, rows: List[MoodEvent]) -> int:
+    """Insert validated rows in one transaction"""
+    if rows:
+        with pool.transaction() as conn:
+            store.insert_moods(conn.cursor(), rows)
+        events.publish(store.user_key(row[0]) for row in rows)
+    return len(rows)
+
+
+def import_file(pool: ConnectionPool, path: str, batch_size: int = 50000, report=print) -> Dict[str, Any]:
+    """Stream a JSONL file into the database, one transaction per batch"""
+    started = time.perf_counter()
+    inserted, rejected = 0, []
+    batch = []
+
+    def flush():
+        nonlocal inserted, batch
+        inserted += insert_events(pool, batch)
+        batch = []
+        elapsed = time.perf_counter() - started
+        report(f"  {inserted} rows imported ({inserted / elapsed:,.0f} rows/s)")
+
+    with open(path, encoding="utf-8") as f:
+        for number, event in iter_ndjson(f):
+            try:
+                batch.append(parse_event(event))
+            except (TypeError, ValueError, OverflowError) as e:
+                rejected.append({"index": number, "error": str(e)})
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "rejected": rejected,
+        "seconds": elapsed,
+        "rows_per_second": inserted / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import mood events from a JSONL file")
+    parser.add_argument("path", help="JSONL file, one mood event per line")
+    parser.add_argument("--db", default="neurowell.db", help="SQLite database path")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per transaction")
+    args = parser.parse_args()
+
+    pool = get_pool(args.db, size=1)
+    with pool.connection() as conn:
+        migrate(conn)
+        # Random-order index inserts dominate large imports; give them a bigger page cache
+        conn.execute("PRAGMA cache_size=-262144")
+    result = import_file(pool, args.path, args.batch_size)
+    for rejection in result["rejected"][:20]:
+        print(f"  line {rejection['index']}: {rejection['error']}")
+    print(f"Imported {result['inserted']} rows in {result['seconds']:.2f}s "
+          f"({result['rows_per_second']:,.0f} rows/s), rejected {len(result['rejected'])}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+ingest.py
+Purpose: Write-behind mood logging so request handlers never wait on a disk commit
+Integrated with: backend/app.py
+
+Handlers submit mood events to a bounded in-process queue. One writer thread
+drains it and commits batches with a single executemany transaction, either
+when batch_size events are waiting or flush_interval seconds have passed.
+Events are validated on submit; a batch that still fails is retried while the
+database is busy, then written row by row so only the offending event is lost.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from . import events, store
+from .db import ConnectionPool
+
+WRITE_RETRIES = 3     # attempts per batch while SQLite reports the database locked/busy
+RETRY_DELAY = 0.05    # seconds before the first retry, doubled each time
+
+
+class _FlushMarker:
+    """Queued behind pending events; set once everything before it is written"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class MoodWriter:
+    """Background writer that batches mood events into one transaction per flush"""
+
+    def __init__(self, pool: ConnectionPool, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.25):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "rejected": 0, "invalid": 0, "failed": 0, "batches": 0}
+
+    def start(self):
+        """Start the writer thread (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="mood-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, user_id: str, emotion: str, intensity: int, source: str = "chat",
+               timestamp: str = None, block_timeout: float = 0) -> bool:
+        """Queue one mood event; returns False if it is invalid or the queue stays full (back-pressure)"""
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        try:
+            store.user_key(user_id)
+            store.to_epoch_ms(timestamp)
+            event = (str(user_id), emotion, store.sqlite_int(intensity, "intensity"), timestamp, source)
+        except (TypeError, ValueError) as e:
+            self._count("invalid")
+            print(f"Invalid mood event dropped: {e}")
+            return False
+        try:
+            if block_timeout:
+                self._queue.put(event, timeout=block_timeout)
+            else:
+                self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self._count("rejected")
+            return False
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every event submitted so far is committed (written inline if the thread is not running)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_now()
+            return True
+        marker = _FlushMarker()
+        self._queue.put(marker, timeout=timeout)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending events and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain_now()
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["capacity"] = self._queue.maxsize
+        return stats
+
+    # -------------------- WRITER THREAD --------------------
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, markers = [], []
+            self._add(first, batch, markers)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not markers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._add(self._queue.get(timeout=remaining), batch, markers)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for marker in markers:
+                marker.done.set()
+
+    @staticmethod
+    def _add(item, batch: List, markers: List):
+        if isinstance(item, _FlushMarker):
+            markers.append(item)
+        else:
+            batch.append(item)
+
+    def _drain_now(self):
+        batch, markers = [], []
+        while True:
+            try:
+                self._add(self._queue.get_nowait(), batch, markers)
+            except queue.Empty:
+                break
+        self._write(batch)
+        for marker in markers:
+            marker.done.set()
+
+    def _write(self, batch: List):
+        if not batch:
+            return
+        try:
+            self._commit(batch)
+        except sqlite3.OperationalError as e:
+            # Still locked after the retries: no single event is at fault
+            self._count("failed", len(batch))
+            print(f"DB log error, dropped {len(batch)} moods: {e}")
+        except Exception as e:
+            if len(batch) == 1:
+                self._count("failed")
+                print(f"DB log error, dropped {batch[0]}: {e}")
+                return
+            # Find the offending events: every other event in the batch still gets written
+            for event in batch:
+                self._write([event])
+
+    def _commit(self, batch: List):
+        """One transaction for the batch, retried while the database is locked"""
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with self.pool.transaction() as conn:
+                    store.insert_moods(conn.cursor(), batch)
+                break
+            except sqlite3.OperationalError:
+                if attempt == WRITE_RETRIES - 1:
+                    raise
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+        events.publish(store.user_key(event[0]) for event in batch)
+        self._count("written", len(batch))
+        self._count("batches")
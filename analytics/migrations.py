@@ -0,0 +1,413 @@
+"""
+migrations.py
+Purpose: Versioned, ordered schema migrations for the NeuroWell database
+Integrated with: data_processing.py
+
+Every migration runs inside its own transaction together with the row that
+records it in schema_migrations, and is written so that re-running it on a
+database that already has the change is a no-op.
+
+Usage:
+    python -m analytics.migrations --db path/to/neurowell.db [--status]
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone()
+    return row is not None
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# -------------------- MIGRATIONS --------------------
+
+def _create_base_tables(conn: sqlite3.Connection):
+    """Moods, users and reports tables"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS moods (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        emotion TEXT,
+        intensity INTEGER,
+        timestamp TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        age INTEGER,
+        phone TEXT,
+        gender TEXT,
+        member_since TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS reports (
+        report_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        report_type TEXT,
+        generated_at TEXT,
+        summary TEXT,
+        insights TEXT,
+        recommendations TEXT
+    )
+    """)
+
+
+def _add_mood_source(conn: sqlite3.Connection):
+    """Modality (chat/text/voice/face) of each mood"""
+    if "source" not in _columns(conn, "moods"):
+        conn.execute("ALTER TABLE moods ADD COLUMN source TEXT DEFAULT 'chat'")
+
+
+def _iso_parts(timestamp: str) -> Tuple[str, int, int]:
+    day = datetime.fromisoformat(timestamp).date()
+    iso = day.isocalendar()
+    return day.isoformat(), iso[0], iso[1]
+
+
+def _create_mood_rollups(conn: sqlite3.Connection):
+    """Daily/weekly rollups keyed by TEXT user/day and emotion name, backfilled from existing moods"""
+    existed = _table_exists(conn, "mood_rollup_daily")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mood_rollup_daily (
+        user_id TEXT, day TEXT, count INTEGER, intensity_sum INTEGER, intensity_max INTEGER,
+        PRIMARY KEY (user_id, day)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mood_rollup_daily_emotion (
+        user_id TEXT, day TEXT, emotion TEXT, count INTEGER, first_mood_id INTEGER,
+        PRIMARY KEY (user_id, day, emotion)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mood_rollup_weekly (
+        user_id TEXT, iso_year INTEGER, iso_week INTEGER, count INTEGER, intensity_sum INTEGER, intensity_max INTEGER,
+        PRIMARY KEY (user_id, iso_year, iso_week)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mood_rollup_weekly_emotion (
+        user_id TEXT, iso_year INTEGER, iso_week INTEGER, emotion TEXT, count INTEGER, first_mood_id INTEGER,
+        PRIMARY KEY (user_id, iso_year, iso_week, emotion)
+    )
+    """)
+    if existed:
+        return
+
+    conn.create_function("nw_day", 1, lambda ts: _iso_parts(ts)[0], deterministic=True)
+    conn.create_function("nw_iso_year", 1, lambda ts: _iso_parts(ts)[1], deterministic=True)
+    conn.create_function("nw_iso_week", 1, lambda ts: _iso_parts(ts)[2], deterministic=True)
+    conn.execute("""
+    INSERT INTO mood_rollup_daily
+    SELECT user_id, nw_day(timestamp), COUNT(*), SUM(intensity), MAX(intensity) FROM moods GROUP BY 1, 2
+    """)
+    conn.execute("""
+    INSERT INTO mood_rollup_daily_emotion
+    SELECT user_id, nw_day(timestamp), emotion, COUNT(*), MIN(id) FROM moods GROUP BY 1, 2, 3
+    """)
+    conn.execute("""
+    INSERT INTO mood_rollup_weekly
+    SELECT user_id, nw_iso_year(timestamp), nw_iso_week(timestamp), COUNT(*), SUM(intensity), MAX(intensity)
+    FROM moods GROUP BY 1, 2, 3
+    """)
+    conn.execute("""
+    INSERT INTO mood_rollup_weekly_emotion
+    SELECT user_id, nw_iso_year(timestamp), nw_iso_week(timestamp), emotion, COUNT(*), MIN(id)
+    FROM moods GROUP BY 1, 2, 3, 4
+    """)
+
+
+def _add_mood_indexes(conn: sqlite3.Connection):
+    """Per-user indexes so WHERE user_id=? range scans instead of a full table scan"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_moods_user_ts ON moods (user_id, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_moods_user_source_ts ON moods (user_id, source, timestamp)")
+
+
+# Labels written by the text model, DeepFace and the chatbot; seeded so the common ones get the smallest codes
+KNOWN_EMOTIONS = [
+    "neutral", "happy", "sad", "angry", "fear", "surprise", "disgust", "calm",
+    "joy", "sadness", "anger", "love", "anxious", "anxiety", "stress", "general", "critical",
+]
+
+# ISO-8601 TEXT -> epoch milliseconds; naive timestamps keep their wall-clock value
+_EPOCH_MS_SQL = "CAST(ROUND((julianday({0}) - 2440587.5) * 86400000.0) AS INTEGER)"
+# TEXT user id holding an integer
+_IS_INT_SQL = "CAST(CAST({0} AS INTEGER) AS TEXT) = {0}"
+# TEXT user id -> INTEGER key: integers stay themselves, any other legacy id becomes -legacy_user_ids.code
+_USER_KEY_SQL = ("CASE WHEN " + _IS_INT_SQL + " THEN CAST({0} AS INTEGER) "
+                 "WHEN {0} IS NOT NULL THEN -(SELECT code FROM legacy_user_ids WHERE name = {0}) END")
+
+
+def _register_legacy_users(conn: sqlite3.Connection, table: str, where: str = "", params: Tuple = ()):
+    """Give every non-integer user id in table a legacy_user_ids code, so those users keep separate data"""
+    conn.execute(f"INSERT OR IGNORE INTO legacy_user_ids (name) SELECT DISTINCT user_id FROM {table} "
+                 f"WHERE user_id IS NOT NULL AND NOT ({_IS_INT_SQL.format('user_id')}){where}", params)
+
+
+def _copy_moods_batch(conn: sqlite3.Connection, low: int, high: int):
+    conn.execute("INSERT OR IGNORE INTO emotions (name) SELECT DISTINCT COALESCE(emotion, 'neutral') "
+                 "FROM moods WHERE id > ? AND id <= ?", (low, high))
+    _register_legacy_users(conn, "moods", " AND id > ? AND id <= ?", (low, high))
+    conn.execute(f"""
+    INSERT OR IGNORE INTO moods_v2 (id, user_id, ts_ms, emotion_code, intensity, source)
+    SELECT m.id, {_USER_KEY_SQL.format('m.user_id')}, {_EPOCH_MS_SQL.format('m.timestamp')}, e.code, m.intensity,
+           m.source
+    FROM moods m JOIN emotions e ON e.name = COALESCE(m.emotion, 'neutral')
+    WHERE m.id > ? AND m.id <= ?
+    """, (low, high))
+
+
+def _convert_rollups_v2(conn: sqlite3.Connection):
+    """Re-key the TEXT rollups on integer user/day and emotion codes (O(buckets), no raw rows read)"""
+    day_sql = "CAST(julianday(day) - 2440587.5 AS INTEGER)"
+    conn.execute("INSERT OR IGNORE INTO emotions (name) SELECT DISTINCT emotion FROM mood_rollup_weekly_emotion")
+    for table in ["mood_rollup_daily", "mood_rollup_weekly"]:
+        _register_legacy_users(conn, table)
+    conn.execute("""
+    CREATE TABLE mood_rollup_daily_v2 (
+        user_id INTEGER, day INTEGER, count INTEGER, intensity_sum INTEGER, intensity_max INTEGER,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE mood_rollup_daily_emotion_v2 (
+        user_id INTEGER, day INTEGER, emotion_code INTEGER, count INTEGER, first_mood_id INTEGER,
+        PRIMARY KEY (user_id, day, emotion_code)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE mood_rollup_weekly_v2 (
+        user_id INTEGER, iso_year INTEGER, iso_week INTEGER, count INTEGER, intensity_sum INTEGER, intensity_max INTEGER,
+        PRIMARY KEY (user_id, iso_year, iso_week)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE mood_rollup_weekly_emotion_v2 (
+        user_id INTEGER, iso_year INTEGER, iso_week INTEGER, emotion_code INTEGER, count INTEGER, first_mood_id INTEGER,
+        PRIMARY KEY (user_id, iso_year, iso_week, emotion_code)
+    ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+    INSERT INTO mood_rollup_daily_v2
+    SELECT {_USER_KEY_SQL.format('user_id')}, {day_sql}, SUM(count), SUM(intensity_sum), MAX(intensity_max)
+    FROM mood_rollup_daily GROUP BY 1, 2
+    """)
+    conn.execute(f"""
+    INSERT INTO mood_rollup_daily_emotion_v2
+    SELECT {_USER_KEY_SQL.format('r.user_id')}, {day_sql}, e.code, SUM(r.count), MIN(r.first_mood_id)
+    FROM mood_rollup_daily_emotion r JOIN emotions e ON e.name = r.emotion GROUP BY 1, 2, 3
+    """)
+    conn.execute(f"""
+    INSERT INTO mood_rollup_weekly_v2
+    SELECT {_USER_KEY_SQL.format('user_id')}, iso_year, iso_week, SUM(count), SUM(intensity_sum), MAX(intensity_max)
+    FROM mood_rollup_weekly GROUP BY 1, 2, 3
+    """)
+    conn.execute(f"""
+    INSERT INTO mood_rollup_weekly_emotion_v2
+    SELECT {_USER_KEY_SQL.format('r.user_id')}, r.iso_year, r.iso_week, e.code, SUM(r.count), MIN(r.first_mood_id)
+    FROM mood_rollup_weekly_emotion r JOIN emotions e ON e.name = r.emotion GROUP BY 1, 2, 3, 4
+    """)
+    for table in ["mood_rollup_daily", "mood_rollup_daily_emotion", "mood_rollup_weekly", "mood_rollup_weekly_emotion"]:
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_v2 RENAME TO {table}")
+
+
+def _moods_v2(conn: sqlite3.Connection, batch_size: int = 50000):
+    """Typed moods: INTEGER user_id, epoch-ms ts_ms and emotion_code from the emotions lookup table.
+
+    Legacy user ids that are not integers are not merged into one user: each
+    gets a row in legacy_user_ids and its moods move to user_id = -code.
+
+    Runs online: triggers mirror writes made to the legacy table while the
+    existing rows are copied over in short id-range batches (resumable via
+    schema_migration_progress). A final short transaction drops the legacy
+    table and renames moods_v2 into place, so processes must run code that
+    knows the v2 layout from then on.
+    """
+    if "ts_ms" in _columns(conn, "moods"):
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("CREATE TABLE IF NOT EXISTS emotions (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.executemany("INSERT OR IGNORE INTO emotions (name) VALUES (?)", [(name,) for name in KNOWN_EMOTIONS])
+    conn.execute("CREATE TABLE IF NOT EXISTS legacy_user_ids (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS moods_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        ts_ms INTEGER,
+        emotion_code INTEGER REFERENCES emotions (code),
+        intensity INTEGER,
+        source TEXT DEFAULT 'chat'
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_moods_v2_user_ts ON moods_v2 (user_id, ts_ms)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_moods_v2_user_source_ts ON moods_v2 (user_id, source, ts_ms)")
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS moods_v2_mirror_insert AFTER INSERT ON moods BEGIN
+        INSERT OR IGNORE INTO emotions (name) VALUES (COALESCE(NEW.emotion, 'neutral'));
+        INSERT OR IGNORE INTO legacy_user_ids (name)
+        SELECT NEW.user_id WHERE NEW.user_id IS NOT NULL AND NOT ({_IS_INT_SQL.format('NEW.user_id')});
+        INSERT OR REPLACE INTO moods_v2 (id, user_id, ts_ms, emotion_code, intensity, source)
+        VALUES (NEW.id, {_USER_KEY_SQL.format('NEW.user_id')}, {_EPOCH_MS_SQL.format('NEW.timestamp')},
+                (SELECT code FROM emotions WHERE name = COALESCE(NEW.emotion, 'neutral')), NEW.intensity, NEW.source);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS moods_v2_mirror_delete AFTER DELETE ON moods BEGIN
+        DELETE FROM moods_v2 WHERE id = OLD.id;
+    END
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_migration_progress (version INTEGER PRIMARY KEY, last_id INTEGER)")
+    conn.execute("INSERT OR IGNORE INTO schema_migration_progress VALUES (5, 0)")
+    last_id = conn.execute("SELECT last_id FROM schema_migration_progress WHERE version=5").fetchone()[0]
+    high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM moods").fetchone()[0]
+    conn.commit()
+
+    # Rows above `high` are mirrored by the trigger; copy the rest without holding the write lock for long
+    while last_id < high:
+        upper = min(last_id + batch_size, high)
+        conn.execute("BEGIN IMMEDIATE")
+        _copy_moods_batch(conn, last_id, upper)
+        conn.execute("UPDATE schema_migration_progress SET last_id=? WHERE version=5", (upper,))
+        conn.commit()
+        last_id = upper
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP TRIGGER moods_v2_mirror_insert")
+        conn.execute("DROP TRIGGER moods_v2_mirror_delete")
+        legacy, copied = conn.execute("SELECT (SELECT COUNT(*) FROM moods), (SELECT COUNT(*) FROM moods_v2)").fetchone()
+        if legacy != copied:
+            raise RuntimeError(f"moods v2 copy incomplete: {copied} of {legacy} rows")
+        conn.execute("""
+        UPDATE sqlite_sequence SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name='moods'), 0))
+        WHERE name='moods_v2'
+        """)
+        _convert_rollups_v2(conn)
+        conn.execute("DROP TABLE moods")
+        conn.execute("ALTER TABLE moods_v2 RENAME TO moods")
+        conn.execute("DELETE FROM schema_migration_progress WHERE version=5")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _create_mood_versions(conn: sqlite3.Connection):
+    """Per-user data version, bumped by every mood write (cache keys, change feeds)"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mood_versions (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL,
+        last_mood_id INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT OR IGNORE INTO mood_versions (user_id, version, last_mood_id)
+    SELECT user_id, COUNT(*), MAX(id) FROM moods GROUP BY user_id
+    """)
+
+
+def _create_mood_archive(conn: sqlite3.Connection):
+    """Manifest of per-user, per-month cold files (archive.py); a month is only read through its row here"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mood_archive (
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        path TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        min_ts_ms INTEGER NOT NULL,
+        max_ts_ms INTEGER NOT NULL,
+        PRIMARY KEY (user_id, month)
+    ) WITHOUT ROWID
+    """)
+
+
+# Append only: never renumber or edit a migration that has shipped
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base tables", _create_base_tables),
+    (2, "moods.source column", _add_mood_source),
+    (3, "mood rollup tables", _create_mood_rollups),
+    (4, "moods per-user indexes", _add_mood_indexes),
+    (5, "moods v2 typed layout", _moods_v2),
+    (6, "per-user mood data versions", _create_mood_versions),
+    (7, "cold mood archive manifest", _create_mood_archive),
+]
+
+# Migrations that manage their own (batched) transactions instead of running in one
+ONLINE_MIGRATIONS = {5}
+
+
+# -------------------- RUNNER --------------------
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TEXT
+    )
+    """)
+    conn.commit()
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Highest applied migration version (0 for a fresh database)"""
+    _ensure_version_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int = None) -> List[int]:
+    """Apply pending migrations in order up to target; returns the versions applied"""
+    applied = []
+    version = current_version(conn)
+    for number, name, step in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        if number in ONLINE_MIGRATIONS:
+            step(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if number not in ONLINE_MIGRATIONS:
+                step(conn)
+            conn.execute("INSERT OR IGNORE INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                         (number, name, datetime.now().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(number)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply NeuroWell schema migrations")
+    parser.add_argument("--db", default="neurowell.db", help="SQLite database path")
+    parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    parser.add_argument("--status", action="store_true", help="Only print the current version")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.status:
+        latest = MIGRATIONS[-1][0]
+        print(f"Schema version {current_version(conn)} (latest {latest})")
+    else:
+        applied = migrate(conn, args.target)
+        print(f"Applied migrations: {applied or 'none'}; now at version {current_version(conn)}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+numpy_engine.py
+Purpose: Pandas-free versions of the snapshot aggregations (DataProcessor(engine="numpy"))
+Integrated with: data_processing.py
+
+Works on MoodArrays, one user's moods as integer-coded column arrays in
+mood-id order, using np.unique / np.bincount instead of DataFrame groupbys.
+Every function returns exactly what the pandas path of DataProcessor returns,
+including its tie-breaks. value_counts() lists keys in first-appearance order
+and then sorts them with Series.sort_values(ascending=False), an unstable
+quicksort, so equal counts come out in whatever order numpy's quicksort
+leaves them; ordering.value_counts_order replays that exact sort.
+Series.mode() breaks ties alphabetically.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .ordering import value_counts_order
+
+MS_PER_DAY = 86400000
+EPOCH_DATE = date(1970, 1, 1)
+
+
+class MoodArrays:
+    """Column arrays of one user's moods, sorted by mood id"""
+
+    def __init__(self, ids: np.ndarray, ts_ms: np.ndarray, codes: np.ndarray, intensity: np.ndarray,
+                 sources: np.ndarray, names: Dict[int, str]):
+        self.ids = ids
+        self.ts_ms = ts_ms
+        self.codes = codes
+        self.intensity = intensity
+        self.sources = sources
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple], names: Dict[int, str]) -> "MoodArrays":
+        """From (id, ts_ms, emotion_code, intensity, source) rows"""
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(empty, empty, empty, empty, np.empty(0, dtype=object), names)
+        ids, ts_ms, codes, intensity, sources = zip(*rows)
+        return cls(np.array(ids, dtype=np.int64), np.array(ts_ms, dtype=np.int64),
+                   np.array(codes, dtype=np.int64), np.array(intensity), np.array(sources, dtype=object), names)
+
+    def concat(self, other: "MoodArrays") -> "MoodArrays":
+        """Both tiers merged back into mood-id order"""
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        order = np.argsort(np.concatenate([self.ids, other.ids]), kind="stable")
+        return MoodArrays(*(np.concatenate([a, b])[order] for a, b in [
+            (self.ids, other.ids), (self.ts_ms, other.ts_ms), (self.codes, other.codes),
+            (self.intensity, other.intensity), (self.sources, other.sources)]), names=self.names)
+
+    def emotions(self) -> np.ndarray:
+        """Emotion names as an object array"""
+        lookup = np.empty(int(self.codes.max()) + 1 if len(self) else 0, dtype=object)
+        for code, name in self.names.items():
+            if code < len(lookup):
+                lookup[code] = name
+        return lookup[self.codes]
+
+
+# -------------------- HELPERS --------------------
+
+def _dominant(groups: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """value_counts().idxmax() of the codes in each dense group 0..n-1"""
+    n_codes = int(codes.max()) + 1
+    keys, first, counts = np.unique(groups * n_codes + codes, return_index=True, return_counts=True)
+    # Within each group, keys in first-appearance order
+    order = np.lexsort((first, keys // n_codes))
+    key_groups, key_codes, counts = (keys // n_codes)[order], (keys % n_codes)[order], counts[order]
+    starts = np.flatnonzero(np.concatenate([[True], key_groups[1:] != key_groups[:-1]]))
+    ends = np.append(starts[1:], len(counts))
+    at_top = counts == np.repeat(np.maximum.reduceat(counts, starts), ends - starts)
+    # A lone maximum wins in any order; only tied groups need value_counts' sort replayed
+    _, first_top = np.unique(key_groups[at_top], return_index=True)
+    winners = key_codes[at_top][first_top]
+    for group in np.flatnonzero(np.bincount(key_groups[at_top]) > 1):
+        a, b = starts[group], ends[group]
+        winners[group] = key_codes[a:b][value_counts_order(counts[a:b])[0]]
+    return winners
+
+
+def _bucket_stats(groups: np.ndarray, intensity: np.ndarray, n_groups: int):
+    """(count, intensity mean, intensity max) per dense group"""
+    counts = np.bincount(groups, minlength=n_groups)
+    sums = np.bincount(groups, weights=intensity, minlength=n_groups)
+    order = np.argsort(groups, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    peaks = np.maximum.reduceat(intensity[order], starts)
+    return counts, sums / counts, peaks
+
+
+def _buckets(arrays: MoodArrays, labels: np.ndarray, label_key: str, to_label) -> List[Dict[str, Any]]:
+    keys, groups = np.unique(labels, return_inverse=True)
+    _, means, peaks = _bucket_stats(groups, arrays.intensity, len(keys))
+    dominant = _dominant(groups, arrays.codes)
+    return [{
+        label_key: to_label(key),
+        "avg_intensity": float(mean),
+        "max_intensity": peak.item(),
+        "dominant_emotion": arrays.names.get(int(code))
+    } for key, mean, peak, code in zip(keys, means, peaks, dominant)]
+
+
+# -------------------- AGGREGATIONS --------------------
+
+def daily_summary(arrays: MoodArrays) -> List[Dict[str, Any]]:
+    """Per-day average/max intensity and dominant emotion, oldest day first"""
+    if not len(arrays):
+        return []
+    days = arrays.ts_ms // MS_PER_DAY
+    return _buckets(arrays, days, "date", lambda day: EPOCH_DATE + timedelta(days=int(day)))
+
+
+def weekly_summary(arrays: MoodArrays) -> List[Dict[str, Any]]:
+    """Per-ISO-week-number average/max intensity and dominant emotion"""
+    if not len(arrays):
+        return []
+    days, day_groups = np.unique(arrays.ts_ms // MS_PER_DAY, return_inverse=True)
+    week_of_day = np.array([(EPOCH_DATE + timedelta(days=int(day))).isocalendar()[1] for day in days])
+    return _buckets(arrays, week_of_day[day_groups], "week", int)
+
+
+def emotion_counts(arrays: MoodArrays) -> Dict[str, int]:
+    """Count per emotion in value_counts() order"""
+    if not len(arrays):
+        return {}
+    codes, first, counts = np.unique(arrays.codes, return_index=True, return_counts=True)
+    appearance = np.argsort(first)
+    codes, counts = codes[appearance], counts[appearance]
+    return {arrays.names.get(int(codes[i])): int(counts[i]) for i in value_counts_order(counts)}
+
+
+def statistics(arrays: MoodArrays) -> Dict[str, Any]:
+    """Entry count, dominant emotion (ties alphabetical, like Series.mode) and mean intensity"""
+    if not len(arrays):
+        return {}
+    codes, counts = np.unique(arrays.codes, return_counts=True)
+    top = counts.max()
+    return {
+        "total_entries": len(arrays),
+        "dominant_emotion": min(arrays.names.get(int(c)) for c in codes[counts == top]),
+        "average_intensity": float(arrays.intensity.mean())
+    }
@@ -0,0 +1,20 @@
+"""
+ordering.py
+Purpose: The tie-break pandas value_counts() applies to equal counts
+Integrated with: numpy_engine.py, rollups.py
+
+value_counts() lists keys in first-appearance order and then sorts them with
+Series.sort_values(ascending=False), an unstable quicksort, so equal counts
+come out in whatever order numpy's quicksort leaves them. The numpy engine
+and the rollup readers both replay that sort here so their dominant emotions
+and emotion counts match the pandas snapshot.
+"""
+
+import numpy as np
+
+
+def value_counts_order(counts: np.ndarray) -> np.ndarray:
+    """Positions in the order Series.value_counts() lists keys whose counts are given in first-appearance order"""
+    # pandas nargsort(ascending=False): reverse, argsort(kind="quicksort"), reverse back
+    positions = np.arange(len(counts))[::-1]
+    return positions[counts[::-1].argsort(kind="quicksort")][::-1]
@@ -0,0 +1,290 @@
+"""
+rollups.py
+Purpose: Daily/weekly mood rollup tables, maintained on every mood write
+Integrated with: data_processing.py, backend/app.py
+
+Each (user, day) and (user, ISO week) bucket keeps the entry count, the sum
+and max of intensity, and per-emotion counts. Dashboard aggregations read
+these buckets instead of re-grouping every raw mood row.
+
+Usage:
+    python -m analytics.rollups --db path/to/neurowell.db [--user 1]
+"""
+
+import argparse
+import sqlite3
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .ordering import value_counts_order
+
+ROLLUP_TABLES = [
+    "mood_rollup_daily",
+    "mood_rollup_daily_emotion",
+    "mood_rollup_weekly",
+    "mood_rollup_weekly_emotion",
+]
+
+MS_PER_DAY = 86400000
+EPOCH_DATE = date(1970, 1, 1)
+
+# (mood_id, user_id, ts_ms, emotion_code, intensity), the column order of moods
+MoodRow = Tuple[int, int, int, int, int]
+
+
+# -------------------- WRITE PATH --------------------
+
+@lru_cache(maxsize=4096)
+def _iso_week(day: int) -> Tuple[int, int]:
+    """(iso_year, iso_week) of a day number (days since 1970-01-01)"""
+    iso = (EPOCH_DATE + timedelta(days=day)).isocalendar()
+    return iso[0], iso[1]
+
+
+def apply_moods(cursor: sqlite3.Cursor, moods: Iterable[MoodRow]):
+    """Fold already-inserted mood rows into the rollups (caller commits)"""
+    daily, daily_emotion = {}, {}
+    for mood_id, user_id, ts_ms, emotion, intensity in moods:
+        day = ts_ms // MS_PER_DAY
+        key = (user_id, day)
+        bucket = daily.get(key)
+        if bucket is None:
+            daily[key] = (1, intensity, intensity)
+        else:
+            daily[key] = (bucket[0] + 1, bucket[1] + intensity, max(bucket[2], intensity))
+        key = (user_id, day, emotion)
+        seen = daily_emotion.get(key)
+        daily_emotion[key] = (1, mood_id) if seen is None else (seen[0] + 1, min(seen[1], mood_id))
+
+    # Weeks are unions of days, so derive them from the (far fewer) daily deltas
+    weekly, weekly_emotion = {}, {}
+    for (user_id, day), (count, total, peak) in daily.items():
+        key = (user_id,) + _iso_week(day)
+        bucket = weekly.get(key)
+        if bucket is None:
+            weekly[key] = (count, total, peak)
+        else:
+            weekly[key] = (bucket[0] + count, bucket[1] + total, max(bucket[2], peak))
+    for (user_id, day, emotion), (count, first_id) in daily_emotion.items():
+        key = (user_id,) + _iso_week(day) + (emotion,)
+        seen = weekly_emotion.get(key)
+        weekly_emotion[key] = (count, first_id) if seen is None else (seen[0] + count, min(seen[1], first_id))
+
+    cursor.executemany("""
+    INSERT INTO mood_rollup_daily (user_id, day, count, intensity_sum, intensity_max)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        count = count + excluded.count,
+        intensity_sum = intensity_sum + excluded.intensity_sum,
+        intensity_max = MAX(intensity_max, excluded.intensity_max)
+    """, [key + value for key, value in daily.items()])
+    cursor.executemany("""
+    INSERT INTO mood_rollup_weekly (user_id, iso_year, iso_week, count, intensity_sum, intensity_max)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, iso_year, iso_week) DO UPDATE SET
+        count = count + excluded.count,
+        intensity_sum = intensity_sum + excluded.intensity_sum,
+        intensity_max = MAX(intensity_max, excluded.intensity_max)
+    """, [key + value for key, value in weekly.items()])
+    cursor.executemany("""
+    INSERT INTO mood_rollup_daily_emotion (user_id, day, emotion_code, count, first_mood_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, day, emotion_code) DO UPDATE SET
+        count = count + excluded.count,
+        first_mood_id = MIN(first_mood_id, excluded.first_mood_id)
+    """, [key + value for key, value in daily_emotion.items()])
+    cursor.executemany("""
+    INSERT INTO mood_rollup_weekly_emotion (user_id, iso_year, iso_week, emotion_code, count, first_mood_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, iso_year, iso_week, emotion_code) DO UPDATE SET
+        count = count + excluded.count,
+        first_mood_id = MIN(first_mood_id, excluded.first_mood_id)
+    """, [key + value for key, value in weekly_emotion.items()])
+
+
+def rebuild_rollups(conn: sqlite3.Connection, user_id: Optional[int] = None, chunk_size: int = 50000,
+                    commit: bool = True, archived: Iterable[List[MoodRow]] = ()) -> int:
+    """Regenerate rollups from the raw moods table (plus archived chunks); returns the number of moods folded"""
+    cursor = conn.cursor()
+    where, params = ("WHERE user_id=?", (user_id,)) if user_id is not None else ("", ())
+    for table in ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table} {where}", params)
+
+    total = 0
+    for chunk in archived:
+        apply_moods(cursor, chunk)
+        total += len(chunk)
+
+    reader = conn.cursor()
+    reader.execute(f"SELECT id, user_id, ts_ms, emotion_code, intensity FROM moods {where} ORDER BY id", params)
+    while True:
+        chunk = reader.fetchmany(chunk_size)
+        if not chunk:
+            break
+        apply_moods(cursor, chunk)
+        total += len(chunk)
+    if commit:
+        conn.commit()
+    return total
+
+
+# -------------------- READ PATH --------------------
+
+def _value_counts(emotions: List[Tuple[str, int, int]]) -> List[Tuple[str, int]]:
+    """(emotion, count) of a bucket in the order Series.value_counts() lists them.
+
+    pandas breaks count ties with an unstable sort over first-appearance
+    order, so the entries are put in first-logged order and that sort is
+    replayed; the rollups then agree with DataProcessor's snapshot path.
+    """
+    emotions = sorted(emotions, key=lambda e: e[2])
+    counts = np.array([count for _, count, _ in emotions], dtype=np.int64)
+    return [emotions[i][:2] for i in value_counts_order(counts)]
+
+
+def _dominant(emotions: List[Tuple[str, int, int]]) -> str:
+    """Most frequent emotion of a bucket, tie-broken like value_counts().idxmax()"""
+    return _value_counts(emotions)[0][0]
+
+
+def _day_range(first_day: Optional[int], end_day: Optional[int]) -> Tuple[str, Tuple]:
+    """Extra WHERE clause for a [first_day, end_day) window on r.day"""
+    clause, params = "", ()
+    if first_day is not None:
+        clause, params = clause + " AND r.day >= ?", params + (first_day,)
+    if end_day is not None:
+        clause, params = clause + " AND r.day < ?", params + (end_day,)
+    return clause, params
+
+
+def daily_summary(conn: sqlite3.Connection, user_id: int, first_day: Optional[int] = None,
+                  end_day: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Per-day average/max intensity and dominant emotion, oldest day first"""
+    window, params = _day_range(first_day, end_day)
+    emotions = {}
+    for day, emotion, count, first_id in conn.execute(f"""
+            SELECT r.day, e.name, r.count, r.first_mood_id FROM mood_rollup_daily_emotion r
+            JOIN emotions e ON e.code = r.emotion_code WHERE r.user_id=?{window}
+            """, (user_id,) + params):
+        emotions.setdefault(day, []).append((emotion, count, first_id))
+
+    rows = conn.execute(f"""
+    SELECT r.day, r.count, r.intensity_sum, r.intensity_max FROM mood_rollup_daily r
+    WHERE r.user_id=?{window} ORDER BY r.day
+    """, (user_id,) + params).fetchall()
+    return [{
+        "date": EPOCH_DATE + timedelta(days=day),
+        "avg_intensity": total / count,
+        "max_intensity": peak,
+        "dominant_emotion": _dominant(emotions[day])
+    } for day, count, total, peak in rows]
+
+
+def weekly_summary(conn: sqlite3.Connection, user_id: int, first_day: Optional[int] = None,
+                   end_day: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Per-ISO-week-number average/max intensity and dominant emotion"""
+    if first_day is not None or end_day is not None:
+        return _weekly_from_days(conn, user_id, first_day, end_day)
+    emotions = {}
+    for week, emotion, count, first_id in conn.execute("""
+            SELECT r.iso_week, e.name, SUM(r.count), MIN(r.first_mood_id) FROM mood_rollup_weekly_emotion r
+            JOIN emotions e ON e.code = r.emotion_code WHERE r.user_id=? GROUP BY r.iso_week, r.emotion_code
+            """, (user_id,)):
+        emotions.setdefault(week, []).append((emotion, count, first_id))
+
+    rows = conn.execute("""
+    SELECT iso_week, SUM(count), SUM(intensity_sum), MAX(intensity_max) FROM mood_rollup_weekly
+    WHERE user_id=? GROUP BY iso_week ORDER BY iso_week
+    """, (user_id,)).fetchall()
+    return [{
+        "week": week,
+        "avg_intensity": total / count,
+        "max_intensity": peak,
+        "dominant_emotion": _dominant(emotions[week])
+    } for week, count, total, peak in rows]
+
+
+def _weekly_from_days(conn: sqlite3.Connection, user_id: int, first_day: Optional[int],
+                      end_day: Optional[int]) -> List[Dict[str, Any]]:
+    """weekly_summary over a day window; windows may cut weeks, so sum the daily buckets"""
+    window, params = _day_range(first_day, end_day)
+    buckets, emotions = {}, {}
+    for day, count, total, peak in conn.execute(f"""
+            SELECT r.day, r.count, r.intensity_sum, r.intensity_max FROM mood_rollup_daily r
+            WHERE r.user_id=?{window}
+            """, (user_id,) + params):
+        week = _iso_week(day)[1]
+        c, t, p = buckets.get(week, (0, 0, peak))
+        buckets[week] = (c + count, t + total, max(p, peak))
+    for day, emotion, count, first_id in conn.execute(f"""
+            SELECT r.day, e.name, r.count, r.first_mood_id FROM mood_rollup_daily_emotion r
+            JOIN emotions e ON e.code = r.emotion_code WHERE r.user_id=?{window}
+            """, (user_id,) + params):
+        key = (_iso_week(day)[1], emotion)
+        c, f = emotions.get(key, (0, first_id))
+        emotions[key] = (c + count, min(f, first_id))
+
+    by_week = {}
+    for (week, emotion), (count, first_id) in emotions.items():
+        by_week.setdefault(week, []).append((emotion, count, first_id))
+    return [{
+        "week": week,
+        "avg_intensity": total / count,
+        "max_intensity": peak,
+        "dominant_emotion": _dominant(by_week[week])
+    } for week, (count, total, peak) in sorted(buckets.items())]
+
+
+def emotion_counts(conn: sqlite3.Connection, user_id: int, first_day: Optional[int] = None,
+                   end_day: Optional[int] = None) -> Dict[str, int]:
+    """Total count per emotion in value_counts() order"""
+    table = "mood_rollup_weekly_emotion"
+    window, params = "", ()
+    if first_day is not None or end_day is not None:
+        table = "mood_rollup_daily_emotion"
+        window, params = _day_range(first_day, end_day)
+    rows = conn.execute(f"""
+    SELECT e.name, SUM(r.count) AS total, MIN(r.first_mood_id) AS first_id FROM {table} r
+    JOIN emotions e ON e.code = r.emotion_code WHERE r.user_id=?{window}
+    GROUP BY r.emotion_code
+    """, (user_id,) + params).fetchall()
+    return dict(_value_counts(rows))
+
+
+def totals(conn: sqlite3.Connection, user_id: int, first_day: Optional[int] = None,
+           end_day: Optional[int] = None) -> Tuple[int, int]:
+    """Return (entry count, intensity sum) over a user's buckets, optionally within a day window"""
+    table = "mood_rollup_weekly"
+    window, params = "", ()
+    if first_day is not None or end_day is not None:
+        table = "mood_rollup_daily"
+        window, params = _day_range(first_day, end_day)
+    count, total = conn.execute(
+        f"SELECT COALESCE(SUM(r.count), 0), COALESCE(SUM(r.intensity_sum), 0) FROM {table} r "
+        f"WHERE r.user_id=?{window}",
+        (user_id,) + params).fetchone()
+    return count, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild NeuroWell mood rollups from raw moods")
+    parser.add_argument("--db", default="neurowell.db", help="SQLite database path")
+    parser.add_argument("--user", type=int, default=None, help="Only rebuild this user_id")
+    args = parser.parse_args()
+
+    from .archive import archive_root, iter_archived_rows
+    from .migrations import migrate
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    archived = iter_archived_rows(conn, archive_root(args.db), args.user)
+    total = rebuild_rollups(conn, args.user, archived=archived)
+    conn.close()
+    print(f"Rebuilt rollups from {total} mood rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,7 +36,11 @@ def create_app():
                     'bar': '/api/analytics/charts/bar?user_id=1',
                     'pie': '/api/analytics/charts/pie?user_id=1'
                 },
+                'bundle': '/api/analytics/bundle?user_id=1&fields=radar,bar,pie,progress,stats',
+                'moods': '/api/analytics/moods?user_id=1&limit=50&cursor=',
+                'stream': '/api/analytics/stream?user_id=1 (text/event-stream)',
                 'log_mood': '/api/analytics/log_mood (POST)',
+                'log_mood_bulk': '/api/analytics/log_mood/bulk (POST, JSON array or NDJSON)',
                 'report': '/api/analytics/report/generate?user_id=1',
                 'health': '/api/analytics/health'
             },
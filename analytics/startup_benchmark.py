@@ -0,0 +1,135 @@
+"""
+startup_benchmark.py
+Purpose: Measure what importing each NeuroWell service module costs a fresh process
+Integrated with: backend/app.py, analytics/, voice_text_emotion/ (the modules it imports)
+
+Every module is imported in its own interpreter started from the repository
+root, with python -X importtime. Per module it records the median wall time of
+the whole process minus an empty interpreter's, the import time Python reports
+for the module itself, and its heaviest direct imports. Modules that
+fail to import (e.g. an optional model dependency is missing) are reported,
+not skipped.
+
+Usage:
+    python -m analytics.startup_benchmark [--runs 5] [--top 8] [--json startup.json] [module ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "analytics",
+    "analytics.store",
+    "analytics.dashboard",
+    "analytics.data_processing",
+    "voice_text_emotion.text",
+    "voice_text_emotion.speech",
+    "backend.app",
+]
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+
+
+def _wall_ms(code: str, runs: int) -> float:
+    """Median wall time of `python -c code` in milliseconds"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(code)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """-X importtime lines as {"module", "self_ms", "cumulative_ms", "depth"}, in the order printed"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return entries
+
+
+def measure(module: str, runs: int = 5, top: int = 8, baseline_ms: float = None) -> Dict[str, Any]:
+    """Startup cost of importing one module in a fresh interpreter"""
+    code = f"import {module}"
+    if baseline_ms is None:
+        baseline_ms = _wall_ms("pass", runs)
+    profiled = _run(code, importtime=True)
+    if profiled.returncode != 0:
+        error = profiled.stderr.strip().splitlines()[-1] if profiled.stderr.strip() else "import failed"
+        return {"module": module, "ok": False, "error": error}
+
+    entries = parse_importtime(profiled.stderr)
+    position = max((i for i, e in enumerate(entries) if e["module"] == module), default=None)
+    direct = []
+    if position is not None:
+        # Children are printed before their parent: walk back to the previous entry at the module's depth
+        depth = entries[position]["depth"]
+        for entry in reversed(entries[:position]):
+            if entry["depth"] <= depth:
+                break
+            if entry["depth"] == depth + 1:
+                direct.append({"module": entry["module"], "cumulative_ms": round(entry["cumulative_ms"], 1)})
+    direct.sort(key=lambda e: e["cumulative_ms"], reverse=True)
+    return {
+        "module": module,
+        "ok": True,
+        "wall_ms": round(_wall_ms(code, runs) - baseline_ms, 1),
+        "import_ms": round(entries[position]["cumulative_ms"], 1) if position is not None else 0.0,
+        "modules_loaded": len(entries),
+        "heaviest": direct[:top],
+    }
+
+
+def run(modules: List[str], runs: int = 5, top: int = 8) -> Dict[str, Any]:
+    baseline_ms = _wall_ms("pass", runs)
+    return {
+        "python": sys.version.split()[0],
+        "interpreter_ms": round(baseline_ms, 1),
+        "results": [measure(m, runs, top, baseline_ms) for m in modules],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-module import cost of the NeuroWell services")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import (default: all services)")
+    parser.add_argument("--runs", type=int, default=5, help="Wall-time samples per module (median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest direct imports to list per module")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.modules, args.runs, args.top)
+    print(f"Python {report['python']}, empty interpreter {report['interpreter_ms']:.0f} ms")
+    for result in report["results"]:
+        if not result["ok"]:
+            print(f"{result['module']:<28} FAILED: {result['error']}")
+            continue
+        print(f"{result['module']:<28} {result['wall_ms']:>8.0f} ms wall  {result['import_ms']:>8.0f} ms import  "
+              f"{result['modules_loaded']:>5} modules")
+        for dependency in result["heaviest"]:
+            print(f"    {dependency['module']:<36} {dependency['cumulative_ms']:>8.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+store.py
+Purpose: Typed mood storage (INTEGER user ids, epoch-ms timestamps, coded emotions)
+Integrated with: data_processing.py, rollups.py, backend/app.py
+
+Callers keep speaking in string user ids, emotion names and ISO timestamps;
+this module converts at the database boundary.
+"""
+
+import math
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from . import rollups
+
+EPOCH = datetime(1970, 1, 1)
+MS_PER_DAY = 86400000
+# SQLite INTEGER columns hold signed 64-bit values
+SQLITE_INT_MIN, SQLITE_INT_MAX = -2 ** 63, 2 ** 63 - 1
+# Timestamps must fit pandas' nanosecond datetimes (1677-09-21 to 2262-04-11) for the snapshot path,
+# which also keeps them inside the dates the rollups bucket by
+MIN_TS_MS = (datetime(1678, 1, 1) - EPOCH) // timedelta(milliseconds=1)
+MAX_TS_MS = (datetime(2261, 1, 1) - EPOCH) // timedelta(milliseconds=1)  # exclusive
+
+
+def sqlite_int(value: Union[str, int, float], field: str) -> int:
+    """value as an int that fits an SQLite INTEGER; raises ValueError"""
+    try:
+        number = int(value)
+    except OverflowError:
+        raise ValueError(f"{field} must be a finite number")
+    if not SQLITE_INT_MIN <= number <= SQLITE_INT_MAX:
+        raise ValueError(f"{field} is out of range")
+    return number
+
+
+def user_key(user_id: Union[str, int]) -> int:
+    """Integer user id as stored in moods.user_id; raises ValueError for anything else (migration 5 moved
+    non-integer legacy ids to negative keys, listed in legacy_user_ids)"""
+    try:
+        key = int(user_id)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"user_id must be an integer, got {user_id!r}")
+    return sqlite_int(key, "user_id")
+
+
+def to_epoch_ms(timestamp: Union[str, datetime, int, float]) -> int:
+    """ISO string, datetime or epoch ms (int, float or a string of digits) -> epoch milliseconds; naive times
+    keep their wall-clock value. Anything else raises ValueError."""
+    if isinstance(timestamp, bool):
+        raise ValueError("timestamp must be an ISO string or epoch milliseconds, not a boolean")
+    if isinstance(timestamp, int):
+        return _in_range(timestamp)
+    if isinstance(timestamp, float):
+        if not math.isfinite(timestamp):
+            raise ValueError("timestamp must be a finite number")
+        return _in_range(round(timestamp))
+    if isinstance(timestamp, str):
+        digits = timestamp.strip().lstrip("-")
+        # Query strings carry epoch ms as digits; eight digits or fewer is an ISO basic date (20250131)
+        if digits.isdigit() and len(digits) > 8:
+            return _in_range(int(timestamp))
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            raise ValueError(f"timestamp must be an ISO date/datetime or epoch milliseconds, got {timestamp!r}")
+    if not isinstance(timestamp, datetime):
+        raise ValueError(f"timestamp must be an ISO string or epoch milliseconds, got {type(timestamp).__name__}")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = timestamp - EPOCH
+    return _in_range(delta.days * MS_PER_DAY + delta.seconds * 1000 + round(delta.microseconds / 1000))
+
+
+def _in_range(ts_ms: int) -> int:
+    if not MIN_TS_MS <= ts_ms < MAX_TS_MS:
+        raise ValueError("timestamp is out of range (years 1678 to 2260)")
+    return ts_ms
+
+
+def from_epoch_ms(ts_ms: int) -> datetime:
+    return EPOCH + timedelta(milliseconds=ts_ms)
+
+
+def time_window(since=None, until=None) -> Tuple[Optional[int], Optional[int]]:
+    """[since, until) as epoch ms; either end may be None (open)"""
+    since_ms = to_epoch_ms(since) if since not in (None, "") else None
+    until_ms = to_epoch_ms(until) if until not in (None, "") else None
+    return since_ms, until_ms
+
+
+def encode_cursor(ts_ms: int, mood_id: int) -> str:
+    """Opaque keyset cursor pointing just past the (ts_ms, id) row of a page"""
+    return f"{ts_ms}.{mood_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        ts_ms, mood_id = cursor.split(".")
+        return int(ts_ms), int(mood_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+
+
+def emotion_codes(cursor: sqlite3.Cursor, names: Iterable[str]) -> Dict[str, int]:
+    """Code for each emotion name, registering names not seen before"""
+    names = sorted(set(names))
+    cursor.executemany("INSERT OR IGNORE INTO emotions (name) VALUES (?)", [(name,) for name in names])
+    placeholders = ",".join("?" * len(names))
+    return dict(cursor.execute(f"SELECT name, code FROM emotions WHERE name IN ({placeholders})", names).fetchall())
+
+
+def insert_moods(cursor: sqlite3.Cursor, rows: Iterable[Tuple[str, str, int, str, str]]) -> List[int]:
+    """Insert (user_id, emotion, intensity, timestamp, source) rows and update rollups (caller commits).
+
+    timestamp may be an ISO string, a datetime or epoch milliseconds.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    codes = emotion_codes(cursor, [row[1] for row in rows])
+    values = [(user_key(user_id), to_epoch_ms(timestamp), codes[emotion], intensity, source)
+              for user_id, emotion, intensity, timestamp, source in rows]
+    cursor.executemany("""
+    INSERT INTO moods (user_id, ts_ms, emotion_code, intensity, source)
+    VALUES (?, ?, ?, ?, ?)
+    """, values)
+    # One writer per transaction, so the AUTOINCREMENT ids of the batch are contiguous
+    last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+    first_id = last_id - len(values) + 1
+    rollups.apply_moods(cursor, [(first_id + i,) + row[:4] for i, row in enumerate(values)])
+    _bump_versions(cursor, [row[0] for row in values], first_id)
+    return list(range(first_id, last_id + 1))
+
+
+def _bump_versions(cursor: sqlite3.Cursor, user_ids: List[int], first_id: int):
+    """Advance the data version of every user written in this batch"""
+    last_ids = {}
+    for i, user_id in enumerate(user_ids):
+        last_ids[user_id] = first_id + i
+    cursor.executemany("""
+    INSERT INTO mood_versions (user_id, version, last_mood_id) VALUES (?, 1, ?)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1, last_mood_id = excluded.last_mood_id
+    """, list(last_ids.items()))
+
+
+def latest_mood_id(cursor: Union[sqlite3.Cursor, sqlite3.Connection], user_id: int) -> int:
+    """Id of the user's most recent mood (0 if none)"""
+    row = cursor.execute("SELECT last_mood_id FROM mood_versions WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def data_version(cursor: Union[sqlite3.Cursor, sqlite3.Connection], user_id: int) -> int:
+    """Current data version of a user's moods (0 before the first write)"""
+    row = cursor.execute("SELECT version FROM mood_versions WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
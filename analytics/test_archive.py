@@ -0,0 +1,92 @@
+"""
+test_archive.py
+Archived months leave the hot table but every read returns exactly what it did before
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from analytics import rollups
+from analytics.archive import archive_moods, iter_archived_rows
+from analytics.data_processing import DataProcessor
+
+START = datetime(2024, 10, 20, 8)
+NOW = datetime(2025, 3, 1)
+
+
+def _processor(tmp_path, n=400):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    processor.cache = None
+    emotions = ["happy", "sad", "anxious", "calm", "neutral"]
+    processor.insert_moods([("1", emotions[(i * 7) % 5], (i * 37) % 100,
+                             (START + timedelta(hours=9 * i)).isoformat(), ["face", "text"][i % 2])
+                            for i in range(n)])
+    processor.insert_mood("2", "calm", 10, timestamp="2024-11-02T10:00:00")
+    return processor
+
+
+def _pages(processor, **window):
+    seen, cursor = [], None
+    while True:
+        page = processor.list_moods("1", limit=37, cursor=cursor, **window)
+        seen += page["moods"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_archived_moods_read_back_transparently(tmp_path):
+    processor = _processor(tmp_path)
+    # A backdated mood, so archived ids are not in timestamp order
+    processor.insert_mood("1", "sad", 55, timestamp="2024-11-03T10:00:00")
+    full = processor.fetch_user_data("1")
+    window = processor.fetch_user_data("1", since="2024-11-15", until="2025-01-10")
+
+    result = archive_moods(processor.pool, processor.archive_dir, older_than_days=60, now=NOW)
+    assert result["rows"] > 0
+    with processor.pool.connection() as conn:
+        hot = conn.execute("SELECT COUNT(*), MIN(ts_ms) FROM moods WHERE user_id=1").fetchone()
+        months = conn.execute("SELECT month, path FROM mood_archive WHERE user_id=1 ORDER BY month").fetchall()
+    assert hot[0] < 401 and [m for m, _ in months] == ["2024-10", "2024-11", "2024-12"]
+    assert all(os.path.exists(os.path.join(processor.archive_dir, p)) for _, p in months)
+
+    assert processor.fetch_user_data("1").equals(full)
+    assert processor.fetch_user_data("1", since="2024-11-15", until="2025-01-10").equals(window)
+    assert processor.get_statistics("1")["total_entries"] == 401
+
+    # A second run with a later horizon appends to a partially archived month and replaces its file
+    archive_moods(processor.pool, processor.archive_dir, older_than_days=30, now=NOW)
+    assert processor.fetch_user_data("1").equals(full)
+    with processor.pool.connection() as conn:
+        files = os.listdir(os.path.join(processor.archive_dir, "user=1"))
+        assert sorted(files) == sorted(os.path.basename(p) for (p,) in
+                                       conn.execute("SELECT path FROM mood_archive WHERE user_id=1"))
+
+
+def test_pagination_and_reports_span_both_tiers(tmp_path):
+    processor = _processor(tmp_path)
+    pages = _pages(processor)
+    windowed = _pages(processor, since="2024-12-01", until="2025-01-15")
+    report = processor.generate_pdf_report("1").split("Generated by")[0]
+
+    archive_moods(processor.pool, processor.archive_dir, older_than_days=75, now=NOW)
+    assert _pages(processor) == pages
+    assert _pages(processor, since="2024-12-01", until="2025-01-15") == windowed
+    assert processor.generate_pdf_report("1").split("Generated by")[0] == report
+    assert processor.fetch_user_data("2").shape[0] == 1
+
+
+def test_rollup_rebuild_includes_archived_rows(tmp_path):
+    processor = _processor(tmp_path)
+    expected = processor.daily_mood_summary("1")
+    archive_moods(processor.pool, processor.archive_dir, older_than_days=60, now=NOW)
+
+    conn = sqlite3.connect(processor.db_path)
+    rollups.rebuild_rollups(conn, 1, archived=iter_archived_rows(conn, processor.archive_dir, 1))
+    conn.close()
+    assert processor.daily_mood_summary("1") == expected
@@ -0,0 +1,146 @@
+"""
+test_cache.py
+Versioned response cache: shared hits across endpoints, exact invalidation on writes, LRU/TTL eviction
+"""
+
+import time
+
+import pytest
+
+from analytics.cache import MISSING, CacheBackend, MemoryBackend, ResponseCache
+from analytics.data_processing import DataProcessor
+from analytics.ingest import MoodWriter
+
+
+def test_repeat_queries_hit_and_writes_invalidate(tmp_path):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    processor.insert_mood("1", "happy", 70)
+    processor.insert_mood("2", "sad", 20)
+
+    assert processor.emotion_frequency("1") == {"happy": 1}
+    processor.emotion_frequency("1")  # radar then pie on one page load
+    processor.get_progress_data("1")
+    stats = processor.cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+    processor.insert_mood("1", "sad", 30)
+    assert processor.emotion_frequency("1") == {"happy": 1, "sad": 1}
+    assert processor.emotion_frequency("2") == {"sad": 1}
+
+    writer = MoodWriter(processor.pool)
+    writer.submit("1", "sad", 40)
+    writer.close()
+    assert processor.emotion_frequency("1") == {"sad": 2, "happy": 1}
+    assert processor.get_statistics("1")["total_entries"] == 3
+
+
+def test_windows_are_cached_separately(tmp_path):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    processor.insert_mood("1", "happy", 70, timestamp="2025-01-01T10:00:00")
+    processor.insert_mood("1", "calm", 50, timestamp="2025-02-01T10:00:00")
+    assert processor.emotion_frequency("1", since="2025-01-15") == {"calm": 1}
+    assert processor.emotion_frequency("1") == {"happy": 1, "calm": 1}
+
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is MISSING and backend.get("a") == 1
+
+    backend.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("d") is MISSING
+
+    cache = ResponseCache(MemoryBackend(), ttl=60)
+    calls = []
+    for version in (1, 1, 2):
+        cache.get_or_compute("1", "q", {}, version, lambda: calls.append(version) or version)
+    assert calls == [1, 2]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_backends_must_implement_the_interface():
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return MISSING
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_bundle_matches_individual_routes(tmp_path, monkeypatch):
+    from flask import Flask
+    from analytics import dashboard
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    for i in range(40):
+        processor.insert_mood("1", ["happy", "sad", "calm"][i % 3], i, timestamp=f"2025-01-{1 + i % 28:02d}T09:00:00")
+    monkeypatch.setattr(dashboard, "processor", processor)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    client = app.test_client()
+
+    bundle = client.get("/api/analytics/bundle?user_id=1").get_json()["bundle"]
+    for field, path, key in [("radar", "charts/radar", "chart"), ("bar", "charts/bar", "chart"),
+                             ("pie", "charts/pie", "chart"), ("progress", "progress", "progress"),
+                             ("stats", "stats", "stats")]:
+        assert bundle[field] == client.get(f"/api/analytics/{path}?user_id=1").get_json()[key]
+
+    partial = client.get("/api/analytics/bundle?user_id=1&fields=pie,stats").get_json()["bundle"]
+    assert sorted(partial) == ["pie", "stats"]
+    assert client.get("/api/analytics/bundle?fields=radar,nope").status_code == 400
+
+
+def test_bundle_fetches_an_unaligned_window_once(tmp_path, monkeypatch):
+    from flask import Flask
+    from analytics import dashboard
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    for i in range(40):
+        processor.insert_mood("1", ["happy", "sad", "calm"][i % 3], i, timestamp=f"2025-01-{1 + i % 28:02d}T09:00:00")
+    monkeypatch.setattr(dashboard, "processor", processor)
+    fetches = []
+    fetch = processor.fetch_user_arrays
+    monkeypatch.setattr(processor, "fetch_user_arrays", lambda *args: fetches.append(args) or fetch(*args))
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    client = app.test_client()
+
+    window = "user_id=1&since=2025-01-03T12:00:00&until=2025-01-20T06:00:00"
+    bundle = client.get(f"/api/analytics/bundle?{window}").get_json()["bundle"]
+    assert len(fetches) == 1
+    for field, path, key in [("radar", "charts/radar", "chart"), ("bar", "charts/bar", "chart"),
+                             ("stats", "stats", "stats")]:
+        assert bundle[field] == client.get(f"/api/analytics/{path}?{window}").get_json()[key]
+
+
+def test_conditional_get_returns_304_until_a_write(tmp_path, monkeypatch):
+    from flask import Flask
+    from analytics import dashboard
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    processor.insert_mood("1", "happy", 70)
+    monkeypatch.setattr(dashboard, "processor", processor)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    client = app.test_client()
+
+    first = client.get("/api/analytics/stats?user_id=1")
+    etag = first.headers["ETag"]
+    lookups = processor.cache.stats()
+    again = client.get("/api/analytics/stats?user_id=1", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+    assert processor.cache.stats() == lookups  # answered before any aggregation ran
+
+    other = client.get("/api/analytics/charts/pie?user_id=1", headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+    processor.insert_mood("1", "sad", 20)
+    changed = client.get("/api/analytics/stats?user_id=1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.get_json()["stats"]["total_entries"] == 2
+    assert "ETag" not in client.get("/api/analytics/health").headers
+    report = client.get("/api/analytics/report/generate?user_id=1")
+    assert report.status_code == 200 and "ETag" not in report.headers
@@ -0,0 +1,60 @@
+"""
+test_db.py
+Pooled connections under concurrent readers and writers
+"""
+
+import threading
+
+from analytics.data_processing import DataProcessor
+from analytics.db import ConnectionPool, get_pool
+
+
+def test_pool_is_wal_and_shared_per_path(tmp_path):
+    db_path = str(tmp_path / "neurowell.db")
+    pool = get_pool(db_path)
+    assert get_pool(db_path) is pool
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_pool_never_exceeds_size(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "small.db"), size=2, checkout_timeout=0.05)
+    with pool.connection(), pool.connection():
+        try:
+            with pool.connection():
+                raise AssertionError("third checkout should time out")
+        except TimeoutError:
+            pass
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_concurrent_writes_and_reads(tmp_path):
+    processor = DataProcessor(str(tmp_path / "busy.db"))
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(50):
+                processor.insert_mood("1", "calm" if i % 2 else "happy", n + i, source="face")
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(50):
+                processor.get_statistics("1")
+                processor.get_profile("1")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert processor.get_statistics("1")["total_entries"] == 200
+    assert processor.emotion_frequency("1") == {"happy": 100, "calm": 100}
@@ -0,0 +1,109 @@
+"""
+test_import_moods.py
+Bulk mood ingestion validates events, reports rejects and keeps rollups exact
+"""
+
+import json
+
+from analytics.data_processing import DataProcessor
+from analytics.import_moods import import_file, iter_ndjson, parse_events
+
+
+def test_parse_events_reports_rejected_indexes():
+    events = [
+        {"user_id": "1", "emotion": "happy", "intensity": 70, "timestamp": "2025-01-31T09:15:00"},
+        {"user_id": "1", "emotion": "", "intensity": 10},
+        {"user_id": "abc", "emotion": "sad"},
+        "not an object",
+        {"emotion": "calm", "timestamp": "2025-02-01T10:00:00"},
+    ]
+    rows, rejected = parse_events(enumerate(events))
+    assert [row[1] for row in rows] == ["happy", "calm"]
+    assert rows[1][0] == "1" and rows[1][2] == 5 and rows[1][4] == "chat"
+    assert [r["index"] for r in rejected] == [1, 2, 3]
+
+
+def test_numeric_and_unsupported_timestamps():
+    events = [
+        {"emotion": "happy", "timestamp": 1.5e12},
+        {"emotion": "sad", "timestamp": ["2025-01-31"]},
+        {"emotion": "calm", "timestamp": 1738314900000},
+        {"emotion": "calm", "timestamp": {"iso": "2025-01-31"}},
+        {"emotion": "calm", "timestamp": True},
+        {"emotion": "calm", "timestamp": float("nan")},
+    ]
+    rows, rejected = parse_events(enumerate(events))
+    assert [row[3] for row in rows] == [1500000000000, 1738314900000]
+    assert [r["index"] for r in rejected] == [1, 3, 4, 5]
+    assert "list" in rejected[0]["error"]
+
+
+def test_import_file_batches_and_matches_snapshot(tmp_path):
+    path = tmp_path / "moods.jsonl"
+    lines = [json.dumps({"user_id": "7", "emotion": ["happy", "sad", "calm"][i % 3], "intensity": i % 100,
+                         "timestamp": f"2025-03-{1 + i % 28:02d}T12:00:00", "source": "face"})
+             for i in range(250)]
+    lines.insert(10, "{broken")
+    lines.insert(20, "")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    result = import_file(processor.pool, str(path), batch_size=64, report=lambda message: None)
+    assert result["inserted"] == 250
+    assert [r["index"] for r in result["rejected"]] == [11]
+
+    snapshot = processor.load_snapshot("7")
+    assert processor.daily_mood_summary("7") == processor.daily_mood_summary("7", snapshot)
+    assert processor.get_statistics("7") == processor.get_statistics("7", snapshot)
+
+
+def test_bulk_route_accepts_array_and_ndjson(tmp_path, monkeypatch):
+    from flask import Flask
+    from analytics import dashboard
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    monkeypatch.setattr(dashboard, "processor", processor)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    client = app.test_client()
+
+    body = client.post("/api/analytics/log_mood/bulk", json=[
+        {"user_id": "2", "emotion": "happy", "intensity": 60},
+        {"user_id": "2", "intensity": "high"},
+    ]).get_json()
+    assert body["inserted"] == 1 and body["rejected"][0]["index"] == 1
+
+    ndjson = "\n".join(json.dumps({"user_id": "2", "emotion": "sad"}) for _ in range(3))
+    body = client.post("/api/analytics/log_mood/bulk", data=ndjson,
+                       content_type="application/x-ndjson").get_json()
+    assert body == {"success": True, "inserted": 3, "rejected": []}
+    assert processor.emotion_frequency("2") == {"sad": 3, "happy": 1}
+    assert list(iter_ndjson(["", "{}"])) == [(2, {})]
+
+
+def test_out_of_range_events_are_rejected_not_fatal(tmp_path, monkeypatch):
+    from flask import Flask
+    from analytics import dashboard
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    monkeypatch.setattr(dashboard, "processor", processor)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    client = app.test_client()
+
+    bad = [{"timestamp": 1e15}, {"timestamp": -1e15}, {"timestamp": 10 ** 30}, {"intensity": 1e400},
+           {"intensity": 2 ** 63}, {"user_id": "1" * 23}, {"timestamp": "0001-01-01"}]
+    response = client.post("/api/analytics/log_mood/bulk", json=bad + [{"emotion": "calm"}])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["inserted"] == 1 and [r["index"] for r in body["rejected"]] == list(range(len(bad)))
+    assert "out of range" in body["rejected"][0]["error"] and "finite" in body["rejected"][3]["error"]
+
+    response = client.post("/api/analytics/log_mood/bulk", data="{bad", content_type="application/json")
+    assert response.status_code == 400 and "not valid JSON" in response.get_json()["error"]
+
+    path = tmp_path / "moods.jsonl"
+    path.write_text("\n".join(json.dumps(event) for event in bad + [{"emotion": "sad"}]) + "\n", encoding="utf-8")
+    result = import_file(processor.pool, str(path), report=lambda message: None)
+    assert result["inserted"] == 1 and len(result["rejected"]) == len(bad)
+    assert processor.emotion_frequency("1") == {"calm": 1, "sad": 1}
@@ -0,0 +1,87 @@
+"""
+test_ingest.py
+Write-behind mood logging batches, flushes and reports back-pressure
+"""
+
+from analytics.data_processing import DataProcessor
+from analytics.ingest import MoodWriter
+
+
+def test_writer_batches_and_flushes_on_close(tmp_path):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    writer = MoodWriter(processor.pool, batch_size=64, flush_interval=0.05)
+    writer.start()
+    for i in range(300):
+        assert writer.submit("1", "happy" if i % 3 else "sad", i % 100, "face")
+    writer.close()
+
+    stats = writer.stats()
+    assert stats["written"] == 300 and stats["failed"] == 0
+    assert stats["batches"] <= 300 // 64 + 2
+    assert processor.emotion_frequency("1") == {"happy": 200, "sad": 100}
+    assert processor.get_statistics("1") == processor.get_statistics("1", processor.load_snapshot("1"))
+
+
+def test_full_queue_reports_back_pressure(tmp_path):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    writer = MoodWriter(processor.pool, max_queue=2)
+    assert writer.submit("1", "calm", 50)
+    assert writer.submit("1", "calm", 50)
+    assert not writer.submit("1", "calm", 50)
+    assert writer.stats()["rejected"] == 1
+
+    writer.close()
+    assert processor.get_statistics("1")["total_entries"] == 2
+
+
+def test_backend_writer_migrates_an_empty_database(tmp_path, monkeypatch):
+    import sqlite3
+
+    import backend.app as backend_app
+
+    db_path = tmp_path / "fresh" / "neurowell.db"
+    monkeypatch.setattr(backend_app, "DB_PATH", str(db_path))
+    monkeypatch.setattr(backend_app, "_mood_writer", None)
+    assert backend_app.log_mood_direct("Happy", 80, "text")
+
+    writer = backend_app.get_mood_writer()
+    writer.close()
+    assert writer.stats()["written"] == 1 and writer.stats()["failed"] == 0
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM moods").fetchone()[0] == 1
+
+
+def test_one_bad_event_does_not_drop_its_batch(tmp_path, monkeypatch):
+    import sqlite3
+
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    writer = MoodWriter(processor.pool, flush_interval=0.05)
+    for _ in range(5):
+        assert writer.submit("1", "happy", 60)
+    assert not writer.submit("alice", "sad", 40)
+    assert not writer.submit("1", "sad", float("inf"))
+    # flush() without start() writes inline instead of waiting forever
+    assert writer.flush(timeout=None)
+    assert processor.emotion_frequency("1") == {"happy": 5}
+    assert writer.stats()["invalid"] == 2
+
+    # An event that slipped past validation is dropped alone
+    writer._queue.put(("bob", "sad", 40, "2025-01-01T09:00:00", "chat"))
+    writer.submit("1", "calm", 30)
+    writer.flush()
+    assert processor.emotion_frequency("1") == {"happy": 5, "calm": 1}
+    assert writer.stats()["failed"] == 1
+
+    # A transiently locked database is retried, not dropped
+    transaction, calls = processor.pool.transaction, []
+
+    def locked_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return transaction()
+
+    monkeypatch.setattr(processor.pool, "transaction", locked_once)
+    writer.submit("1", "sad", 20)
+    writer.flush()
+    assert processor.emotion_frequency("1")["sad"] == 1 and writer.stats()["failed"] == 1
@@ -0,0 +1,89 @@
+"""
+test_migrations.py
+Schema migrations are ordered, recorded and safe to re-run
+"""
+
+import sqlite3
+
+from analytics import migrations, store
+
+
+def test_fresh_database_reaches_latest(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "neurowell.db"))
+    applied = migrations.migrate(conn)
+    assert applied == [number for number, _, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(conn) == migrations.MIGRATIONS[-1][0]
+    assert migrations.migrate(conn) == []
+
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT emotion_code FROM moods WHERE user_id=? AND ts_ms>=?",
+                        (1, 1735689600000)).fetchall()
+    assert "USING INDEX" in str(plan)
+
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    conn.execute("CREATE TABLE moods (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, emotion TEXT, "
+                 "intensity INTEGER, timestamp TEXT)")
+    conn.execute("INSERT INTO moods (user_id, emotion, intensity, timestamp) VALUES ('1', 'sad', 30, '2025-03-01T10:00:00')")
+    conn.commit()
+
+    migrations.migrate(conn, target=2)
+    assert migrations.current_version(conn) == 2
+    assert conn.execute("SELECT source FROM moods").fetchone() == ("chat",)
+
+    migrations.migrate(conn)
+    assert conn.execute("SELECT count FROM mood_rollup_daily WHERE user_id=1").fetchone() == (1,)
+    row = conn.execute("SELECT m.user_id, m.ts_ms, e.name, m.source FROM moods m "
+                       "JOIN emotions e ON e.code = m.emotion_code").fetchone()
+    assert row == (1, store.to_epoch_ms("2025-03-01T10:00:00"), "sad", "chat")
+
+
+def test_v2_copy_keeps_writes_made_during_the_migration(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "busy.db"))
+    migrations.migrate(conn, target=4)
+    conn.executemany("INSERT INTO moods (user_id, emotion, intensity, timestamp, source) VALUES (?, ?, ?, ?, ?)",
+                     [("1", "happy", i, f"2025-03-{i:02d}T08:00:00", "face") for i in range(1, 21)])
+    conn.commit()
+
+    copy_batch = migrations._copy_moods_batch
+
+    def copy_while_another_process_writes(conn, low, high):
+        copy_batch(conn, low, high)
+        conn.execute("INSERT INTO moods (user_id, emotion, intensity, timestamp, source) "
+                     "VALUES ('1', 'joy', 99, '2025-03-25T08:00:00', 'text')")
+
+    monkeypatch.setattr(migrations, "_copy_moods_batch", copy_while_another_process_writes)
+    migrations._moods_v2(conn, batch_size=7)
+
+    assert "ts_ms" in migrations._columns(conn, "moods")
+    assert conn.execute("SELECT COUNT(*) FROM moods").fetchone() == (23,)
+    assert conn.execute("SELECT COUNT(*) FROM moods m JOIN emotions e ON e.code = m.emotion_code "
+                        "WHERE e.name = 'joy'").fetchone() == (3,)
+
+
+def test_non_integer_legacy_user_ids_keep_separate_data(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "names.db"))
+    conn.execute("CREATE TABLE moods (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, emotion TEXT, "
+                 "intensity INTEGER, timestamp TEXT)")
+    conn.executemany("INSERT INTO moods (user_id, emotion, intensity, timestamp) VALUES (?, 'calm', 10, ?)",
+                     [(user, "2025-03-01T08:00:00") for user in ["1", "alice", "bob", "alice"]])
+    conn.commit()
+    migrations.migrate(conn, target=4)
+
+    copy_batch = migrations._copy_moods_batch
+
+    def copy_while_another_process_writes(conn, low, high):
+        copy_batch(conn, low, high)
+        conn.execute("INSERT INTO moods (user_id, emotion, intensity, timestamp, source) "
+                     "VALUES ('carol', 'joy', 99, '2025-03-02T08:00:00', 'text')")
+
+    monkeypatch.setattr(migrations, "_copy_moods_batch", copy_while_another_process_writes)
+    migrations.migrate(conn)
+
+    keys = dict(conn.execute("SELECT name, -code FROM legacy_user_ids"))
+    assert sorted(keys) == ["alice", "bob", "carol"] and all(key < 0 for key in keys.values())
+    counts = dict(conn.execute("SELECT user_id, COUNT(*) FROM moods GROUP BY user_id"))
+    assert counts == {1: 1, keys["alice"]: 2, keys["bob"]: 1, keys["carol"]: 1}
+    rolled_up = dict(conn.execute("SELECT user_id, SUM(count) FROM mood_rollup_weekly GROUP BY user_id"))
+    assert rolled_up == {1: 1, keys["alice"]: 2, keys["bob"]: 1}
+    assert 0 not in counts
@@ -0,0 +1,52 @@
+"""
+test_numpy_engine.py
+The numpy engine returns exactly what the pandas path returns, ties included
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics.data_processing import DataProcessor
+
+METHODS = ["daily_mood_summary", "weekly_trends", "emotion_frequency", "get_statistics"]
+
+
+def _fill(processor, seed, n):
+    rng = random.Random(seed)
+    emotions = ["happy", "sad", "anxious", "calm", "neutral", "fear"][:rng.randint(2, 6)]
+    start = datetime(2023, 12, 20) + timedelta(minutes=rng.randint(0, 10000))
+    processor.insert_moods([
+        (str(rng.choice([1, 1, 2])), rng.choice(emotions), rng.randint(0, 100),
+         (start + timedelta(minutes=rng.randint(0, 60 * 24 * 400))).isoformat(), rng.choice(["face", "text"]))
+        for _ in range(n)
+    ])
+
+
+@pytest.mark.parametrize("seed,n", [(1, 1), (2, 7), (3, 60), (4, 400), (5, 2000)])
+def test_numpy_engine_matches_pandas(tmp_path, seed, n):
+    db_path = str(tmp_path / "neurowell.db")
+    pandas_engine = DataProcessor(db_path)
+    numpy_engine = DataProcessor(db_path, engine="numpy")
+    _fill(pandas_engine, seed, n)
+
+    for user_id in ("1", "2", "3"):
+        for window in ({}, {"since": "2024-03-01T06:30:00", "until": "2024-09-01"}):
+            expected = pandas_engine.load_snapshot(user_id, **window)
+            actual = numpy_engine.load_snapshot(user_id, **window)
+            for method in METHODS:
+                want = getattr(pandas_engine, method)(user_id, expected)
+                got = getattr(numpy_engine, method)(user_id, actual)
+                assert got == want, (method, user_id, window)
+                assert list(got) == list(want)
+                if isinstance(want, list):
+                    assert [list(row.items()) for row in got] == [list(row.items()) for row in want]
+                    assert [type(v) for row in got for v in row.values()] == \
+                           [type(v) for row in want for v in row.values()]
+            assert "df" not in vars(actual)
+
+
+def test_unknown_engine_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        DataProcessor(str(tmp_path / "neurowell.db"), engine="polars")
@@ -0,0 +1,93 @@
+"""
+test_rollups.py
+Rollup-backed aggregations must match the pandas snapshot path
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from analytics import rollups
+from analytics.data_processing import DataProcessor
+
+EMOTIONS = ["happy", "sad", "anxious", "calm", "neutral"]
+
+
+def make_processor(tmp_path, rows=400):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    rng = random.Random(7)
+    start = datetime(2024, 12, 20, 8)
+    for i in range(rows):
+        user_id = rng.choice(["1", "2"])
+        processor.insert_mood(user_id, rng.choice(EMOTIONS), rng.randint(1, 100),
+                              (start + timedelta(hours=5 * i)).isoformat(), rng.choice(["face", "text"]))
+    return processor
+
+
+def assert_matches_snapshot(processor, user_id):
+    snapshot = processor.load_snapshot(user_id)
+    assert processor.daily_mood_summary(user_id) == processor.daily_mood_summary(user_id, snapshot)
+    assert processor.weekly_trends(user_id) == processor.weekly_trends(user_id, snapshot)
+    freq = processor.emotion_frequency(user_id)
+    assert list(freq.items()) == list(processor.emotion_frequency(user_id, snapshot).items())
+    assert processor.get_statistics(user_id) == processor.get_statistics(user_id, snapshot)
+
+
+def test_rollups_match_snapshot(tmp_path):
+    processor = make_processor(tmp_path)
+    for user_id in ["1", "2"]:
+        assert_matches_snapshot(processor, user_id)
+    assert processor.get_statistics("3") == {}
+    assert processor.daily_mood_summary("3") == {}
+
+
+def test_rebuild_matches_incremental(tmp_path):
+    processor = make_processor(tmp_path)
+    with processor.pool.connection() as conn:
+        dump = lambda: [conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2, 3").fetchall()
+                        for t in rollups.ROLLUP_TABLES]
+        before = dump()
+        assert rollups.rebuild_rollups(conn) == 400
+        assert dump() == before
+
+
+def test_existing_database_is_backfilled(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE moods (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, emotion TEXT, "
+                 "intensity INTEGER, timestamp TEXT, source TEXT DEFAULT 'chat')")
+    conn.executemany("INSERT INTO moods (user_id, emotion, intensity, timestamp) VALUES (?, ?, ?, ?)",
+                     [("1", "sad", 40, "2025-01-01T09:00:00"), ("1", "happy", 80, "2025-01-01T10:00:00")])
+    conn.commit()
+    conn.close()
+
+    processor = DataProcessor(db_path)
+    assert processor.emotion_frequency("1") == {"sad": 1, "happy": 1}
+    assert_matches_snapshot(processor, "1")
+
+
+def test_tied_days_pick_the_same_emotion_as_the_snapshot(tmp_path):
+    # Every day has several emotions at the same count, logged out of timestamp order
+    processor = DataProcessor(str(tmp_path / "ties.db"))
+    rng = random.Random(1)
+    rows = []
+    for day in range(60):
+        for emotion in rng.sample(EMOTIONS + ["angry", "fear"], rng.randint(2, 7)):
+            for _ in range(rng.choice([1, 2])):
+                ts = datetime(2025, 10, 1, 8) + timedelta(days=day, minutes=rng.randint(0, 600))
+                rows.append(("2", emotion, rng.randint(1, 100), ts.isoformat(), "face"))
+    rng.shuffle(rows)
+    processor.insert_moods(rows)
+
+    assert_matches_snapshot(processor, "2")
+    since, until = "2025-10-08", "2025-11-20"
+    snapshot = processor.load_snapshot("2", since, until)
+    assert processor.daily_mood_summary("2", since=since, until=until) == \
+        processor.daily_mood_summary("2", snapshot)
+    assert list(processor.emotion_frequency("2", since=since, until=until).items()) == \
+        list(processor.emotion_frequency("2", snapshot).items())
+    assert [w["dominant_emotion"] for w in processor.weekly_trends("2", since=since, until=until)] == \
+        [w["dominant_emotion"] for w in processor.weekly_trends("2", snapshot)]
+    numpy_processor = DataProcessor(processor.db_path, engine="numpy")
+    assert numpy_processor.daily_mood_summary("2", numpy_processor.load_snapshot("2")) == \
+        processor.daily_mood_summary("2")
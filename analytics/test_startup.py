@@ -0,0 +1,35 @@
+"""
+test_startup.py
+Importing the services loads no models, pandas or pyarrow and opens no database
+"""
+
+import json
+import subprocess
+import sys
+
+from analytics import startup_benchmark
+
+HEAVY = ["pandas", "pyarrow", "fpdf", "transformers", "torch", "cv2", "pydub", "speech_recognition", "deepface"]
+
+
+def test_service_imports_are_lazy(tmp_path):
+    code = f"""
+import json, sys
+import backend.app, analytics.dashboard
+print(json.dumps({{
+    "loaded": [m for m in {HEAVY!r} if m in sys.modules],
+    "processor": analytics.dashboard.processor is not None,
+    "writer": backend.app._mood_writer is not None,
+}}))
+"""
+    out = subprocess.run([sys.executable, "-c", code], cwd=startup_benchmark.ROOT, capture_output=True, text=True,
+                         env={"HOME": str(tmp_path), "PATH": ""}, check=True).stdout
+    assert json.loads(out.splitlines()[-1]) == {"loaded": [], "processor": False, "writer": False}
+    assert not (tmp_path / "AppData").exists()
+
+
+def test_benchmark_reports_direct_imports():
+    result = startup_benchmark.measure("analytics.store", runs=1)
+    assert result["ok"] and result["import_ms"] > 0
+    assert "sqlite3" in [d["module"] for d in result["heaviest"]]
+    assert startup_benchmark.measure("no_such_module_xyz", runs=1)["ok"] is False
@@ -0,0 +1,61 @@
+"""
+test_stream.py
+/stream pushes committed moods as server-sent events and resumes from Last-Event-ID
+"""
+
+import json
+import threading
+
+from flask import Flask
+
+from analytics import dashboard
+from analytics.data_processing import DataProcessor
+
+
+def _client(tmp_path, monkeypatch):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    monkeypatch.setattr(dashboard, "processor", processor)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    return processor, app.test_client()
+
+
+def _next_event(chunks) -> dict:
+    for chunk in chunks:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if text.startswith("id:"):
+            fields = dict(line.split(": ", 1) for line in text.strip().splitlines())
+            return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+    raise AssertionError("stream ended")
+
+
+def test_stream_pushes_new_moods(tmp_path, monkeypatch):
+    processor, client = _client(tmp_path, monkeypatch)
+    processor.insert_mood("1", "calm", 40, timestamp="2025-03-01T08:00:00")
+
+    response = client.get("/api/analytics/stream?user_id=1", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b"retry:")
+
+    threading.Timer(0.2, processor.insert_mood, ("1", "happy", 80), {"timestamp": "2025-03-01T09:00:00"}).start()
+    event = _next_event(chunks)
+    response.close()
+
+    assert event["event"] == "moods" and [m["emotion"] for m in event["data"]["moods"]] == ["happy"]
+    assert event["data"]["frequency"] == {"calm": 1, "happy": 1}
+    assert event["data"]["daily"][0]["max_intensity"] == 80
+    assert event["id"] == processor.latest_mood_id("1")
+
+
+def test_stream_resumes_after_last_event_id(tmp_path, monkeypatch):
+    processor, client = _client(tmp_path, monkeypatch)
+    for emotion in ("sad", "calm", "happy"):
+        processor.insert_mood("1", emotion, 50)
+    processor.insert_mood("2", "angry", 50)
+    first = processor.latest_mood_id("1") - 2
+
+    response = client.get("/api/analytics/stream?user_id=1", headers={"Last-Event-ID": str(first)}, buffered=False)
+    event = _next_event(iter(response.response))
+    response.close()
+    assert [m["emotion"] for m in event["data"]["moods"]] == ["calm", "happy"]
@@ -0,0 +1,92 @@
+"""
+test_windows.py
+since/until windows and cursor pagination give the same answers as filtering the full history
+"""
+
+from datetime import datetime, timedelta
+
+from analytics.data_processing import DataProcessor
+
+START = datetime(2024, 12, 20, 8)
+
+
+def _processor(tmp_path, n=300):
+    processor = DataProcessor(str(tmp_path / "neurowell.db"))
+    emotions = ["happy", "sad", "anxious", "calm", "neutral"]
+    processor.insert_moods([("1", emotions[(i * 7) % 5], (i * 37) % 100,
+                             (START + timedelta(hours=7 * i)).isoformat(), "face")
+                            for i in range(n)])
+    return processor
+
+
+def test_day_aligned_window_matches_windowed_snapshot(tmp_path):
+    processor = _processor(tmp_path)
+    since, until = "2025-01-03", "2025-02-10"
+    snapshot = processor.load_snapshot("1", since, until)
+    assert snapshot.df["timestamp"].min() >= datetime(2025, 1, 3)
+    assert snapshot.df["timestamp"].max() < datetime(2025, 2, 10)
+
+    assert processor.daily_mood_summary("1", since=since, until=until) == processor.daily_mood_summary("1", snapshot)
+    assert processor.emotion_frequency("1", since=since, until=until) == processor.emotion_frequency("1", snapshot)
+    assert processor.get_statistics("1", since=since, until=until) == processor.get_statistics("1", snapshot)
+    windowed = processor.weekly_trends("1", since=since, until=until)
+    expected = processor.weekly_trends("1", snapshot)
+    assert [(w["week"], w["max_intensity"], w["dominant_emotion"]) for w in windowed] == \
+           [(int(w["week"]), w["max_intensity"], w["dominant_emotion"]) for w in expected]
+
+
+def test_unaligned_window_falls_back_to_raw_rows(tmp_path):
+    processor = _processor(tmp_path)
+    stats = processor.get_statistics("1", since="2025-01-01T12:30:00")
+    df = processor.fetch_user_data("1")
+    assert stats["total_entries"] == int((df["timestamp"] >= datetime(2025, 1, 1, 12, 30)).sum())
+    assert processor.get_statistics("1", since="2030-01-01") == {}
+
+
+def test_cursor_pages_walk_history_newest_first(tmp_path):
+    processor = _processor(tmp_path, n=120)
+    seen, cursor = [], None
+    while True:
+        page = processor.list_moods("1", since="2025-01-01", limit=25, cursor=cursor)
+        seen += [m["timestamp"] for m in page["moods"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    df = processor.fetch_user_data("1", since="2025-01-01")
+    assert len(seen) == len(df) and len(set(seen)) == len(seen)
+    assert seen == sorted(seen, reverse=True)
+    assert seen[-1] == df["timestamp"].min().isoformat()
+
+    with processor.pool.connection() as conn:
+        plan = " ".join(str(row) for row in conn.execute("""
+        EXPLAIN QUERY PLAN SELECT m.id FROM moods m WHERE m.user_id=? AND m.ts_ms >= ?
+        AND (m.ts_ms, m.id) < (?, ?) ORDER BY m.ts_ms DESC, m.id DESC LIMIT ?
+        """, (1, 0, 0, 0, 25)))
+    assert "idx_moods_v2_user_ts" in plan and "TEMP B-TREE" not in plan
+
+
+def test_query_parameters_accept_epoch_ms_and_reject_non_integer_users(tmp_path, monkeypatch):
+    from flask import Flask
+    from analytics import dashboard, store
+
+    processor = _processor(tmp_path)
+    monkeypatch.setattr(dashboard, "processor", processor)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard.dashboard_bp)
+    client = app.test_client()
+
+    since_ms = store.to_epoch_ms("2025-01-03")
+    by_ms = client.get(f"/api/analytics/stats?since={since_ms}").get_json()
+    by_iso = client.get("/api/analytics/stats?since=2025-01-03").get_json()
+    assert by_ms["success"] and by_ms == by_iso
+    assert client.get("/api/analytics/dashboard?since=1700000000000").status_code == 200
+
+    response = client.get("/api/analytics/stats?since=yesterday")
+    assert response.status_code == 400 and "ISO date/datetime or epoch milliseconds" in response.get_json()["error"]
+
+    for path in ["stats", "dashboard", "moods", "charts/pie", "report/generate"]:
+        response = client.get(f"/api/analytics/{path}?user_id=abc")
+        assert response.status_code == 400, path
+        assert "user_id must be an integer" in response.get_json()["error"]
+    response = client.post("/api/analytics/log_mood", json={"user_id": "abc", "emotion": "calm", "intensity": 5})
+    assert response.status_code == 400 and "user_id must be an integer" in response.get_json()["error"]
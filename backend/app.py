@@ -5,45 +5,82 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from voice_text_emotion.text import analyze_text_emotion
+from voice_text_emotion.text import (LONG_TEXT_CHARS, analyze_long_text, analyze_text_emotion, analyze_texts,
+                                     text_cache)
 from voice_text_emotion.speech import analyze_speech_emotion
+from facial_emotion.face import analyze_face_frame
 import base64
-import cv2
-import numpy as np
-import sqlite3
-from datetime import datetime
+import atexit
+import threading
 from gen_ai_chatbot.chatbot import NeuroWellAI
+from inference import pool
+from inference.registry import registry
 
 app = Flask(__name__)
 CORS(app)
 
 from analytics.dashboard import dashboard_bp
+from analytics.db import get_pool
+from analytics.ingest import MoodWriter
+from analytics.migrations import migrate
 app.register_blueprint(dashboard_bp)
 
 bot = NeuroWellAI()
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
 
 # DB stored outside project so Live Server never triggers reload
 DB_PATH = os.path.join(os.path.expanduser("~"), "AppData", "Local", "neurowell", "neurowell.db")
 
+# Moods are committed in batches by a background thread, started with the first mood and flushed on shutdown
+_mood_writer = None
+_mood_writer_lock = threading.Lock()
+
+def get_mood_writer():
+    """The shared MoodWriter, created and started on first call"""
+    global _mood_writer
+    if _mood_writer is None:
+        with _mood_writer_lock:
+            if _mood_writer is None:
+                # The writer may start before anything else touched the database: bring the schema up first
+                os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+                pool = get_pool(DB_PATH)
+                with pool.connection() as conn:
+                    migrate(conn)
+                writer = MoodWriter(pool)
+                writer.start()
+                atexit.register(writer.close)
+                _mood_writer = writer
+    return _mood_writer
+
 def log_mood_direct(emotion, intensity, source="chat"):
-    """Save mood directly to SQLite — no HTTP call needed"""
+    """Queue a mood for the background writer — no HTTP call or disk commit on the request path"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.execute(
-            "INSERT INTO moods (user_id, emotion, intensity, timestamp, source) VALUES (?,?,?,?,?)",
-            ("1", emotion.lower(), int(intensity), datetime.now().isoformat(), source)
-        )
-        conn.commit()
-        conn.close()
+        mood_writer = get_mood_writer()
+        if mood_writer.submit("1", emotion.lower(), int(intensity), source):
+            return True
+        print(f"Mood not queued (invalid or queue full), dropped {source} mood: {mood_writer.stats()}")
     except Exception as e:
         print(f"DB log error: {e}")
+    return False
 
 # Home route
 @app.route("/")
 def home():
     return "API is running"
 
+# Readiness probe: 503 while models are warming up or if one failed to load
+@app.route("/ready")
+def ready():
+    status = registry.status()
+    if pool.service is not None:
+        status["workers"] = pool.service.status()
+        status["ready"] = status["ready"] and pool.service.ready()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# Text emotion result cache: hit rate, size, evictions
+@app.route("/text_cache/stats")
+def text_cache_stats():
+    return jsonify({"success": True, "cache": text_cache.stats()})
+
 @app.route("/chat", methods=["POST"])
 def chat():
 
@@ -63,11 +100,39 @@ def analyze_text():
     data = request.get_json()
     text = data.get("text")
 
-    result = analyze_text_emotion(text)
+    # Long entries are scored window by window instead of being truncated at the model's token limit;
+    # "chunked" forces either mode, "aggregation" (mean/max/length) and "detail" apply to windows
+    chunked = data.get("chunked")
+    if chunked is None:
+        chunked = bool(text) and len(text) > LONG_TEXT_CHARS or bool(data.get("detail"))
+    try:
+        if chunked:
+            result = analyze_long_text(text, data.get("aggregation", "length"), bool(data.get("detail")))
+        else:
+            result = analyze_text_emotion(text)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     conf = float(result.get("confidence", "0.5")) * 100 if "confidence" in result else 80
     log_mood_direct(result["emotion"], int(conf), "text")
     return jsonify(result)
 
+# Batch text emotion analysis for research/audit scoring: results in input order, no moods logged
+MAX_TEXT_BATCH = 512
+
+@app.route("/analyze_text_batch", methods=["POST"])
+def analyze_text_batch():
+    data = request.get_json(silent=True) or {}
+    texts = data.get("texts")
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({"error": "texts must be a list of strings"}), 400
+    if len(texts) > MAX_TEXT_BATCH:
+        return jsonify({"error": f"At most {MAX_TEXT_BATCH} texts per request"}), 400
+
+    try:
+        return jsonify({"results": analyze_texts(texts)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 # Speech emotion analysis
 @app.route("/analyze_speech", methods=["POST"])
@@ -76,25 +141,13 @@ def analyze_speech():
     if "audio" not in request.files:
         return jsonify({"error": "No audio file provided"}), 400
 
-    audio_file = request.files["audio"]
-    save_path = "temp_audio.wav"
-
-    audio_file.save(save_path)
-
-    result = analyze_speech_emotion(save_path)
-    conf = float(result.get("confidence", "0.5")) * 100 if "confidence" in result else 80
-    log_mood_direct(result["emotion"], int(conf), "voice")
-
-    if os.path.exists(save_path):
-        os.remove(save_path)
+    # Decoded from memory: nothing is written to disk, so concurrent uploads cannot clash
+    result = analyze_speech_emotion(request.files["audio"].read())
+    if result.get("emotion"):
+        conf = float(result.get("confidence", "0.5")) * 100 if "confidence" in result else 80
+        log_mood_direct(result["emotion"], int(conf), "voice")
     return jsonify(result)
 
-try:
-    from deepface import DeepFace
-    HAS_DEEPFACE = True
-except ImportError:
-    HAS_DEEPFACE = False
-
 # Face emotion analysis
 @app.route("/analyze_face", methods=["POST"])
 def analyze_face():
@@ -104,6 +157,9 @@ def analyze_face():
         return jsonify({"error": "No image provided"}), 400
         
     try:
+        import cv2
+        import numpy as np
+
         # Decode base64 image
         encoded_data = image_data.split(',')[1] if ',' in image_data else image_data
         nparr = np.frombuffer(base64.b64decode(encoded_data), np.uint8)
@@ -112,26 +168,46 @@ def analyze_face():
         if frame is None:
             return jsonify({"emotion": "Camera Error"})
 
-        if not HAS_DEEPFACE:
-            return jsonify({"emotion": "Still installing Video Analyzer module..."})
-
-        # Use DeepFace for robust emotion detection
-        try:
-            # We set enforce_detection=False to avoid exceptions if face is not clear
-            result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-            if isinstance(result, list):
-                result = result[0]
-            emotion = result.get('dominant_emotion', 'neutral').capitalize()
-            
+        result, emotion = analyze_face_frame(frame)
+        if emotion:
             log_mood_direct(emotion.lower(), 85, "face")
-            return jsonify({"emotion": emotion})
-            
-        except Exception as e:
-            return jsonify({"emotion": "No emotion detected", "details": str(e)})
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Model lifecycle: NEUROWELL_WARMUP=0 skips loading models at startup,
+# NEUROWELL_MODEL_IDLE_SECONDS > 0 unloads models unused for that long (reloaded on the next request)
+WARMUP_MODELS = os.environ.get("NEUROWELL_WARMUP", "1") != "0"
+MODEL_IDLE_SECONDS = float(os.environ.get("NEUROWELL_MODEL_IDLE_SECONDS", "0"))
+
+# NEUROWELL_INFERENCE_WORKERS runs the models in worker processes (see inference/pool.py):
+# "auto" uses every core, "text_emotion=4,face_emotion=2" sets worker counts; unset runs them in request threads
+INFERENCE_WORKERS = os.environ.get("NEUROWELL_INFERENCE_WORKERS", "")
+INFERENCE_TASKS = {
+    "text_emotion": "voice_text_emotion.text:run_classifier",
+    "face_emotion": "facial_emotion.face:analyze_frame",
+}
+
+def start_model_services():
+    """Start inference workers if configured, warm the models this process runs and start idle eviction"""
+    if INFERENCE_WORKERS:
+        plan = pool.plan_workers(INFERENCE_WORKERS, INFERENCE_TASKS)
+        pool.start(plan)
+        atexit.register(pool.stop)
+        for model, spec in plan.items():
+            print(f"Inference: {spec.workers} {model} workers x {spec.threads} threads")
+    pooled = pool.service.plan if pool.service is not None else {}
+    # The tokenizer is loaded on its own only when the text model runs in workers
+    local_models = [name for name in registry.names()
+                    if name not in pooled and (name != "text_tokenizer" or "text_emotion" in pooled)]
+    if MODEL_IDLE_SECONDS > 0:
+        registry.idle_ttl = MODEL_IDLE_SECONDS
+        registry.start_reaper(interval=min(60.0, MODEL_IDLE_SECONDS / 2))
+    if WARMUP_MODELS:
+        registry.warmup(local_models, background=True)
+
 if __name__ == "__main__":
+    start_model_services()
     app.run(debug=True, use_reloader=False)
\ No newline at end of file
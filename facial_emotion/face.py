@@ -0,0 +1,80 @@
+"""
+face.py
+Purpose: Face emotion analysis of decoded frames with DeepFace, loaded through the model registry
+Integrated with: backend/app.py (/analyze_face), inference/pool.py (face_emotion workers)
+
+DeepFace (and TensorFlow behind it) is imported by the registry loader, not at
+module import. analyze_face_frame() runs the model in this process, or in a
+face_emotion inference worker when the backend started a pool (the frame then
+travels through shared memory).
+"""
+
+import importlib.util
+import sys
+
+from inference import pool
+from inference.registry import registry
+
+HAS_DEEPFACE = importlib.util.find_spec("deepface") is not None
+
+STILL_INSTALLING = "Still installing Video Analyzer module..."
+
+
+def _load_face_model():
+    from deepface import DeepFace
+    return DeepFace
+
+
+def _warm_face_model(DeepFace):
+    """Run the emotion model once on a blank frame so its weights are built before the first request"""
+    import numpy as np
+    DeepFace.analyze(np.zeros((48, 48, 3), dtype=np.uint8), actions=['emotion'], enforce_detection=False)
+
+
+def _unload_face_model(DeepFace):
+    """DeepFace memoises built models in a module-level dict; clear it so eviction frees the weights"""
+    modeling = sys.modules.get("deepface.modules.modeling")
+    cached = getattr(modeling, "cached_models", None)
+    if isinstance(cached, dict):
+        cached.clear()
+    tf = sys.modules.get("tensorflow")
+    if tf is not None:
+        tf.keras.backend.clear_session()
+
+
+registry.register("face_emotion", _load_face_model, warmup=_warm_face_model, unload=_unload_face_model)
+
+
+def get_deepface():
+    """The DeepFace class, or None if it is not installed"""
+    if not HAS_DEEPFACE:
+        return None
+    try:
+        return registry.get("face_emotion")
+    except ImportError:
+        return None
+
+
+def analyze_frame(frame):
+    """(response, detected emotion or None) for one BGR frame"""
+    if get_deepface() is None:
+        return {"emotion": STILL_INSTALLING}, None
+
+    # Use DeepFace for robust emotion detection; the lease stops idle eviction clearing its models mid-call
+    try:
+        with registry.lease("face_emotion") as DeepFace:
+            # We set enforce_detection=False to avoid exceptions if face is not clear
+            result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
+        if isinstance(result, list):
+            result = result[0]
+        emotion = result.get('dominant_emotion', 'neutral').capitalize()
+        return {"emotion": emotion}, emotion
+    except Exception as e:
+        return {"emotion": "No emotion detected", "details": str(e)}, None
+
+
+def analyze_face_frame(frame):
+    """analyze_frame here, or in an inference worker process when the backend started a pool"""
+    if pool.service is not None and pool.service.serves("face_emotion"):
+        return pool.service.run("face_emotion", frame)
+    return analyze_frame(frame)
@@ -74,6 +74,7 @@ function showPage(id) {
   document.getElementById(id).classList.add("active");
   if (id === "dashboard") {
       loadDashboard();
+      startMoodStream();
   }
 }
 
@@ -133,18 +134,22 @@ let radarChart, barChart, pieChart;
 
 async function loadDashboard() {
     try {
-        const radarRes = await fetch("http://127.0.0.1:5000/api/analytics/charts/radar?user_id=1");
-        const radarData = await radarRes.json();
+        // One request for every dashboard payload instead of radar/bar/pie/progress separately
+        const bundleRes = await fetch("http://127.0.0.1:5000/api/analytics/bundle?user_id=1&fields=radar,bar,pie,progress");
+        const bundleData = await bundleRes.json();
+        if (!bundleData.success) return;
+        const bundle = bundleData.bundle;
+
         const radarCtx=document.getElementById("emotionRadar");
-        if(radarCtx && radarData.success) {
+        if(radarCtx && bundle.radar) {
             if (radarChart) radarChart.destroy();
             radarChart = new Chart(radarCtx,{
                 type:"radar",
                 data:{
-                    labels:radarData.chart.labels,
+                    labels:bundle.radar.labels,
                     datasets:[{
                         label:"Mood Count",
-                        data:radarData.chart.data,
+                        data:bundle.radar.data,
                         backgroundColor:"rgba(255, 159, 67, 0.4)",
                         borderColor:"#FF9F43",
                         pointBackgroundColor: "#FF4C60",
@@ -158,18 +163,16 @@ async function loadDashboard() {
             });
         }
 
-        const barRes = await fetch("http://127.0.0.1:5000/api/analytics/charts/bar?user_id=1");
-        const barData = await barRes.json();
         const barCtx=document.getElementById("moodBar");
-        if(barCtx && barData.success) {
+        if(barCtx && bundle.bar) {
             if (barChart) barChart.destroy();
             barChart = new Chart(barCtx,{
                 type:"bar",
                 data:{
-                    labels:barData.chart.labels,
+                    labels:bundle.bar.labels,
                     datasets:[{
                         label:"Intensity",
-                        data:barData.chart.data,
+                        data:bundle.bar.data,
                         backgroundColor:["#FF4C60", "#FF9F43", "#F7D046", "#00E2C2", "#2cb67d", "#7B61FF", "#00D2FF"]
                     }]
                 },
@@ -183,17 +186,15 @@ async function loadDashboard() {
             });
         }
 
-        const pieRes = await fetch("http://127.0.0.1:5000/api/analytics/charts/pie?user_id=1");
-        const pieData = await pieRes.json();
         const pieCtx=document.getElementById("moodPie");
-        if(pieCtx && pieData.success) {
+        if(pieCtx && bundle.pie) {
             if (pieChart) pieChart.destroy();
             pieChart = new Chart(pieCtx,{
                 type:"pie",
                 data:{
-                    labels:pieData.chart.map(d=>d.emotion),
+                    labels:bundle.pie.map(d=>d.emotion),
                     datasets:[{
-                        data:pieData.chart.map(d=>d.count),
+                        data:bundle.pie.map(d=>d.count),
                         backgroundColor:["#FF4C60", "#FF9F43", "#F7D046", "#00E2C2", "#7B61FF"],
                         borderWidth: 0
                     }]
@@ -204,30 +205,54 @@ async function loadDashboard() {
             });
         }
 
-        const progRes = await fetch("http://127.0.0.1:5000/api/analytics/progress?user_id=1");
-        const progData = await progRes.json();
-        if (progData.success) {
-            const containers = document.querySelectorAll("#dashboard .floating-card");
-            if (containers.length >= 4) {
-                const container = containers[3];
-                let html = '<h2>💚 Mood Progress</h2>';
-                const colorMap = {"happy": "#FF9F43", "calm": "#00E2C2", "anxious": "#FF4C60", "sad": "#7B61FF", "stress": "#F7D046", "neutral": "#2cb67d"};
-                for (const [emotion, info] of Object.entries(progData.progress)) {
-                    const barColor = colorMap[emotion] || "#00D2FF";
-                    html += `
-                    <div class="progress-bar">
-                      <span style="font-weight: bold; margin-bottom: 8px;">${info.label}</span>
-                      <div class="progress"><div class="fill" style="width:${info.width}%; background-color: ${barColor};"></div></div>
-                    </div>`;
-                }
-                container.innerHTML = html;
-            }
-        }
+        if (bundle.progress) renderProgress(bundle.progress);
     } catch (e) {
         console.error("Dashboard load error", e);
     }
 }
 
+function renderProgress(progress) {
+    const containers = document.querySelectorAll("#dashboard .floating-card");
+    if (containers.length >= 4) {
+        const container = containers[3];
+        let html = '<h2>💚 Mood Progress</h2>';
+        const colorMap = {"happy": "#FF9F43", "calm": "#00E2C2", "anxious": "#FF4C60", "sad": "#7B61FF", "stress": "#F7D046", "neutral": "#2cb67d"};
+        for (const [emotion, info] of Object.entries(progress)) {
+            const barColor = colorMap[emotion] || "#00D2FF";
+            html += `
+            <div class="progress-bar">
+              <span style="font-weight: bold; margin-bottom: 8px;">${info.label}</span>
+              <div class="progress"><div class="fill" style="width:${info.width}%; background-color: ${barColor};"></div></div>
+            </div>`;
+        }
+        container.innerHTML = html;
+    }
+}
+
+// LIVE UPDATES (server-sent events; the browser reconnects with Last-Event-ID on its own)
+let moodStream;
+
+function startMoodStream() {
+    if (moodStream || !window.EventSource) return;
+    moodStream = new EventSource("http://127.0.0.1:5000/api/analytics/stream?user_id=1");
+    moodStream.addEventListener("moods", (e) => {
+        const delta = JSON.parse(e.data);
+        const labels = Object.keys(delta.frequency);
+        const counts = Object.values(delta.frequency);
+        if (radarChart) {
+            radarChart.data.labels = labels;
+            radarChart.data.datasets[0].data = counts;
+            radarChart.update();
+        }
+        if (pieChart) {
+            pieChart.data.labels = labels;
+            pieChart.data.datasets[0].data = counts;
+            pieChart.update();
+        }
+        renderProgress(delta.progress);
+    });
+}
+
 // ANALYZER
 // -----------------------
 // ANALYZER FUNCTIONS
@@ -0,0 +1,8 @@
+"""
+inference package initialization
+Model lifecycle and execution helpers shared by the backend's ML endpoints
+"""
+
+from .registry import ModelRegistry, registry
+
+__all__ = ['ModelRegistry', 'registry']
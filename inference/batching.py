@@ -0,0 +1,149 @@
+"""
+batching.py
+Purpose: Dynamic micro-batching: concurrent single-item calls share one batched model call
+Integrated with: voice_text_emotion/text.py (text emotion classifier)
+
+Callers submit() one item and block until its own result is ready. A worker
+thread groups waiting items by bucket (for text: padded token length, so a
+batch pads to similar lengths) and runs fn on a bucket once it holds
+max_batch items or its oldest item has waited max_wait_ms. fn receives a list
+of items and must return one result per item, in order; if it raises, every
+caller in that batch gets the exception. fn may instead return a Future of
+that list (e.g. work handed to an inference pool): the worker then moves on to
+the next batch at once, so several batches can be in flight together.
+
+A lone request waits at most max_wait_ms extra; under load batches fill up
+before the deadline and that wait disappears.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# "No bucket is due" (None is a valid bucket key)
+_NOT_DUE = object()
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued")
+
+    def __init__(self, item: Any, future: Future, enqueued: float):
+        self.item = item
+        self.future = future
+        self.enqueued = enqueued
+
+
+class MicroBatcher:
+    """Collects concurrent submit() calls into per-bucket batches for fn"""
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 16, max_wait_ms: float = 5.0,
+                 bucket: Callable[[Any], Hashable] = None, name: str = "micro-batcher"):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.bucket = bucket
+        self.name = name
+        self._buckets: Dict[Hashable, List[_Pending]] = {}
+        self._changed = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._stats = {"items": 0, "batches": 0, "failed_batches": 0, "max_batch_seen": 0}
+
+    def submit(self, item: Any, timeout: float = None) -> Any:
+        """Result of fn for this item, computed in a shared batch"""
+        return self.submit_async(item).result(timeout)
+
+    def submit_async(self, item: Any) -> Future:
+        # The bucket key is computed on the caller's thread so e.g. tokenization runs in parallel
+        key = self.bucket(item) if self.bucket is not None else None
+        future = Future()
+        with self._changed:
+            if self._stopping:
+                raise RuntimeError(f"{self.name} is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._buckets.setdefault(key, []).append(_Pending(item, future, time.monotonic()))
+            self._changed.notify()
+        return future
+
+    def close(self, timeout: float = 10.0):
+        """Run whatever is still waiting, then stop the worker"""
+        with self._changed:
+            self._stopping = True
+            self._changed.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            stats = dict(self._stats)
+            stats["waiting"] = sum(len(pending) for pending in self._buckets.values())
+        stats["mean_batch"] = stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    # -------------------- WORKER --------------------
+
+    def _run(self):
+        while True:
+            with self._changed:
+                batch = self._next_batch()
+            if batch is None:
+                return
+            self._execute(batch)
+
+    def _next_batch(self) -> Optional[List[_Pending]]:
+        """Block (holding _changed) until some bucket is full or past its deadline; None once closed and drained"""
+        while True:
+            now = time.monotonic()
+            due, next_deadline = _NOT_DUE, None
+            # Buckets are in creation order, so the first due one holds the oldest waiting items
+            for key, pending in self._buckets.items():
+                deadline = pending[0].enqueued + self.max_wait
+                if len(pending) >= self.max_batch or deadline <= now or self._stopping:
+                    due = key
+                    break
+                next_deadline = deadline if next_deadline is None else min(next_deadline, deadline)
+            if due is not _NOT_DUE:
+                pending = self._buckets[due]
+                if len(pending) > self.max_batch:
+                    self._buckets[due] = pending[self.max_batch:]
+                else:
+                    del self._buckets[due]
+                return pending[:self.max_batch]
+            if self._stopping:
+                return None
+            self._changed.wait(None if next_deadline is None else next_deadline - now)
+
+    def _execute(self, batch: List[_Pending]):
+        try:
+            results = self.fn([pending.item for pending in batch])
+        except BaseException as e:
+            self._complete(batch, error=e)
+            return
+        if isinstance(results, Future):
+            results.add_done_callback(lambda done: self._resolve(batch, done))
+        else:
+            self._complete(batch, results)
+
+    def _resolve(self, batch: List[_Pending], done: Future):
+        error = done.exception()
+        self._complete(batch, None if error else done.result(), error)
+
+    def _complete(self, batch: List[_Pending], results: List[Any] = None, error: BaseException = None):
+        if error is None and len(results) != len(batch):
+            error = RuntimeError(f"{self.name}: batch of {len(batch)} returned {len(results)} results")
+        if error is not None:
+            with self._changed:
+                self._stats["failed_batches"] += 1
+            for pending in batch:
+                pending.future.set_exception(error)
+            return
+        with self._changed:
+            self._stats["items"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+        for pending, result in zip(batch, results):
+            pending.future.set_result(result)
@@ -0,0 +1,353 @@
+"""
+pool.py
+Purpose: Process-pool inference service: models run in worker processes, request threads only dispatch and wait
+Integrated with: voice_text_emotion/text.py, facial_emotion/face.py (dispatch), backend/app.py (start, /ready)
+
+Each model gets its own group of spawned worker processes that pull from that
+model's request queue, so a burst of face requests never queues ahead of text
+requests. Every worker runs with a fixed thread budget (OMP/MKL/torch and
+NEUROWELL_TEXT_THREADS) and, where the OS allows, is pinned to its own set of
+cores; the plan never hands out more threads than there are cores. NumPy
+arrays in the arguments (decoded images) travel through shared memory instead
+of being pickled through the queue.
+
+Workers load and warm their model before reporting ready, and record the id
+of the request they are running in shared memory. Every LIVENESS_INTERVAL the
+collector restarts dead workers, failing the request each one held, and
+expires requests nobody answered within their timeout, so abandoned Futures
+never pin shared memory or the in_flight count.
+
+Configure with NEUROWELL_INFERENCE_WORKERS:
+    ""                                   models run in the request threads (default)
+    "auto"                               all cores, split evenly across models, 4 threads per worker
+    "text_emotion=4,face_emotion=2"      explicit worker counts; threads = cores // total workers
+"""
+
+import importlib
+import itertools
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+# Arrays at least this large go through shared memory
+SHM_MIN_BYTES = 64 * 1024
+AUTO_THREADS_PER_WORKER = 4
+# How long run() (and callers waiting on submit() Futures) wait for a worker
+REQUEST_TIMEOUT = 120.0
+LIVENESS_INTERVAL = 1.0  # seconds between dead-worker / expired-request sweeps
+
+# Started by backend/app.py when NEUROWELL_INFERENCE_WORKERS is set; None means run inline
+service = None
+
+
+class WorkerSpec:
+    """How one model is served: the task to run ("module:function"), worker count and threads per worker"""
+
+    def __init__(self, task: str, workers: int, threads: int):
+        self.task = task
+        self.workers = workers
+        self.threads = threads
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_workers(spec: str, tasks: Dict[str, str], cores: int = None) -> Dict[str, WorkerSpec]:
+    """WorkerSpecs for a NEUROWELL_INFERENCE_WORKERS value; workers x threads never exceeds cores"""
+    cores = cores or len(available_cores())
+    spec = (spec or "").strip()
+    if not spec:
+        return {}
+    if spec == "auto":
+        threads = min(AUTO_THREADS_PER_WORKER, max(1, cores // len(tasks)))
+        per_model = max(1, cores // (len(tasks) * threads))
+        return {model: WorkerSpec(task, per_model, threads) for model, task in tasks.items()}
+
+    counts = {}
+    for part in spec.split(","):
+        model, _, count = part.partition("=")
+        model = model.strip()
+        if model not in tasks:
+            raise ValueError(f"Unknown model in NEUROWELL_INFERENCE_WORKERS: {model!r}")
+        counts[model] = int(count)
+    total = sum(counts.values())
+    threads = max(1, cores // total) if total else 1
+    return {model: WorkerSpec(tasks[model], n, threads) for model, n in counts.items() if n > 0}
+
+
+# -------------------- SHARED MEMORY --------------------
+
+def _share(args: Tuple) -> Tuple[Tuple, List[Any]]:
+    """Replace large ndarrays by shared-memory descriptors; returns the new args and the segments to unlink"""
+    np = sys.modules.get("numpy")
+    if np is None:
+        return args, []
+    from multiprocessing import shared_memory
+
+    shared, segments = [], []
+    for arg in args:
+        if isinstance(arg, np.ndarray) and arg.nbytes >= SHM_MIN_BYTES:
+            segment = shared_memory.SharedMemory(create=True, size=arg.nbytes)
+            np.ndarray(arg.shape, dtype=arg.dtype, buffer=segment.buf)[...] = arg
+            shared.append(("__shm__", segment.name, arg.shape, arg.dtype.str))
+            segments.append(segment)
+        else:
+            shared.append(arg)
+    return tuple(shared), segments
+
+
+def _attach(args: Tuple) -> Tuple[Tuple, List[Any]]:
+    """Inverse of _share in the worker: ndarray views onto the shared segments"""
+    attached, segments = [], []
+    for arg in args:
+        if isinstance(arg, tuple) and len(arg) == 4 and arg[0] == "__shm__":
+            import numpy as np
+            from multiprocessing import shared_memory
+            segment = shared_memory.SharedMemory(name=arg[1])
+            attached.append(np.ndarray(arg[2], dtype=np.dtype(arg[3]), buffer=segment.buf))
+            segments.append(segment)
+        else:
+            attached.append(arg)
+    return tuple(attached), segments
+
+
+# -------------------- WORKER PROCESS --------------------
+
+def _worker_main(model: str, task: str, threads: int, cores: List[int], requests, results, current):
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NEUROWELL_TEXT_THREADS"):
+        os.environ[name] = str(threads)
+    if cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError:
+            pass
+
+    module_name, _, func_name = task.partition(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    from inference.registry import registry
+    if model in registry.names():
+        registry.warmup([model])
+    results.put(("ready", model, os.getpid()))
+
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+        request_id, args = item
+        # Written straight to shared memory: survives a crash that loses queued messages
+        current.value = request_id
+        segments = []
+        try:
+            args, segments = _attach(args)
+            results.put(("result", request_id, True, func(*args)))
+        except Exception as e:
+            results.put(("result", request_id, False, f"{type(e).__name__}: {e}"))
+        finally:
+            del args
+            for segment in segments:
+                segment.close()
+
+
+# -------------------- SERVICE --------------------
+
+class InferenceService:
+    """Per-model worker process groups with request queues, awaited through Futures"""
+
+    def __init__(self, plan: Dict[str, WorkerSpec], pin: bool = True):
+        import multiprocessing
+        self.plan = plan
+        self.pin = pin
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._requests = {model: self._ctx.Queue() for model in plan}
+        self._workers: Dict[str, List[Any]] = {model: [] for model in plan}
+        self._ready: Dict[str, set] = {model: set() for model in plan}
+        # request id -> (future, shared segments, model, expiry)
+        self._pending: Dict[int, Tuple[Future, List[Any], str, float]] = {}
+        # Last request id each worker took, -1 before its first
+        self._current: Dict[Tuple[str, int], Any] = {}
+        self._in_flight = {model: 0 for model in plan}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+        self._stopping = False
+        self._core_blocks = self._assign_cores()
+
+    def _assign_cores(self) -> Dict[Tuple[str, int], List[int]]:
+        """A disjoint block of cores per worker, while there are enough cores for everyone's threads"""
+        cores, blocks, offset = available_cores(), {}, 0
+        for model, spec in self.plan.items():
+            for i in range(spec.workers):
+                block = cores[offset:offset + spec.threads]
+                blocks[(model, i)] = block if self.pin and len(block) == spec.threads else []
+                offset += spec.threads
+        return blocks
+
+    def serves(self, model: str) -> bool:
+        return model in self.plan and not self._stopping
+
+    def start(self):
+        for model, spec in self.plan.items():
+            for i in range(spec.workers):
+                self._workers[model].append(self._spawn(model, i))
+        self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, model: str, index: int):
+        spec = self.plan[model]
+        current = self._current[(model, index)] = self._ctx.Value("q", -1, lock=False)
+        process = self._ctx.Process(
+            target=_worker_main, name=f"inference-{model}-{index}", daemon=True,
+            args=(model, spec.task, spec.threads, self._core_blocks[(model, index)], self._requests[model],
+                  self._results, current))
+        process.start()
+        return process
+
+    def submit(self, model: str, *args, timeout: float = REQUEST_TIMEOUT) -> Future:
+        """Queue one call of the model's task; the Future resolves with its return value, or fails once the
+        worker running it dies or timeout seconds pass"""
+        if not self.serves(model):
+            raise RuntimeError(f"No inference workers for {model}")
+        shared, segments = _share(args)
+        future = Future()
+        request_id = future.request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (future, segments, model, time.monotonic() + timeout)
+            self._in_flight[model] += 1
+        try:
+            self._requests[model].put((request_id, shared))
+        except Exception:
+            self._finish(request_id)
+            raise
+        return future
+
+    def run(self, model: str, *args, timeout: float = REQUEST_TIMEOUT) -> Any:
+        """submit() and wait; raises RuntimeError with the worker's error if the task failed"""
+        future = self.submit(model, *args, timeout=timeout)
+        try:
+            return future.result(timeout)
+        finally:
+            if not future.done():
+                self._finish(future.request_id)
+
+    def _finish(self, request_id: int):
+        """Forget a request and free its shared memory"""
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is not None:
+                self._in_flight[entry[2]] -= 1
+        if entry is not None:
+            for segment in entry[1]:
+                segment.close()
+                segment.unlink()
+        return entry
+
+    def _collect(self):
+        # Sweeps run on their own clock: a busy results queue must not keep a crashed model group down
+        next_sweep = time.monotonic() + LIVENESS_INTERVAL
+        while not self._stopping:
+            try:
+                message = self._results.get(timeout=max(0.0, next_sweep - time.monotonic()))
+            except queue.Empty:
+                message = None
+            if message is not None:
+                self._handle(message)
+            if time.monotonic() >= next_sweep:
+                self._restart_dead()
+                self._expire()
+                next_sweep = time.monotonic() + LIVENESS_INTERVAL
+
+    def _handle(self, message: Tuple):
+        if message[0] == "ready":
+            with self._lock:
+                self._ready[message[1]].add(message[2])
+            return
+        _, request_id, ok, value = message
+        entry = self._finish(request_id)
+        if entry is None:
+            return
+        if ok:
+            entry[0].set_result(value)
+        else:
+            entry[0].set_exception(RuntimeError(value))
+
+    def _fail(self, request_ids: List[int], error: str):
+        for request_id in request_ids:
+            entry = self._finish(request_id)
+            if entry is not None and not entry[0].done():
+                entry[0].set_exception(RuntimeError(error))
+
+    def _restart_dead(self):
+        for model, processes in self._workers.items():
+            for i, process in enumerate(processes):
+                if not process.is_alive() and not self._stopping:
+                    print(f"Inference worker {process.name} exited ({process.exitcode}), restarting")
+                    with self._lock:
+                        self._ready[model].discard(process.pid)
+                    # Its last request is either answered already (a no-op here) or lost with it
+                    held = self._current[(model, i)].value
+                    error = f"Inference worker {process.name} exited ({process.exitcode})"
+                    self._fail([held] if held >= 0 else [], error)
+                    processes[i] = self._spawn(model, i)
+
+    def _expire(self):
+        """Fail requests past their timeout, including ones whose caller already gave up"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [request_id for request_id, entry in self._pending.items() if entry[3] <= now]
+        self._fail(expired, "Inference request timed out")
+
+    def ready(self) -> bool:
+        with self._lock:
+            return all(len(self._ready[model]) >= 1 for model in self.plan)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                model: {
+                    "workers": spec.workers,
+                    "threads_per_worker": spec.threads,
+                    "alive": sum(p.is_alive() for p in self._workers[model]),
+                    "ready": len(self._ready[model]),
+                    "in_flight": self._in_flight[model],
+                    "cores": [self._core_blocks[(model, i)] for i in range(spec.workers)],
+                }
+                for model, spec in self.plan.items()
+            }
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping = True
+        for model, processes in self._workers.items():
+            for _ in processes:
+                self._requests[model].put(None)
+        deadline = time.monotonic() + timeout
+        for processes in self._workers.values():
+            for process in processes:
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+        with self._lock:
+            pending = list(self._pending)
+        self._fail(pending, "Inference service stopped")
+
+
+def start(plan: Dict[str, WorkerSpec]) -> InferenceService:
+    """Start the process-wide service that text.py and face.py dispatch to"""
+    global service
+    service = InferenceService(plan)
+    service.start()
+    return service
+
+
+def stop():
+    global service
+    if service is not None:
+        service.stop()
+        service = None
@@ -0,0 +1,252 @@
+"""
+registry.py
+Purpose: One place that loads, warms up, reports and evicts the backend's ML models
+Integrated with: voice_text_emotion/text.py (text_emotion), backend/app.py (face_emotion, /ready)
+
+Each model is registered with a loader (import + build) and an optional warmup
+(one throwaway inference, so graph building and lazy weight loading happen
+before the first user request). get() loads on first use; warmup() loads ahead
+of time, usually from a background thread at startup. Models idle for longer
+than their idle_ttl are dropped by evict_idle() (or the reaper thread) and
+reloaded by the next get(). Callers that run a model hold it with lease(), and
+a leased model is never evicted, so an unload hook cannot tear down state an
+in-flight call is using.
+
+Resident memory is the process RSS; the per-model figure is the RSS growth
+measured across its load and warmup, so it is an estimate.
+"""
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+UNAVAILABLE = "unavailable"   # its package is not installed
+FAILED = "failed"
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+class ModelEntry:
+    """Load state of one registered model"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: Callable[[Any], Any] = None,
+                 unload: Callable[[Any], Any] = None, idle_ttl: float = None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.unload = unload
+        self.idle_ttl = idle_ttl
+        self.model = None
+        self.state = UNLOADED
+        self.error = None
+        self.load_seconds = None
+        self.rss_bytes = None
+        self.loads = 0
+        self.last_used = None
+        self.leases = 0
+        self.lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "rss_bytes": self.rss_bytes,
+            "loads": self.loads,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1) if self.last_used else None,
+            "idle_ttl": self.idle_ttl,
+            "in_use": self.leases,
+        }
+
+
+class ModelRegistry:
+    """Named models with on-demand loading, warmup, readiness and idle eviction"""
+
+    def __init__(self, idle_ttl: float = None):
+        self.idle_ttl = idle_ttl
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._warming = 0
+        self._reaper = None
+        self._stopping = threading.Event()
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Callable[[Any], Any] = None,
+                 unload: Callable[[Any], Any] = None, idle_ttl: float = None):
+        """Add (or replace) a model; nothing is loaded until get() or warmup()"""
+        with self._lock:
+            self._entries[name] = ModelEntry(name, loader, warmup, unload, idle_ttl)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def _entry(self, name: str) -> ModelEntry:
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model: {name}")
+        return entry
+
+    def get(self, name: str) -> Any:
+        """The loaded model, loading (and warming) it first if needed; raises what the loader raised.
+
+        The reference is not protected from evict(): run the model inside lease() instead.
+        """
+        entry = self._entry(name)
+        entry.last_used = time.monotonic()
+        model = entry.model
+        if model is not None:
+            return model
+        with entry.lock:
+            if entry.model is None:
+                self._load(entry)
+            return entry.model
+
+    @contextmanager
+    def lease(self, name: str):
+        """get() for the length of a with block; evict() skips the model until every lease has ended"""
+        entry = self._entry(name)
+        with entry.lock:
+            if entry.model is None:
+                self._load(entry)
+            entry.leases += 1
+            model = entry.model
+        try:
+            yield model
+        finally:
+            with entry.lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    def _load(self, entry: ModelEntry):
+        """Run loader and warmup under entry.lock, recording state, timing and RSS growth"""
+        entry.state, entry.error = LOADING, None
+        rss_before = process_rss_bytes()
+        start = time.perf_counter()
+        try:
+            model = entry.loader()
+            if entry.warmup is not None:
+                entry.warmup(model)
+        except ImportError as e:
+            entry.state, entry.error = UNAVAILABLE, str(e)
+            raise
+        except Exception as e:
+            entry.state, entry.error = FAILED, str(e)
+            raise
+        rss_after = process_rss_bytes()
+        entry.load_seconds = round(time.perf_counter() - start, 3)
+        entry.rss_bytes = max(rss_after - rss_before, 0) if rss_before is not None and rss_after is not None else None
+        entry.model, entry.state = model, READY
+        entry.loads += 1
+        entry.last_used = time.monotonic()
+
+    def warmup(self, names: Iterable[str] = None, background: bool = False) -> Optional[threading.Thread]:
+        """Load and warm the named models (default: all); failures are recorded in status(), not raised"""
+        names = list(names) if names is not None else self.names()
+        with self._lock:
+            self._warming += 1
+
+        def run():
+            try:
+                for name in names:
+                    try:
+                        self.get(name)
+                    except Exception as e:
+                        print(f"Model warmup failed for {name}: {e}")
+            finally:
+                with self._lock:
+                    self._warming -= 1
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self, name: str) -> bool:
+        """Drop a loaded model so its memory can be reclaimed; the next get() reloads it. A leased model is kept."""
+        entry = self._entry(name)
+        with entry.lock:
+            model = entry.model
+            if model is None or entry.leases:
+                return False
+            entry.model, entry.state, entry.rss_bytes = None, UNLOADED, None
+            if entry.unload is not None:
+                try:
+                    entry.unload(model)
+                except Exception as e:
+                    print(f"Model unload error for {name}: {e}")
+            del model
+        gc.collect()
+        return True
+
+    def evict_idle(self, now: float = None) -> List[str]:
+        """Evict every loaded model unused for longer than its idle_ttl; returns their names"""
+        now = time.monotonic() if now is None else now
+        evicted = []
+        for name in self.names():
+            entry = self._entry(name)
+            ttl = entry.idle_ttl if entry.idle_ttl is not None else self.idle_ttl
+            if ttl and entry.model is not None and now - entry.last_used > ttl:
+                if self.evict(name):
+                    evicted.append(name)
+        return evicted
+
+    def start_reaper(self, interval: float = 60.0):
+        """Background thread calling evict_idle() every interval seconds (idempotent)"""
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._stopping.clear()
+            self._reaper = threading.Thread(target=self._reap, args=(interval,), name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self, interval: float):
+        while not self._stopping.wait(interval):
+            for name in self.evict_idle():
+                print(f"Evicted idle model {name}")
+
+    def stop(self):
+        self._stopping.set()
+
+    def ready(self) -> bool:
+        """No warmup in progress and no model failed to load (missing optional packages don't count)"""
+        with self._lock:
+            if self._warming:
+                return False
+            entries = list(self._entries.values())
+        return all(entry.state != FAILED and entry.state != LOADING for entry in entries)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries.values())
+            warming = self._warming > 0
+        return {
+            "ready": self.ready(),
+            "warming": warming,
+            "process_rss_bytes": process_rss_bytes(),
+            "models": {entry.name: entry.status() for entry in entries},
+        }
+
+
+# Process-wide registry used by the backend
+registry = ModelRegistry()
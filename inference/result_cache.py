@@ -0,0 +1,132 @@
+"""
+result_cache.py
+Purpose: Content-addressed LRU cache for model results, optionally persisted in SQLite
+Integrated with: voice_text_emotion/text.py (text emotion results), backend/app.py (/text_cache/stats)
+
+Keys are sha256(model id + normalized input), so the same phrase sent again,
+with different spacing or Unicode composition, is answered without running
+the model, and results of another model or revision are never reused. Values
+must be JSON-serializable.
+
+The in-memory tier is a bounded LRU. With a db_path, every result is also
+written to a SQLite table; memory misses fall back to it (and promote the
+entry), so the cache survives restarts. The table is pruned to
+max_disk_entries by least recent use.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict
+
+# Returned by ResultCache.get on a miss (None can be a cached result)
+MISSING = object()
+
+PRUNE_EVERY = 256
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-composed, trimmed, whitespace runs collapsed to one space (case is kept: the model is cased)"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def content_key(model_id: str, text: str) -> str:
+    return hashlib.sha256(f"{model_id}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU of model results keyed by content hash, with an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = 10000, db_path: str = None, max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._writes = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used)")
+
+    def get(self, model_id: str, text: str) -> Any:
+        """Cached result, or MISSING"""
+        key = content_key(model_id, text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE results SET last_used=? WHERE key=?", (time.time(), key))
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self._stats["disk_hits"] += 1
+                    return value
+            self._stats["misses"] += 1
+            return MISSING
+
+    def set(self, model_id: str, text: str, value: Any):
+        key = content_key(model_id, text)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value, last_used) VALUES (?, ?, ?)",
+                                 (key, json.dumps(value), time.time()))
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune()
+
+    def _remember(self, key: str, value: Any):
+        """Insert into the memory tier (caller holds _lock)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune(self):
+        """Drop least recently used disk entries beyond max_disk_entries (caller holds _lock)"""
+        self._db.execute("""
+        DELETE FROM results WHERE key IN (
+            SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?
+        )
+        """, (self.max_disk_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["disk_entries"] = (self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                                     if self._db is not None else None)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
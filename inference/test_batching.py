@@ -0,0 +1,99 @@
+"""
+test_batching.py
+Micro-batching: concurrent callers share batches, buckets never mix, errors reach every caller
+"""
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from inference.batching import MicroBatcher
+
+
+def _submit_concurrently(batcher, items):
+    results = [None] * len(items)
+    start = threading.Barrier(len(items))
+
+    def call(i):
+        start.wait()
+        results[i] = batcher.submit(items[i], timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(items))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_calls_share_batches_and_get_their_own_result():
+    batches = []
+    batcher = MicroBatcher(lambda items: batches.append(list(items)) or [i * 10 for i in items],
+                           max_batch=8, max_wait_ms=50)
+    items = list(range(32))
+    assert _submit_concurrently(batcher, items) == [i * 10 for i in items]
+    assert sorted(i for batch in batches for i in batch) == items
+    assert max(len(batch) for batch in batches) == 8
+    assert len(batches) < len(items)
+    stats = batcher.stats()
+    assert stats["items"] == 32 and stats["batches"] == len(batches) and stats["waiting"] == 0
+    batcher.close()
+
+
+def test_batches_never_mix_buckets():
+    batches = []
+    batcher = MicroBatcher(lambda items: batches.append(list(items)) or items, max_batch=16, max_wait_ms=50,
+                           bucket=len)
+    items = ["a" * (1 + i % 3) for i in range(24)]
+    assert _submit_concurrently(batcher, items) == items
+    assert all(len({len(item) for item in batch}) == 1 for batch in batches)
+    batcher.close()
+
+
+def test_a_failing_batch_fails_each_caller():
+    def fn(items):
+        raise ValueError("model exploded")
+    batcher = MicroBatcher(fn, max_batch=4, max_wait_ms=1)
+    with pytest.raises(ValueError, match="model exploded"):
+        batcher.submit("x", timeout=5)
+    assert batcher.stats()["failed_batches"] == 1
+
+    short = MicroBatcher(lambda items: items[:-1], max_batch=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        short.submit("x", timeout=5)
+
+
+def test_close_runs_waiting_items():
+    batcher = MicroBatcher(lambda items: [i + 1 for i in items], max_batch=100, max_wait_ms=60000)
+    futures = [batcher.submit_async(i) for i in range(3)]
+    batcher.close()
+    assert [f.result(1) for f in futures] == [1, 2, 3]
+    with pytest.raises(RuntimeError):
+        batcher.submit_async(4)
+
+
+def test_future_returning_fn_keeps_several_batches_in_flight():
+    handed_off = []
+
+    def fn(items):
+        future = Future()
+        handed_off.append((items, future))
+        return future
+
+    batcher = MicroBatcher(fn, max_batch=1, max_wait_ms=1)
+    futures = [batcher.submit_async(i) for i in range(3)]
+    for _ in range(500):
+        if len(handed_off) == 3:
+            break
+        threading.Event().wait(0.01)
+    # Every batch was handed off before any of them finished
+    assert [items for items, _ in handed_off] == [[0], [1], [2]]
+    handed_off[2][1].set_result(["c"])
+    handed_off[0][1].set_result(["a"])
+    handed_off[1][1].set_exception(ValueError("worker died"))
+    assert futures[0].result(1) == "a" and futures[2].result(1) == "c"
+    with pytest.raises(ValueError, match="worker died"):
+        futures[1].result(1)
+    assert batcher.stats()["batches"] == 2 and batcher.stats()["failed_batches"] == 1
+    batcher.close()
@@ -0,0 +1,208 @@
+"""
+test_pool.py
+Inference worker pool: core plans never oversubscribe, arrays cross through shared memory, errors reach callers
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from inference import pool
+
+
+# -------------------- worker tasks (imported by the spawned workers) --------------------
+
+def frame_checksum(frame, scale=1):
+    return {"shape": list(frame.shape), "sum": int(frame.sum()) * scale, "pid": os.getpid()}
+
+
+def worker_threads():
+    return {"omp": os.environ.get("OMP_NUM_THREADS"), "text": os.environ.get("NEUROWELL_TEXT_THREADS")}
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def crash():
+    os._exit(3)
+
+
+def fake_classify(texts):
+    if any("slow" in t for t in texts):
+        time.sleep(0.6)
+    return [[{"label": "joy", "score": 0.9}, {"label": "fear", "score": 0.1}] if "good" in t else
+            [{"label": "joy", "score": 0.2}, {"label": "fear", "score": 0.8}] for t in texts]
+
+
+TASKS = {"text_emotion": "voice_text_emotion.text:run_classifier", "face_emotion": "facial_emotion.face:analyze_frame"}
+
+
+@pytest.mark.parametrize("cores", [1, 2, 8, 32, 48])
+def test_auto_plan_uses_every_core_without_oversubscribing(cores):
+    plan = pool.plan_workers("auto", TASKS, cores=cores)
+    used = sum(spec.workers * spec.threads for spec in plan.values())
+    assert set(plan) == set(TASKS)
+    assert used <= max(cores, len(TASKS))
+    if cores >= 8:
+        assert used == cores
+
+
+def test_explicit_plan_splits_cores_between_workers():
+    plan = pool.plan_workers("text_emotion=4, face_emotion=2", TASKS, cores=32)
+    assert (plan["text_emotion"].workers, plan["face_emotion"].workers) == (4, 2)
+    assert plan["text_emotion"].threads == plan["face_emotion"].threads == 5
+    assert pool.plan_workers("", TASKS) == {}
+    with pytest.raises(ValueError):
+        pool.plan_workers("speech=2", TASKS)
+
+
+def test_shared_arrays_round_trip_and_small_values_pass_through():
+    frame = np.arange(480 * 640 * 3, dtype=np.uint8).reshape(480, 640, 3)
+    shared, segments = pool._share((frame, 3, np.zeros(4)))
+    try:
+        assert shared[0][0] == "__shm__" and shared[1] == 3 and isinstance(shared[2], np.ndarray)
+        attached, views = pool._attach(shared)
+        assert np.array_equal(attached[0], frame)
+        del attached
+        for view in views:
+            view.close()
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+@pytest.fixture(scope="module")
+def service():
+    plan = {
+        "face_emotion": pool.WorkerSpec(f"{__name__}:frame_checksum", workers=2, threads=1),
+        "threads": pool.WorkerSpec(f"{__name__}:worker_threads", workers=1, threads=2),
+        "failing": pool.WorkerSpec(f"{__name__}:fail", workers=1, threads=1),
+        "crashing": pool.WorkerSpec(f"{__name__}:crash", workers=1, threads=1),
+        "sleeping": pool.WorkerSpec("time:sleep", workers=1, threads=1),
+        "text_emotion": pool.WorkerSpec(f"{__name__}:fake_classify", workers=2, threads=1),
+    }
+    svc = pool.InferenceService(plan)
+    svc.start()
+    yield svc
+    svc.stop()
+
+
+def test_workers_run_tasks_on_shared_frames(service):
+    frames = [np.full((240, 320, 3), i, dtype=np.uint8) for i in range(6)]
+    futures = [service.submit("face_emotion", frame, 2) for frame in frames]
+    results = [future.result(60) for future in futures]
+    assert [r["sum"] for r in results] == [int(f.sum()) * 2 for f in frames]
+    assert all(r["shape"] == [240, 320, 3] for r in results)
+    assert os.getpid() not in {r["pid"] for r in results}
+    assert service.status()["face_emotion"]["in_flight"] == 0
+
+
+def test_workers_get_their_thread_budget(service):
+    assert service.run("threads", timeout=60) == {"omp": "2", "text": "2"}
+
+
+def test_task_errors_reach_the_caller(service):
+    with pytest.raises(RuntimeError, match="ValueError: bad frame"):
+        service.run("failing", "bad frame", timeout=60)
+    with pytest.raises(RuntimeError):
+        service.submit("speech", 1)
+
+
+def test_ready_once_every_model_has_a_warm_worker(service):
+    # Each worker reports ready before it takes a request, so one answered call per model implies readiness
+    service.run("face_emotion", np.zeros((2, 2), dtype=np.uint8), 1, timeout=60)
+    service.run("threads", timeout=60)
+    with pytest.raises(RuntimeError):
+        service.run("failing", "x", timeout=60)
+    service.run("text_emotion", ["good"], timeout=60)
+    deadline = time.monotonic() + 60
+    while not service.ready() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert service.ready()
+    assert service.status()["face_emotion"]["alive"] == 2
+
+
+def test_text_and_face_analysis_dispatch_to_the_pool(service, monkeypatch):
+    from facial_emotion import face
+    from voice_text_emotion import text
+
+    monkeypatch.setattr(pool, "service", service)
+    monkeypatch.setattr(text, "text_cache", text.ResultCache())
+    results = text.analyze_texts(["a good day", "scared", ""])
+    assert [r.get("emotion") for r in results] == ["joy", "fear", None]
+
+    result = face.analyze_face_frame(np.ones((120, 160, 3), dtype=np.uint8))
+    assert result["sum"] == 120 * 160 * 3 and result["pid"] != os.getpid()
+
+
+class _WordTokenizer:
+    """One token per word, so texts of different lengths land in different batcher buckets"""
+
+    def __call__(self, text, truncation=False):
+        return {"input_ids": text.split()}
+
+
+def test_text_batches_run_on_every_worker_at_once(service, monkeypatch):
+    from inference.registry import registry
+    from voice_text_emotion import text
+
+    monkeypatch.setattr(pool, "service", service)
+    monkeypatch.setattr(text, "text_cache", text.ResultCache())
+    registry.register("text_tokenizer", _WordTokenizer)
+    deadline = time.monotonic() + 60
+    while service.status()["text_emotion"]["ready"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    try:
+        # Two buckets (8 and 32 tokens) make two batches; each takes 0.6 s in a worker
+        texts = ["slow but good", " ".join(["slow"] * 20)]
+        results = [None, None]
+        threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, text.classify_text(texts[i])))
+                   for i in range(2)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        elapsed = time.perf_counter() - start
+    finally:
+        registry.register("text_tokenizer", text._load_tokenizer)
+
+    assert [max(r, key=lambda x: x["score"])["label"] for r in results] == ["joy", "fear"]
+    assert elapsed < 1.1, f"batches ran one after the other ({elapsed:.2f}s)"
+
+
+def test_dead_workers_fail_their_requests_while_other_models_stay_busy(service):
+    stop = threading.Event()
+
+    def keep_busy():
+        while not stop.is_set():
+            service.run("threads", timeout=60)
+
+    busy = threading.Thread(target=keep_busy)
+    busy.start()
+    try:
+        future = service.submit("crashing")
+        with pytest.raises(RuntimeError, match="exited"):
+            future.result(10)
+        deadline = time.monotonic() + 60
+        while service.status()["crashing"]["ready"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert service.status()["crashing"]["alive"] == 1
+    finally:
+        stop.set()
+        busy.join(30)
+    assert service.status()["crashing"]["in_flight"] == 0
+
+
+def test_abandoned_requests_expire(service):
+    # The caller stops waiting long before the worker answers; the entry is dropped on the next sweep
+    future = service.submit("sleeping", 3, timeout=0.1)
+    with pytest.raises(RuntimeError, match="timed out"):
+        future.result(2.5)
+    assert service.status()["sleeping"]["in_flight"] == 0
+    assert service.run("sleeping", 0, timeout=60) is None
@@ -0,0 +1,96 @@
+"""
+test_registry.py
+Model registry: load once with warmup, readiness while warming, idle eviction and reload, /ready
+"""
+
+import threading
+
+import pytest
+
+from inference.registry import FAILED, READY, UNAVAILABLE, UNLOADED, ModelRegistry
+
+
+def test_get_loads_and_warms_once():
+    calls = []
+    registry = ModelRegistry()
+    registry.register("text", lambda: calls.append("load") or {"model": 1}, warmup=lambda m: calls.append("warm"))
+    assert registry.status()["models"]["text"]["state"] == UNLOADED
+
+    assert registry.get("text") is registry.get("text")
+    assert calls == ["load", "warm"]
+    status = registry.status()["models"]["text"]
+    assert status["state"] == READY and status["loads"] == 1 and status["load_seconds"] is not None
+    with pytest.raises(KeyError):
+        registry.get("nope")
+
+
+def test_ready_waits_for_warmup_and_reports_failures():
+    release = threading.Event()
+    registry = ModelRegistry()
+    registry.register("slow", lambda: release.wait(5) and "slow")
+    registry.register("missing", lambda: __import__("no_such_model_package"))
+    thread = registry.warmup(background=True)
+    assert not registry.ready()
+    release.set()
+    thread.join(5)
+    assert registry.ready()
+    assert registry.status()["models"]["missing"]["state"] == UNAVAILABLE
+
+    def broken():
+        raise RuntimeError("weights corrupt")
+    registry.register("broken", broken)
+    registry.warmup(["broken"])
+    assert not registry.ready()
+    broken_status = registry.status()["models"]["broken"]
+    assert (broken_status["state"], broken_status["error"]) == (FAILED, "weights corrupt")
+
+
+def test_idle_models_are_evicted_and_reloaded():
+    unloaded = []
+    registry = ModelRegistry(idle_ttl=60)
+    registry.register("face", object, unload=unloaded.append)
+    registry.register("pinned", object, idle_ttl=0)
+    first = registry.get("face")
+    registry.get("pinned")
+    now = registry._entry("face").last_used
+
+    assert registry.evict_idle(now=now + 30) == []
+    assert registry.evict_idle(now=now + 61) == ["face"]
+    assert unloaded == [first]
+    assert registry.status()["models"]["face"]["state"] == UNLOADED
+    assert registry.status()["models"]["pinned"]["state"] == READY
+
+    assert registry.get("face") is not first
+    assert registry.status()["models"]["face"]["loads"] == 2
+
+
+def test_leased_models_are_not_evicted():
+    unloaded = []
+    registry = ModelRegistry(idle_ttl=60)
+    registry.register("face", object, unload=unloaded.append)
+
+    with registry.lease("face") as model:
+        now = registry._entry("face").last_used
+        # The reaper runs while a slow analysis still holds the model
+        assert registry.evict_idle(now=now + 120) == [] and not registry.evict("face")
+        assert unloaded == [] and registry.status()["models"]["face"]["in_use"] == 1
+    assert registry.status()["models"]["face"]["in_use"] == 0
+    assert registry.evict("face") and unloaded == [model]
+
+
+def test_ready_endpoint(monkeypatch):
+    app_module = pytest.importorskip("backend.app")
+    registry = ModelRegistry()
+    registry.register("text_emotion", lambda: "model")
+    monkeypatch.setattr(app_module, "registry", registry)
+    client = app_module.app.test_client()
+
+    registry.register("face_emotion", lambda: 1 / 0)
+    registry.warmup()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["models"]["text_emotion"]["state"] == READY
+
+    registry.register("face_emotion", lambda: "model")
+    registry.warmup(["face_emotion"])
+    assert client.get("/ready").status_code == 200
@@ -0,0 +1,50 @@
+"""
+test_result_cache.py
+Text result cache: normalized content keys, per-model isolation, LRU bounds, SQLite persistence
+"""
+
+from inference.result_cache import MISSING, ResultCache, content_key
+
+
+def test_keys_are_normalized_and_per_model():
+    assert content_key("m@1", "  I'm   fine\n") == content_key("m@1", "I'm fine")
+    assert content_key("m@1", "ﬁne") == content_key("m@1", "fine")  # NFKC ligature
+    assert content_key("m@1", "I'm fine") != content_key("m@1", "i'm fine")
+    assert content_key("m@1", "I'm fine") != content_key("m@2", "I'm fine")
+
+    cache = ResultCache()
+    cache.set("m@1", "stressed", {"emotion": "fear"})
+    assert cache.get("m@1", " stressed ") == {"emotion": "fear"}
+    assert cache.get("m@2", "stressed") is MISSING
+
+
+def test_lru_eviction_and_stats():
+    cache = ResultCache(max_entries=2)
+    cache.set("m", "a", 1)
+    cache.set("m", "b", 2)
+    assert cache.get("m", "a") == 1
+    cache.set("m", "c", 3)
+    assert cache.get("m", "b") is MISSING and cache.get("m", "a") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 1, 1, 2)
+    assert stats["hit_rate"] == 2 / 3 and stats["disk_entries"] is None
+
+
+def test_sqlite_tier_survives_restart_and_is_pruned(tmp_path, monkeypatch):
+    from inference import result_cache
+    monkeypatch.setattr(result_cache, "PRUNE_EVERY", 1)
+    db_path = str(tmp_path / "text_cache.db")
+
+    cache = ResultCache(max_entries=10, db_path=db_path, max_disk_entries=3)
+    for i in range(5):
+        cache.set("m", f"phrase {i}", {"i": i})
+    assert cache.stats()["disk_entries"] == 3
+    cache.close()
+
+    restarted = ResultCache(max_entries=10, db_path=db_path, max_disk_entries=3)
+    assert restarted.get("m", "phrase 4") == {"i": 4}
+    assert restarted.get("m", "phrase 0") is MISSING
+    assert restarted.get("m", "phrase 4") == {"i": 4}
+    stats = restarted.stats()
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    restarted.close()
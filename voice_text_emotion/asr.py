@@ -0,0 +1,148 @@
+"""
+asr.py
+Purpose: Speech-to-text backends behind one interface, chosen with NEUROWELL_ASR_BACKEND
+Integrated with: voice_text_emotion/speech.py (analyze_speech_emotion), inference/registry.py
+
+Every backend takes 16 kHz mono s16le PCM (what audio.decode_audio returns)
+and returns the transcript, or raises NoSpeechError / ASRServiceError:
+  - google:  Google Web Speech API through SpeechRecognition (network, the original behavior)
+  - whisper: faster-whisper on the CPU with int8 weights (NEUROWELL_WHISPER_MODEL, default base.en)
+  - vosk:    Vosk/Kaldi offline model (NEUROWELL_VOSK_MODEL directory, or the small en-us model)
+  - fake:    deterministic transcript from the audio bytes, for tests and benchmarks
+
+The backend object is loaded (and its model warmed) through the model registry as "asr".
+"""
+
+import os
+import time
+import zlib
+
+from inference.registry import registry
+from voice_text_emotion.audio import SAMPLE_WIDTH
+
+ASR_BACKENDS = ("google", "whisper", "vosk", "fake")
+ASR_BACKEND = os.environ.get("NEUROWELL_ASR_BACKEND", "google")
+if ASR_BACKEND not in ASR_BACKENDS:
+    raise ValueError(f"NEUROWELL_ASR_BACKEND must be one of {ASR_BACKENDS}, got {ASR_BACKEND!r}")
+ASR_THREADS = int(os.environ.get("NEUROWELL_ASR_THREADS", "0"))
+
+
+class NoSpeechError(Exception):
+    """The audio held no recognizable speech"""
+
+
+class ASRServiceError(Exception):
+    """The recognizer itself failed (network, quota, model)"""
+
+
+class GoogleASR:
+    """Google Web Speech API: every call is a network round trip"""
+
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        recognizer = self.sr.Recognizer()
+        try:
+            return recognizer.recognize_google(self.sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH))
+        except self.sr.UnknownValueError:
+            raise NoSpeechError("Could not understand the audio")
+        except self.sr.RequestError as e:
+            raise ASRServiceError(str(e))
+
+
+class WhisperASR:
+    """faster-whisper (CTranslate2) on the CPU, int8 weights"""
+
+    def __init__(self, model_size: str = None, threads: int = ASR_THREADS):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size or os.environ.get("NEUROWELL_WHISPER_MODEL", "base.en"),
+                                  device="cpu", compute_type="int8", cpu_threads=threads)
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        import numpy as np
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        try:
+            segments, _ = self.model.transcribe(samples, language="en", beam_size=1, vad_filter=False)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+        except Exception as e:
+            raise ASRServiceError(str(e))
+        if not text:
+            raise NoSpeechError("Could not understand the audio")
+        return text
+
+
+class VoskASR:
+    """Vosk (Kaldi) offline recognizer; the model is shared, each call gets its own recognizer"""
+
+    def __init__(self, model_path: str = None):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        model_path = model_path or os.environ.get("NEUROWELL_VOSK_MODEL")
+        self.model = vosk.Model(model_path) if model_path else vosk.Model(lang="en-us")
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        import json
+        recognizer = self.vosk.KaldiRecognizer(self.model, sample_rate)
+        try:
+            recognizer.AcceptWaveform(pcm)
+            text = json.loads(recognizer.FinalResult()).get("text", "").strip()
+        except Exception as e:
+            raise ASRServiceError(str(e))
+        if not text:
+            raise NoSpeechError("Could not understand the audio")
+        return text
+
+
+# Transcripts cover positive, negative and neutral text so benchmarks exercise the whole pipeline
+FAKE_TRANSCRIPTS = [
+    "I feel anxious and stressed today",
+    "I am so happy to see you again",
+    "I feel so lonely and sad tonight",
+    "The meeting is at three o'clock",
+]
+
+
+class FakeASR:
+    """Deterministic stand-in: the same audio always gives the same transcript, all-zero audio gives none"""
+
+    def __init__(self, transcript: str = None, latency_ms: float = None):
+        self.transcript = transcript or os.environ.get("NEUROWELL_FAKE_TRANSCRIPT")
+        self.latency_ms = float(os.environ.get("NEUROWELL_FAKE_ASR_MS", "0")) if latency_ms is None else latency_ms
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if not pcm.strip(b"\x00"):
+            raise NoSpeechError("Could not understand the audio")
+        return self.transcript or FAKE_TRANSCRIPTS[zlib.crc32(pcm) % len(FAKE_TRANSCRIPTS)]
+
+
+def make_backend(name: str):
+    """A new backend instance by name"""
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"ASR backend must be one of {ASR_BACKENDS}, got {name!r}")
+    return {"google": GoogleASR, "whisper": WhisperASR, "vosk": VoskASR, "fake": FakeASR}[name]()
+
+
+def _load_asr():
+    return make_backend(ASR_BACKEND)
+
+
+def _warm_asr(backend):
+    """Local models build their weights on the first call; one second of quiet noise triggers it"""
+    if isinstance(backend, (WhisperASR, VoskASR)):
+        try:
+            backend.transcribe(b"\x01\x00" * 16000, 16000)
+        except NoSpeechError:
+            pass
+
+
+registry.register("asr", _load_asr, warmup=_warm_asr)
+
+
+def get_asr():
+    """The configured speech recognizer, loaded through the model registry"""
+    return registry.get("asr")
@@ -0,0 +1,82 @@
+"""
+audio.py
+Purpose: Decode uploaded audio to 16 kHz mono 16-bit PCM in memory, with a bounded number of ffmpeg decoders
+Integrated with: voice_text_emotion/speech.py (analyze_speech_emotion)
+
+Uploads never touch the disk. A WAV that is already 16-bit PCM at 16 kHz
+(any channel count) is read with the wave module and downmixed in NumPy.
+Anything else (the browser's webm/ogg blobs, mp3, other rates) is piped
+through ffmpeg: bytes in on stdin, raw s16le PCM out on stdout.
+
+At most NEUROWELL_AUDIO_DECODERS ffmpeg processes run at once (default half
+the cores), so a burst of uploads queues for a decoder instead of starving the
+models of CPU.
+"""
+
+import io
+import os
+import subprocess
+import threading
+import wave
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes, signed 16-bit little endian
+
+FFMPEG = os.environ.get("NEUROWELL_FFMPEG", "ffmpeg")
+AUDIO_DECODERS = int(os.environ.get("NEUROWELL_AUDIO_DECODERS", "0")) or max(1, (os.cpu_count() or 1) // 2)
+DECODE_TIMEOUT = float(os.environ.get("NEUROWELL_AUDIO_DECODE_TIMEOUT", "30"))
+
+_decoders = threading.BoundedSemaphore(AUDIO_DECODERS)
+
+
+class DecodeError(ValueError):
+    """The upload could not be decoded to audio"""
+
+
+def _wav_pcm(data: bytes):
+    """Mono PCM of a 16-bit 16 kHz WAV, or None if the data needs ffmpeg"""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            if (wav.getsampwidth(), wav.getframerate(), wav.getcomptype()) != (SAMPLE_WIDTH, SAMPLE_RATE, "NONE"):
+                return None
+            channels = wav.getnchannels()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if channels == 1:
+        return frames
+    import numpy as np
+    samples = np.frombuffer(frames, dtype="<i2").reshape(-1, channels)
+    return samples.mean(axis=1).round().astype("<i2").tobytes()
+
+
+def _ffmpeg_pcm(data: bytes) -> bytes:
+    command = [FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+               "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+    with _decoders:
+        try:
+            done = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  timeout=DECODE_TIMEOUT)
+        except FileNotFoundError:
+            raise DecodeError(f"ffmpeg not found ({FFMPEG}); install it or set NEUROWELL_FFMPEG")
+        except subprocess.TimeoutExpired:
+            raise DecodeError(f"decoding took longer than {DECODE_TIMEOUT:g}s")
+    if done.returncode != 0:
+        message = done.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise DecodeError(message[-1] if message else f"ffmpeg exited with {done.returncode}")
+    return done.stdout
+
+
+def decode_audio(data: bytes) -> bytes:
+    """16 kHz mono s16le PCM of an uploaded audio file's bytes; raises DecodeError"""
+    if not data:
+        raise DecodeError("empty audio")
+    pcm = _wav_pcm(data)
+    if pcm is None:
+        pcm = _ffmpeg_pcm(data)
+    if not pcm:
+        raise DecodeError("no audio samples")
+    # An odd trailing byte is half a sample
+    return pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH]
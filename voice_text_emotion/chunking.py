@@ -0,0 +1,91 @@
+"""
+chunking.py
+Purpose: Split long texts into overlapping token windows and combine the per-window emotion scores
+Integrated with: voice_text_emotion/text.py (analyze_long_text)
+
+A text is tokenized once. Windows of `window` tokens start every
+window - overlap tokens, and the last one is shifted back to end at the last
+token so every window is full length (equal lengths batch without padding).
+Each window is cut out of the original text at its token offsets.
+
+Aggregations of the per-window score vectors:
+  - mean:   plain average over windows
+  - max:    per-label maximum (the strongest signal anywhere; not renormalized)
+  - length: average weighted by the tokens each window adds beyond the previous
+            one, so text covered by two overlapping windows counts once
+"""
+
+from typing import Dict, List, Tuple
+
+AGGREGATIONS = ("mean", "max", "length")
+
+# (first token, end token)
+Span = Tuple[int, int]
+
+
+def window_spans(n_tokens: int, window: int, overlap: int) -> List[Span]:
+    """Token spans of the windows covering n_tokens"""
+    if window <= overlap:
+        raise ValueError("window must be larger than overlap")
+    if n_tokens <= window:
+        return [(0, n_tokens)]
+    stride = window - overlap
+    spans = []
+    start = 0
+    while start + window < n_tokens:
+        spans.append((start, start + window))
+        start += stride
+    spans.append((n_tokens - window, n_tokens))
+    return spans
+
+
+def window_weights(spans: List[Span]) -> List[int]:
+    """Tokens each window covers that the previous window did not"""
+    weights, covered = [], 0
+    for start, end in spans:
+        weights.append(end - max(start, covered))
+        covered = end
+    return weights
+
+
+def split_text(tokenizer, text: str, window: int, overlap: int) -> Tuple[List[Dict[str, int]], List[str]]:
+    """({"start", "end", "tokens", "new_tokens"} per window, window texts) for one tokenization of text.
+
+    start/end are character offsets (None for tokenizers without offsets);
+    new_tokens is the window's weight for the length aggregation.
+    """
+    try:
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoded["offset_mapping"]
+    except (NotImplementedError, KeyError, TypeError):
+        # Slow (pure Python) tokenizers have no offsets: decode the window's ids instead
+        encoded, offsets = tokenizer(text, add_special_tokens=False), None
+    ids = encoded["input_ids"]
+    if not ids:
+        return [{"start": 0, "end": len(text), "tokens": 0, "new_tokens": 0}], [text]
+
+    token_spans = window_spans(len(ids), window, overlap)
+    spans, segments = [], []
+    for (first, end), weight in zip(token_spans, window_weights(token_spans)):
+        if offsets is not None:
+            start_char, end_char = offsets[first][0], offsets[end - 1][1]
+            segment = text[start_char:end_char]
+        else:
+            start_char, end_char = None, None
+            segment = tokenizer.decode(ids[first:end])
+        spans.append({"start": start_char, "end": end_char, "tokens": end - first, "new_tokens": weight})
+        segments.append(segment)
+    return spans, segments
+
+
+def aggregate(rows: List[Dict[str, float]], weights: List[int], method: str = "length") -> Dict[str, float]:
+    """One label -> score mapping from per-window label -> score mappings"""
+    if method not in AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {AGGREGATIONS}, got {method!r}")
+    labels = list(rows[0])
+    if method == "max":
+        return {label: max(row[label] for row in rows) for label in labels}
+    if method == "mean" or not sum(weights):
+        weights = [1] * len(rows)
+    total = sum(weights)
+    return {label: sum(row[label] * w for row, w in zip(rows, weights)) / total for label in labels}
@@ -0,0 +1,301 @@
+"""
+onnx_backend.py
+Purpose: int8-quantized ONNX Runtime backend for the text emotion model, plus an accuracy-drift report
+Integrated with: voice_text_emotion/text.py (NEUROWELL_TEXT_BACKEND=onnx)
+
+export_quantized() exports the Hugging Face model to ONNX once and applies
+dynamic int8 quantization to its weights. The export is built in a temporary
+sibling directory, export.json is written last, and the directory is swapped
+into place under a file lock, so a killed export never looks finished and
+several worker processes starting at once export only once. OnnxTextClassifier runs that file
+with ONNX Runtime and is called like the transformers pipeline it replaces:
+same label order, softmax scores, nested-list output, a .tokenizer attribute.
+
+drift_report() runs two classifiers over DRIFT_CORPUS and reports label
+agreement, score differences and latency, so a backend switch is checked
+before it ships.
+
+Usage:
+    python -m voice_text_emotion.onnx_backend export [--dir DIR]
+    python -m voice_text_emotion.onnx_backend report [--dir DIR] [--threads 4] [--json drift.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+QUANTIZED_FILE = "model.int8.onnx"
+EXPORT_MANIFEST = "export.json"  # written last: its presence marks a finished export
+
+# Fixed corpus for drift reports: every label of the model, short and long, plain and messy input
+DRIFT_CORPUS = [
+    "I feel anxious and stressed today",
+    "I'm fine",
+    "stressed",
+    "I am so happy to see you again!",
+    "This is the best day of my life",
+    "I love spending time with my family",
+    "I'm really angry that nobody listened to me",
+    "Stop it, this is so annoying",
+    "I feel so lonely and sad tonight",
+    "I miss her every single day",
+    "I'm scared something bad is going to happen",
+    "My heart is racing and I can't calm down",
+    "Wow, I did not expect that at all!",
+    "That news came out of nowhere",
+    "Ugh, that smell is disgusting",
+    "The food at that place made me feel sick",
+    "I went to the store and bought some bread",
+    "The meeting is at three o'clock",
+    "ok",
+    "idk... kinda meh i guess",
+    "I'm not sad, just tired of everything",
+    "Exams are next week and I haven't started studying",
+    "I finally finished the project and it works!",
+    "Why does this always happen to me",
+    "I can't stop thinking about what went wrong",
+    "Thanks, that really helped me feel better",
+    "I don't know how to feel about this",
+    "Everything is overwhelming right now, work, family, money, all of it at once, and I keep "
+    "lying awake at night going over the same worries again and again without getting anywhere",
+]
+
+
+def default_model_dir(model_name: str, revision: str) -> str:
+    """Export location, outside the project like the database (NEUROWELL_TEXT_ONNX_DIR overrides)"""
+    return os.environ.get("NEUROWELL_TEXT_ONNX_DIR") or os.path.join(
+        os.path.expanduser("~"), "AppData", "Local", "neurowell", "models",
+        f"{model_name.replace('/', '--')}-{revision}-int8")
+
+
+# -------------------- EXPORT --------------------
+
+def is_exported(model_dir: str) -> bool:
+    return os.path.exists(os.path.join(model_dir, EXPORT_MANIFEST))
+
+
+@contextmanager
+def _export_lock(model_dir: str):
+    """Exclusive lock on <model_dir>.lock, held across processes while one of them exports"""
+    os.makedirs(os.path.dirname(os.path.abspath(model_dir)), exist_ok=True)
+    with open(model_dir + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after 10 s: keep waiting
+                    break
+                except OSError:
+                    pass
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_export(model_dir: str, model_name: str, revision: str, opset: int):
+    """Export, quantize and save tokenizer/config into an empty directory; export.json last"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision).eval()
+
+    class Logits(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, input_ids, attention_mask):
+            return self.wrapped(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    sample = tokenizer(["warming up"], return_tensors="pt")
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            Logits(model), (sample["input_ids"], sample["attention_mask"]), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=["logits"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                          "attention_mask": {0: "batch", 1: "sequence"},
+                          "logits": {0: "batch"}},
+            opset_version=opset)
+    quantize_dynamic(fp32_path, os.path.join(model_dir, QUANTIZED_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    tokenizer.save_pretrained(model_dir)
+    model.config.save_pretrained(model_dir)
+    with open(os.path.join(model_dir, EXPORT_MANIFEST), "w") as f:
+        json.dump({"model": model_name, "revision": revision, "opset": opset, "quantization": "dynamic int8"}, f)
+
+
+def export_quantized(model_dir: str, model_name: str, revision: str = "main", opset: int = 14,
+                     force: bool = True) -> str:
+    """Export the model to ONNX, quantize its weights to int8 and save tokenizer/config next to it.
+
+    With force=False an export another process finished while we waited for the lock is kept.
+    """
+    with _export_lock(model_dir):
+        if force or not is_exported(model_dir):
+            build_dir = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(os.path.abspath(model_dir)))
+            try:
+                _write_export(build_dir, model_name, revision, opset)
+                if os.path.exists(model_dir):
+                    # A previous (or unfinished) export: move it aside so the rename cannot fail on it
+                    os.replace(model_dir, build_dir + ".old")
+                os.replace(build_dir, model_dir)
+            finally:
+                shutil.rmtree(build_dir, ignore_errors=True)
+                shutil.rmtree(build_dir + ".old", ignore_errors=True)
+    return os.path.join(model_dir, QUANTIZED_FILE)
+
+
+# -------------------- INFERENCE --------------------
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class OnnxTextClassifier:
+    """ONNX Runtime stand-in for pipeline("text-classification", return_all_scores=True)"""
+
+    def __init__(self, model_dir: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(model_dir, QUANTIZED_FILE), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir)
+        self.labels = [config.id2label[i] for i in range(len(config.id2label))]
+
+    def __call__(self, texts, batch_size: int = None, truncation: bool = False) -> List[List[Dict[str, Any]]]:
+        """Label scores in label-id order, one list per text (a single string gives a one-item list)"""
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        size = batch_size or len(batch) or 1
+        results = []
+        for start in range(0, len(batch), size):
+            encoded = self.tokenizer(batch[start:start + size], padding=True, truncation=truncation,
+                                     return_tensors="np")
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            scores = _softmax(self.session.run(None, feeds)[0].astype(np.float64))
+            results += [[{"label": label, "score": float(score)} for label, score in zip(self.labels, row)]
+                        for row in scores]
+        return results
+
+
+def load_classifier(model_name: str, revision: str, intra_op_threads: int = 0,
+                    model_dir: str = None) -> OnnxTextClassifier:
+    """The quantized classifier, exporting it first if this model/revision has not been exported yet"""
+    model_dir = model_dir or default_model_dir(model_name, revision)
+    if not is_exported(model_dir):
+        print(f"Exporting {model_name}@{revision} to {model_dir} (one time)...")
+        export_quantized(model_dir, model_name, revision, force=False)
+    return OnnxTextClassifier(model_dir, intra_op_threads)
+
+
+# -------------------- DRIFT REPORT --------------------
+
+def drift_report(reference: Callable, candidate: Callable, corpus: List[str] = None,
+                 runs: int = 3) -> Dict[str, Any]:
+    """Compare two classifiers (pipeline-style callables) text by text on a fixed corpus"""
+    corpus = corpus or DRIFT_CORPUS
+
+    def scores_and_latency(classifier):
+        outputs, timings = [], []
+        for text in corpus:
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                out = classifier(text)[0]
+                samples.append((time.perf_counter() - start) * 1000)
+            outputs.append({entry["label"]: entry["score"] for entry in out})
+            timings.append(statistics.median(samples))
+        return outputs, timings
+
+    reference_scores, reference_ms = scores_and_latency(reference)
+    candidate_scores, candidate_ms = scores_and_latency(candidate)
+
+    disagreements, diffs = [], []
+    for text, want, got in zip(corpus, reference_scores, candidate_scores):
+        want_label, got_label = max(want, key=want.get), max(got, key=got.get)
+        diffs += [abs(want[label] - got.get(label, 0.0)) for label in want]
+        if want_label != got_label:
+            disagreements.append({"text": text, "reference": want_label, "candidate": got_label,
+                                  "reference_score": round(want[want_label], 4),
+                                  "candidate_score": round(got[got_label], 4)})
+    reference_median, candidate_median = statistics.median(reference_ms), statistics.median(candidate_ms)
+    return {
+        "texts": len(corpus),
+        "label_agreement": 1 - len(disagreements) / len(corpus),
+        "max_abs_score_diff": max(diffs),
+        "mean_abs_score_diff": statistics.fmean(diffs),
+        "disagreements": disagreements,
+        "latency_ms": {"reference": reference_median, "candidate": candidate_median},
+        "speedup": reference_median / candidate_median if candidate_median else None,
+    }
+
+
+def main():
+    from inference.registry import process_rss_bytes
+    from voice_text_emotion import text
+
+    parser = argparse.ArgumentParser(description="Export the text emotion model to quantized ONNX and check drift")
+    parser.add_argument("command", choices=["export", "report"])
+    parser.add_argument("--dir", default=None, help="Export directory (default: per model/revision under AppData)")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0: runtime default)")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per text (median is reported)")
+    parser.add_argument("--json", default=None, help="Also write the drift report to this JSON file")
+    args = parser.parse_args()
+    model_dir = args.dir or default_model_dir(text.MODEL_NAME, text.MODEL_REVISION)
+
+    if args.command == "export":
+        path = export_quantized(model_dir, text.MODEL_NAME, text.MODEL_REVISION)
+        print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        return
+
+    rss = process_rss_bytes()
+    candidate = load_classifier(text.MODEL_NAME, text.MODEL_REVISION, args.threads, model_dir)
+    onnx_rss = process_rss_bytes()
+    reference = text.load_torch_classifier()
+    torch_rss = process_rss_bytes()
+    report = drift_report(reference, candidate, runs=args.runs)
+    if rss is not None:
+        report["rss_growth_bytes"] = {"onnx": onnx_rss - rss, "torch": torch_rss - onnx_rss}
+
+    print(f"{report['texts']} texts: label agreement {report['label_agreement']:.1%}, "
+          f"score diff max {report['max_abs_score_diff']:.4f} mean {report['mean_abs_score_diff']:.4f}")
+    print(f"median latency torch {report['latency_ms']['reference']:.1f} ms, "
+          f"onnx int8 {report['latency_ms']['candidate']:.1f} ms ({report['speedup']:.1f}x)")
+    for d in report["disagreements"]:
+        print(f"  {d['text'][:60]!r}: {d['reference']} ({d['reference_score']}) -> "
+              f"{d['candidate']} ({d['candidate_score']})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+score.py
+Purpose: Offline text emotion scoring of large JSONL/CSV files across worker processes, resumable
+Integrated with: voice_text_emotion/text.py (analyze_texts)
+
+Input rows are read as a stream and sent in chunks to a pool of worker
+processes. Each worker loads the model once (on its first chunk) and scores its chunk with batched
+inference (analyze_texts). Results are appended to a JSONL file in input
+order, one line per row: {"row": n, "id": <id field if any>, "emotion": ...}.
+
+After every chunk the output is flushed and <out>.checkpoint records how many
+rows are done and the output size at that point. --resume truncates the output
+back to that size (dropping anything written after the checkpoint) and skips
+those rows, so an interrupted job neither loses nor duplicates rows.
+
+Usage:
+    python -m voice_text_emotion.score journals.jsonl --out scores.jsonl [--workers 8] [--resume]
+    python -m voice_text_emotion.score entries.csv --out scores.jsonl --text-field body --id-field entry_id
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (row number, id, text)
+Row = Tuple[int, Any, Optional[str]]
+
+
+def read_rows(path: str, text_field: str = "text", id_field: str = None) -> Iterator[Row]:
+    """Rows of a .csv file or a JSONL file (objects, or bare JSON strings), numbered from 0"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for n, record in enumerate(csv.DictReader(f)):
+                yield n, record.get(id_field) if id_field else None, record.get(text_field)
+            return
+        for n, line in enumerate(line for line in f if line.strip()):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield n, None, None
+                continue
+            if isinstance(record, str):
+                yield n, None, record
+            elif isinstance(record, dict):
+                text = record.get(text_field)
+                yield n, record.get(id_field) if id_field else None, text if isinstance(text, str) else None
+            else:
+                yield n, None, None
+
+
+def score_chunk(rows: List[Row]) -> List[Dict[str, Any]]:
+    """Output records for one chunk (runs in a worker process)"""
+    from voice_text_emotion.text import analyze_texts
+
+    results = analyze_texts([text or "" for _, _, text in rows])
+    records = []
+    for (n, row_id, text), result in zip(rows, results):
+        record = {"row": n}
+        if row_id is not None:
+            record["id"] = row_id
+        if text is None:
+            result = {"error": "No text field"}
+        else:
+            result = {k: v for k, v in result.items() if k != "input_text"}
+        record.update(result)
+        records.append(record)
+    return records
+
+
+def _init_worker(threads: int):
+    # Runs before the worker imports the model: each worker gets its share of the cores, not all of them.
+    # The model itself loads in the first score_chunk, so a load error fails the job instead of respawning workers.
+    os.environ["NEUROWELL_TEXT_THREADS"] = str(threads)
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+
+
+def _read_checkpoint(path: str) -> Dict[str, int]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"rows": 0, "bytes": 0}
+
+
+def _write_checkpoint(path: str, rows: int, size: int):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"rows": rows, "bytes": size}, f)
+    os.replace(tmp, path)
+
+
+def _chunks(rows: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_file(path: str, out_path: str, text_field: str = "text", id_field: str = None, workers: int = None,
+               chunk_size: int = 256, resume: bool = False) -> Dict[str, Any]:
+    """Score every row of path into out_path; workers=0 scores in this process"""
+    checkpoint_path = out_path + ".checkpoint"
+    done = {"rows": 0, "bytes": 0}
+    if resume and os.path.exists(out_path):
+        done = _read_checkpoint(checkpoint_path)
+        with open(out_path, "r+b") as f:
+            f.truncate(done["bytes"])
+    else:
+        open(out_path, "wb").close()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    rows = islice(read_rows(path, text_field, id_field), done["rows"], None)
+    start, scored = time.perf_counter(), 0
+    pool = None
+    if workers > 0:
+        import multiprocessing
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(threads,))
+
+    try:
+        with open(out_path, "a", encoding="utf-8") as out:
+            in_flight = deque()
+
+            def write(records):
+                nonlocal scored
+                out.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+                out.flush()
+                scored += len(records)
+                _write_checkpoint(checkpoint_path, done["rows"] + scored, out.tell())
+
+            for chunk in _chunks(rows, chunk_size):
+                if pool is None:
+                    write(score_chunk(chunk))
+                    continue
+                # Keep a bounded number of chunks queued so memory stays flat on huge inputs
+                in_flight.append(pool.apply_async(score_chunk, (chunk,)))
+                while len(in_flight) >= 2 * workers:
+                    write(in_flight.popleft().get())
+            while in_flight:
+                write(in_flight.popleft().get())
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    seconds = time.perf_counter() - start
+    return {
+        "scored": scored,
+        "skipped": done["rows"],
+        "seconds": seconds,
+        "rows_per_second": scored / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a JSONL/CSV file of texts with the text emotion model")
+    parser.add_argument("path", help="Input .jsonl (objects or strings) or .csv file")
+    parser.add_argument("--out", required=True, help="Output JSONL file")
+    parser.add_argument("--text-field", default="text", help="Field holding the text")
+    parser.add_argument("--id-field", default=None, help="Field copied to the output as id")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0: inline)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Rows per worker task")
+    parser.add_argument("--resume", action="store_true", help="Continue from <out>.checkpoint")
+    args = parser.parse_args()
+
+    result = score_file(args.path, args.out, args.text_field, args.id_field, args.workers, args.chunk_size,
+                        args.resume)
+    print(f"Scored {result['scored']} rows in {result['seconds']:.1f}s ({result['rows_per_second']:,.0f} rows/s)"
+          + (f", resumed after {result['skipped']}" if result["skipped"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,57 @@
 # voice_text_emotion/speech.py
 
-import speech_recognition as sr
+from voice_text_emotion.asr import ASRServiceError, NoSpeechError
+from voice_text_emotion.audio import SAMPLE_RATE, DecodeError, decode_audio
 from voice_text_emotion.text import analyze_text_emotion
+from inference.registry import registry
 
-from pydub import AudioSegment
 import os
 
-def analyze_speech_emotion(audio_path):
+# NEUROWELL_VAD=0 sends every upload to recognition, silent or not
+VAD_ENABLED = os.environ.get("NEUROWELL_VAD", "1") != "0"
+
+def analyze_speech_emotion(audio):
     """
-    Takes an audio file path, converts speech to text,
+    Takes uploaded audio (bytes, or a path to an audio file), converts speech to text,
     and performs emotion analysis on the transcribed text.
     """
 
-    if not audio_path:
+    if not audio:
         return {
-            "error": "Audio path not provided"
+            "error": "Audio not provided"
         }
 
     try:
-        # Crucial bug fix: The frontend MediaRecorder yields opaque blobs (webm/ogg).
-        # speech_recognition strictly requires PCM WAV. We use pydub to convert it dynamically!
-        wav_path = audio_path + "_converted.wav"
-        audio = AudioSegment.from_file(audio_path)
-        audio.export(wav_path, format="wav")
-    except Exception as e:
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                audio = f.read()
+        # The frontend MediaRecorder yields opaque blobs (webm/ogg); recognition needs PCM.
+        # Decoded in memory (ffmpeg over pipes), no temp files
+        pcm = decode_audio(audio)
+    except (OSError, DecodeError) as e:
         return {
             "error": f"Audio processing failed, file might be corrupted: {e}"
         }
 
-    recognizer = sr.Recognizer()
+    # Silence, noise and clicks stop here without recognition or the text model; speech is trimmed
+    speech_ratio = None
+    if VAD_ENABLED:
+        # Imported per call (cached by Python after the first) to keep NumPy off the import path of the app
+        from voice_text_emotion.vad import detect_speech, trim
 
-    try:
-        with sr.AudioFile(wav_path) as source:
-            audio_data = recognizer.record(source)
+        activity = detect_speech(pcm, SAMPLE_RATE)
+        speech_ratio = round(activity["speech_ratio"], 3)
+        if not activity["speech"]:
+            return {
+                "error": "No speech detected",
+                "speech_ratio": speech_ratio
+            }
+        pcm = trim(pcm, activity)
 
-        # Speech to text (Google Web Speech API)
-        transcribed_text = recognizer.recognize_google(audio_data)
+    try:
+        # Speech to text with the configured backend (NEUROWELL_ASR_BACKEND, see asr.py)
+        with registry.lease("asr") as recognizer:
+            transcribed_text = recognizer.transcribe(pcm, SAMPLE_RATE)
 
         # Reuse text emotion analysis
         emotion_result = analyze_text_emotion(transcribed_text)
@@ -44,18 +60,16 @@ def analyze_speech_emotion(audio_path):
             "transcribed_text": transcribed_text,
             "emotion": emotion_result.get("emotion"),
             "sentiment": emotion_result.get("sentiment"),
-            "confidence": emotion_result.get("confidence")
+            "confidence": emotion_result.get("confidence"),
+            "speech_ratio": speech_ratio
         }
 
-    except sr.UnknownValueError:
+    except NoSpeechError:
         return {
             "error": "Could not understand the audio"
         }
 
-    except sr.RequestError as e:
+    except (ASRServiceError, ImportError) as e:
         return {
             "error": f"Speech recognition service error: {e}"
         }
-
-
-
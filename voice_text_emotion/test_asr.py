@@ -0,0 +1,110 @@
+"""
+test_asr.py
+Speech recognition backends: fake transcripts are deterministic, speech results keep their shape for any backend,
+silent uploads never reach recognition
+"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from inference.registry import registry
+from voice_text_emotion import asr, speech, text
+
+
+def _wav(samples):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _tone(seconds=1.0, amplitude=8000):
+    t = np.arange(int(16000 * seconds)) / 16000
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype("<i2")
+
+
+class _FakeClassifier:
+    """Pipeline stand-in: 'joy' for texts containing 'happy', 'sadness' otherwise"""
+
+    def __call__(self, texts, batch_size=None, truncation=False):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        return [[{"label": "joy", "score": 0.9 if "happy" in t else 0.1},
+                 {"label": "sadness", "score": 0.1 if "happy" in t else 0.9}] for t in batch]
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    registry.register("text_emotion", _FakeClassifier)
+    registry.register("asr", lambda: asr.FakeASR(transcript="I am so happy today"))
+    monkeypatch.setattr(text, "text_cache", text.ResultCache())
+    monkeypatch.setattr(text, "TEXT_BATCH_SIZE", 1)
+    yield
+    registry.register("text_emotion", text._load_classifier, warmup=lambda classifier: classifier("warming up"))
+    registry.register("asr", asr._load_asr, warmup=asr._warm_asr)
+
+
+def test_fake_backend_is_deterministic():
+    fake = asr.FakeASR(latency_ms=0)
+    pcm = _tone().tobytes()
+    assert fake.transcribe(pcm, 16000) == fake.transcribe(pcm, 16000)
+    assert fake.transcribe(pcm, 16000) in asr.FAKE_TRANSCRIPTS
+    with pytest.raises(asr.NoSpeechError):
+        fake.transcribe(bytes(3200), 16000)
+    assert isinstance(asr.make_backend("fake"), asr.FakeASR)
+    with pytest.raises(ValueError):
+        asr.make_backend("cloud")
+
+
+def test_speech_result_shape_with_a_local_backend(fake_models):
+    result = speech.analyze_speech_emotion(_wav(_tone()))
+    assert result == {"transcribed_text": "I am so happy today", "emotion": "joy", "sentiment": "positive",
+                      "confidence": 0.9, "speech_ratio": 1.0}
+
+
+def test_silent_upload_skips_recognition_and_speech_is_trimmed(fake_models):
+    calls = []
+
+    class Counting(asr.FakeASR):
+        def transcribe(self, pcm, sample_rate):
+            calls.append(len(pcm))
+            return super().transcribe(pcm, sample_rate)
+
+    registry.register("asr", Counting)
+    assert speech.analyze_speech_emotion(_wav(np.zeros(32000))) == {"error": "No speech detected", "speech_ratio": 0.0}
+    assert calls == []
+
+    samples = np.concatenate([np.zeros(32000), _tone(), np.zeros(32000)])
+    result = speech.analyze_speech_emotion(_wav(samples))
+    assert result["speech_ratio"] == pytest.approx(0.2, abs=0.03)
+    # Trimmed to about 1.3 s: recognition got less than half of the 5 s upload
+    assert calls and calls[0] < len(samples)
+
+
+def test_recognizer_failures_are_reported_as_service_errors(fake_models):
+    class Down:
+        def transcribe(self, pcm, sample_rate):
+            raise asr.ASRServiceError("quota exceeded")
+
+    registry.register("asr", Down)
+    assert speech.analyze_speech_emotion(_wav(_tone())) == {"error": "Speech recognition service error: quota exceeded"}
+
+
+def test_analyze_speech_route_reads_the_upload_from_memory(fake_models, monkeypatch, tmp_path):
+    import backend.app as backend_app
+
+    logged = []
+    monkeypatch.setattr(backend_app, "log_mood_direct", lambda *args: logged.append(args))
+    monkeypatch.chdir(tmp_path)
+    client = backend_app.app.test_client()
+
+    response = client.post("/analyze_speech", data={"audio": (io.BytesIO(_wav(_tone())), "voice.wav")},
+                           content_type="multipart/form-data")
+    assert response.get_json()["emotion"] == "joy"
+    assert logged == [("joy", 90, "voice")]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,108 @@
+"""
+test_chunking.py
+Long-text windows: full-length overlapping spans, each token weighted once, aggregation, per-window detail
+"""
+
+import re
+
+import pytest
+
+from inference.registry import registry
+from voice_text_emotion import chunking, text
+
+
+def test_window_spans_cover_every_token_with_full_windows():
+    assert chunking.window_spans(5, 8, 2) == [(0, 5)]
+    spans = chunking.window_spans(20, 8, 2)
+    assert spans == [(0, 8), (6, 14), (12, 20)]
+    assert chunking.window_spans(17, 8, 2) == [(0, 8), (6, 14), (9, 17)]
+    assert all(end - start == 8 for start, end in chunking.window_spans(1000, 8, 2))
+    assert sum(chunking.window_weights(chunking.window_spans(17, 8, 2))) == 17
+    with pytest.raises(ValueError):
+        chunking.window_spans(20, 4, 4)
+
+
+def test_aggregations():
+    rows = [{"joy": 0.8, "fear": 0.2}, {"joy": 0.2, "fear": 0.8}, {"joy": 0.2, "fear": 0.8}]
+    assert chunking.aggregate(rows, [8, 1, 1], "mean") == pytest.approx({"joy": 0.4, "fear": 0.6})
+    assert chunking.aggregate(rows, [8, 1, 1], "length") == pytest.approx({"joy": 0.68, "fear": 0.32})
+    assert chunking.aggregate(rows, [8, 1, 1], "max") == {"joy": 0.8, "fear": 0.8}
+    with pytest.raises(ValueError):
+        chunking.aggregate(rows, [1, 1, 1], "median")
+
+
+class _WordTokenizer:
+    """Fast-tokenizer stand-in: one token per word, with character offsets"""
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False, truncation=False):
+        words = list(re.finditer(r"\S+", text))
+        encoded = {"input_ids": [len(m.group()) for m in words]}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = [m.span() for m in words]
+        return encoded
+
+
+class _FakeClassifier:
+    """'joy' in proportion to the share of words that are 'good'"""
+
+    tokenizer = _WordTokenizer()
+    batches = []
+
+    def __call__(self, texts, batch_size=None, truncation=False):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        self.batches.append(batch)
+        out = []
+        for t in batch:
+            words = t.split()
+            joy = sum(w == "good" for w in words) / len(words)
+            out.append([{"label": "joy", "score": joy}, {"label": "fear", "score": 1 - joy}])
+        return out
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    _FakeClassifier.batches = []
+    registry.register("text_emotion", _FakeClassifier)
+    monkeypatch.setattr(text, "text_cache", text.ResultCache())
+    yield _FakeClassifier
+    registry.register("text_emotion", text._load_classifier,
+                      warmup=lambda classifier: classifier("warming up"))
+
+
+def test_analyze_long_text_batches_windows_and_reports_detail(fake_model):
+    entry = " ".join(["good"] * 8 + ["bad"] * 12)
+    result = text.analyze_long_text(entry, "length", detail=True, window=8, overlap=2)
+    assert result["chunks"] == 3 and result["aggregation"] == "length"
+    assert fake_model.batches == [[" ".join(["good"] * 8), "good good bad bad bad bad bad bad",
+                                   " ".join(["bad"] * 8)]]
+    assert (result["emotion"], result["sentiment"]) == ("fear", "negative")
+    details = result["chunk_details"]
+    assert [(d["start"], d["tokens"], d["new_tokens"], d["emotion"]) for d in details] == [
+        (0, 8, 8, "joy"), (30, 8, 6, "fear"), (56, 8, 6, "fear")]
+    assert entry[details[1]["start"]:details[1]["end"]] == "good good bad bad bad bad bad bad"
+
+    assert text.analyze_long_text(entry, "max", window=8, overlap=2)["emotion"] in ("joy", "fear")
+    with pytest.raises(ValueError):
+        text.analyze_long_text(entry, "median")
+
+
+def test_short_text_takes_the_single_pass(fake_model):
+    result = text.analyze_long_text("good day", window=8, overlap=2)
+    assert result == {**text.analyze_text_emotion("good day"), "chunks": 1, "aggregation": "length"}
+
+
+def test_analyze_text_route_chunks_long_entries(fake_model, monkeypatch):
+    import backend.app as app_module
+    monkeypatch.setattr(app_module, "log_mood_direct", lambda *args: True)
+    monkeypatch.setattr(text, "TEXT_WINDOW", 8)
+    monkeypatch.setattr(text, "TEXT_OVERLAP", 2)
+    client = app_module.app.test_client()
+
+    long_entry = " ".join(["bad"] * 400)
+    assert len(long_entry) > app_module.LONG_TEXT_CHARS
+    assert client.post("/analyze_text", json={"text": long_entry}).get_json()["chunks"] > 1
+    assert "chunks" not in client.post("/analyze_text", json={"text": "good"}).get_json()
+    detailed = client.post("/analyze_text", json={"text": "good " * 20, "detail": True}).get_json()
+    assert len(detailed["chunk_details"]) == detailed["chunks"] > 1
+    assert client.post("/analyze_text", json={"text": "good", "chunked": True,
+                                              "aggregation": "median"}).status_code == 400
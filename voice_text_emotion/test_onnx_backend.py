@@ -0,0 +1,161 @@
+"""
+test_onnx_backend.py
+ONNX text backend without onnxruntime: softmax is stable, the classifier keeps the pipeline's output shape,
+drift reports count disagreements and score differences, exports only count once finished
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from voice_text_emotion import onnx_backend
+from voice_text_emotion.onnx_backend import OnnxTextClassifier, _softmax, drift_report
+
+LABELS = ["anger", "joy", "sadness"]
+
+
+def test_softmax_rows_sum_to_one_and_large_logits_stay_finite():
+    logits = np.array([[1.0, 2.0, 3.0], [1000.0, 1001.0, 999.0], [-1e4, 0.0, 1e4]])
+    probs = _softmax(logits)
+    assert np.all(np.isfinite(probs))
+    assert np.allclose(probs.sum(axis=-1), 1.0)
+    assert np.allclose(probs[1], _softmax(np.array([1.0, 2.0, 0.0])))
+    assert probs[2].tolist() == [0.0, 0.0, 1.0]
+
+
+class _Input:
+    def __init__(self, name):
+        self.name = name
+
+
+class _Session:
+    """InferenceSession stand-in: logits favour label (first token id % 3) of each row"""
+
+    def __init__(self):
+        self.feeds = []
+
+    def get_inputs(self):
+        return [_Input("input_ids"), _Input("attention_mask")]
+
+    def run(self, outputs, feeds):
+        self.feeds.append(feeds)
+        logits = np.zeros((len(feeds["input_ids"]), len(LABELS)), dtype=np.float32)
+        logits[np.arange(len(logits)), feeds["input_ids"][:, 0] % len(LABELS)] = 5.0
+        return [logits]
+
+
+class _Tokenizer:
+    """Token id = word length; pads to the longest text of the call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, padding=True, truncation=False, return_tensors="np"):
+        self.calls.append(list(texts))
+        ids = [[len(word) for word in text.split()] or [0] for text in texts]
+        width = max(len(row) for row in ids)
+        return {"input_ids": np.array([row + [0] * (width - len(row)) for row in ids], dtype=np.int32),
+                "attention_mask": np.array([[1] * len(row) + [0] * (width - len(row)) for row in ids],
+                                           dtype=np.int32)}
+
+
+def _classifier():
+    classifier = OnnxTextClassifier.__new__(OnnxTextClassifier)
+    classifier.session = _Session()
+    classifier.input_names = ["input_ids", "attention_mask"]
+    classifier.tokenizer = _Tokenizer()
+    classifier.labels = LABELS
+    return classifier
+
+
+def test_classifier_output_matches_the_pipeline_shape():
+    classifier = _classifier()
+    out = classifier(["ok", "hello", "a b"], batch_size=2)
+    assert len(out) == 3
+    assert all([entry["label"] for entry in row] == LABELS for row in out)
+    assert all(abs(sum(entry["score"] for entry in row) - 1) < 1e-9 for row in out)
+    assert [max(row, key=lambda entry: entry["score"])["label"] for row in out] == ["sadness", "sadness", "joy"]
+    assert classifier.tokenizer.calls == [["ok", "hello"], ["a b"]]
+    assert all(feeds["input_ids"].dtype == np.int64 for feeds in classifier.session.feeds)
+
+    single = classifier("hey")
+    assert len(single) == 1 and [entry["label"] for entry in single[0]] == LABELS
+
+
+def _stub(scores_by_text):
+    def classify(text):
+        return [[{"label": label, "score": score} for label, score in scores_by_text[text].items()]]
+    return classify
+
+
+def test_drift_report_counts_disagreements_and_score_diffs():
+    corpus = ["calm day", "bad news"]
+    reference = _stub({"calm day": {"joy": 0.8, "sadness": 0.2}, "bad news": {"joy": 0.3, "sadness": 0.7}})
+    candidate = _stub({"calm day": {"joy": 0.75, "sadness": 0.25}, "bad news": {"joy": 0.55, "sadness": 0.45}})
+
+    report = drift_report(reference, candidate, corpus, runs=1)
+    assert report["texts"] == 2
+    assert report["label_agreement"] == 0.5
+    assert report["max_abs_score_diff"] == pytest.approx(0.25)
+    assert report["mean_abs_score_diff"] == pytest.approx((0.05 + 0.05 + 0.25 + 0.25) / 4)
+    assert report["disagreements"] == [{"text": "bad news", "reference": "sadness", "candidate": "joy",
+                                        "reference_score": 0.7, "candidate_score": 0.55}]
+    assert set(report["latency_ms"]) == {"reference", "candidate"}
+
+    same = drift_report(reference, reference, corpus, runs=1)
+    assert same["label_agreement"] == 1.0 and same["max_abs_score_diff"] == 0.0 and same["disagreements"] == []
+
+
+def test_drift_corpus_is_the_default():
+    seen = []
+    classify = _stub({text: {"joy": 1.0} for text in onnx_backend.DRIFT_CORPUS})
+    report = drift_report(lambda text: seen.append(text) or classify(text), classify, runs=1)
+    assert report["texts"] == len(onnx_backend.DRIFT_CORPUS) and seen == onnx_backend.DRIFT_CORPUS
+
+
+def _fake_export(calls, fail=False):
+    def write(model_dir, model_name, revision, opset):
+        calls.append(model_dir)
+        with open(os.path.join(model_dir, onnx_backend.QUANTIZED_FILE), "w") as f:
+            f.write("weights")
+        time.sleep(0.1)
+        if fail:
+            raise KeyboardInterrupt
+        with open(os.path.join(model_dir, onnx_backend.EXPORT_MANIFEST), "w") as f:
+            f.write("{}")
+    return write
+
+
+def test_interrupted_export_never_looks_finished(tmp_path, monkeypatch):
+    model_dir = str(tmp_path / "models" / "emotion-int8")
+    calls = []
+    monkeypatch.setattr(onnx_backend, "_write_export", _fake_export(calls, fail=True))
+    with pytest.raises(KeyboardInterrupt):
+        onnx_backend.export_quantized(model_dir, "emotion")
+    assert not os.path.exists(model_dir) and not onnx_backend.is_exported(model_dir)
+    assert sorted(os.listdir(tmp_path / "models")) == ["emotion-int8.lock"]
+
+    # A directory left by the old in-place export (weights, no export.json) is exported again
+    os.makedirs(model_dir)
+    open(os.path.join(model_dir, onnx_backend.QUANTIZED_FILE), "w").close()
+    monkeypatch.setattr(onnx_backend, "_write_export", _fake_export(calls))
+    monkeypatch.setattr(onnx_backend, "OnnxTextClassifier", lambda model_dir, threads: model_dir)
+    assert onnx_backend.load_classifier("emotion", "main", model_dir=model_dir) == model_dir
+    assert onnx_backend.is_exported(model_dir) and len(calls) == 2
+
+
+def test_concurrent_loaders_export_once(tmp_path, monkeypatch):
+    model_dir = str(tmp_path / "emotion-int8")
+    calls = []
+    monkeypatch.setattr(onnx_backend, "_write_export", _fake_export(calls))
+    monkeypatch.setattr(onnx_backend, "OnnxTextClassifier", lambda model_dir, threads: model_dir)
+    threads = [threading.Thread(target=onnx_backend.load_classifier, args=("emotion", "main", 0, model_dir))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(calls) == 1 and onnx_backend.is_exported(model_dir)
@@ -0,0 +1,81 @@
+"""
+test_score.py
+Batch text scoring: /analyze_text_batch order and validation, offline CLI output and checkpoint resume
+"""
+
+import json
+
+import pytest
+
+from inference.registry import registry
+from voice_text_emotion import score, text
+
+
+class _FakeClassifier:
+    """Pipeline stand-in: 'joy' for texts containing 'good', 'fear' otherwise"""
+
+    calls = []
+
+    def __call__(self, texts, batch_size=None, truncation=False):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        self.calls.append(batch)
+        return [[{"label": "joy", "score": 0.9 if "good" in t else 0.2},
+                 {"label": "fear", "score": 0.1 if "good" in t else 0.8}] for t in batch]
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    _FakeClassifier.calls = []
+    registry.register("text_emotion", _FakeClassifier)
+    monkeypatch.setattr(text, "text_cache", text.ResultCache())
+    yield _FakeClassifier
+    registry.register("text_emotion", text._load_classifier,
+                      warmup=lambda classifier: classifier("warming up"))
+
+
+def test_analyze_text_batch_keeps_order(fake_model):
+    from backend.app import app
+    client = app.test_client()
+
+    texts = ["a good day", "scared", "", "a good day", "scared of exams"]
+    results = client.post("/analyze_text_batch", json={"texts": texts}).get_json()["results"]
+    assert [r.get("emotion") for r in results] == ["joy", "fear", None, "joy", "fear"]
+    assert [r.get("input_text") for r in results] == ["a good day", "scared", None, "a good day", "scared of exams"]
+    assert results[2] == {"error": "Empty text input"}
+    assert sorted(t for batch in fake_model.calls for t in batch) == ["a good day", "scared", "scared of exams"]
+
+    assert client.post("/analyze_text_batch", json={"texts": "nope"}).status_code == 400
+    assert client.post("/analyze_text_batch", json={"texts": ["x"] * 513}).status_code == 400
+
+
+def test_score_file_writes_in_order_and_resumes(fake_model, tmp_path):
+    source = tmp_path / "journal.jsonl"
+    source.write_text("".join(json.dumps({"entry": i, "text": "good" if i % 3 else "bad"}) + "\n" for i in range(10))
+                      + '{"entry": 10}\n')
+    out = tmp_path / "scores.jsonl"
+
+    result = score.score_file(str(source), str(out), id_field="entry", workers=0, chunk_size=4)
+    assert result["scored"] == 11
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["row"] for r in records] == list(range(11))
+    assert [r["id"] for r in records] == list(range(11))
+    assert records[1]["emotion"] == "joy" and records[3]["emotion"] == "fear"
+    assert records[10] == {"row": 10, "id": 10, "error": "No text field"}
+    expected = out.read_text()
+
+    # Crash after the second chunk: the checkpoint says 8 rows, a torn write followed it
+    lines = expected.splitlines(keepends=True)
+    out.write_text("".join(lines[:8]) + lines[8][:5])
+    score._write_checkpoint(str(out) + ".checkpoint", 8, len("".join(lines[:8]).encode()))
+    resumed = score.score_file(str(source), str(out), id_field="entry", workers=0, chunk_size=4, resume=True)
+    assert (resumed["skipped"], resumed["scored"]) == (8, 3)
+    assert out.read_text() == expected
+
+
+def test_csv_input(fake_model, tmp_path):
+    source = tmp_path / "entries.csv"
+    source.write_text('entry_id,body\n7,"good, honestly"\n8,awful\n')
+    out = tmp_path / "scores.jsonl"
+    score.score_file(str(source), str(out), text_field="body", id_field="entry_id", workers=0)
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [(r["id"], r["emotion"]) for r in records] == [("7", "joy"), ("8", "fear")]
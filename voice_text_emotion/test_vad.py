@@ -0,0 +1,53 @@
+"""
+test_vad.py
+Voice activity gate: silence, noise and clicks are not speech; speech is found, trimmed and skips nothing
+"""
+
+import numpy as np
+import pytest
+
+from voice_text_emotion import vad
+
+RATE = 16000
+
+
+def _tone(seconds, amplitude=8000.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return amplitude * np.sin(2 * np.pi * 220 * t)
+
+
+def _noise(seconds, amplitude=30.0, seed=0):
+    return np.random.default_rng(seed).normal(0, amplitude, int(RATE * seconds))
+
+
+def _pcm(samples):
+    return np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes()
+
+
+def test_silence_noise_and_clicks_are_not_speech():
+    assert vad.detect_speech(_pcm(np.zeros(RATE)))["speech"] is False
+    assert vad.detect_speech(_pcm(_noise(2)))["speech"] is False
+    click = np.zeros(RATE)
+    click[8000:8320] = 20000  # 20 ms
+    result = vad.detect_speech(_pcm(click + _noise(1)))
+    assert result["speech"] is False and result["speech_ratio"] == 0.0
+    assert vad.detect_speech(b"")["speech"] is False
+
+
+def test_speech_is_found_and_trimmed_with_hangover():
+    samples = np.concatenate([np.zeros(RATE), _tone(1.0), np.zeros(RATE)]) + _noise(3)
+    result = vad.detect_speech(_pcm(samples))
+    assert result["speech"] is True
+    assert result["speech_ratio"] == pytest.approx(1 / 3, abs=0.03)
+    hangover = RATE * vad.HANGOVER_MS // 1000
+    assert abs(result["start"] - (RATE - hangover)) <= RATE * vad.FRAME_MS // 1000
+    assert abs(result["end"] - (2 * RATE + hangover)) <= RATE * vad.FRAME_MS // 1000
+    assert len(vad.trim(_pcm(samples), result)) == 2 * (result["end"] - result["start"])
+
+
+def test_speech_without_pauses_and_speech_in_noise():
+    assert vad.detect_speech(_pcm(_tone(2.0)))["speech_ratio"] == 1.0
+    noisy = np.concatenate([_noise(1, 300), _tone(0.5) + _noise(0.5, 300, seed=1), _noise(1, 300, seed=2)])
+    result = vad.detect_speech(_pcm(noisy))
+    assert result["speech"] is True and result["speech_ratio"] == pytest.approx(0.2, abs=0.03)
+
@@ -1,11 +1,121 @@
-from transformers import pipeline
+import os
 
-# Load emotion analysis model (Hugging Face)
-emotion_classifier = pipeline(
-    "text-classification",
-    model="j-hartmann/emotion-english-distilroberta-base",
-    return_all_scores=True
-)
+from inference import pool
+from inference.batching import MicroBatcher
+from inference.registry import registry
+from inference.result_cache import MISSING, ResultCache
+from voice_text_emotion import chunking
+
+MODEL_NAME = "j-hartmann/emotion-english-distilroberta-base"
+# Pin a commit hash in production: cached results are only reused for the same name@revision
+MODEL_REVISION = os.environ.get("NEUROWELL_TEXT_MODEL_REVISION", "main")
+
+# "torch" (transformers pipeline) or "onnx" (int8-quantized export on ONNX Runtime, see onnx_backend.py)
+TEXT_BACKEND = os.environ.get("NEUROWELL_TEXT_BACKEND", "torch")
+TEXT_THREADS = int(os.environ.get("NEUROWELL_TEXT_THREADS", "0"))
+if TEXT_BACKEND not in ("torch", "onnx"):
+    raise ValueError(f"NEUROWELL_TEXT_BACKEND must be 'torch' or 'onnx', got {TEXT_BACKEND!r}")
+# Quantized scores differ slightly, so each backend has its own cache entries
+MODEL_ID = f"{MODEL_NAME}@{MODEL_REVISION}" + ("+onnx-int8" if TEXT_BACKEND == "onnx" else "")
+
+# Concurrent requests share one padded forward pass; NEUROWELL_TEXT_BATCH=1 turns batching off
+TEXT_BATCH_SIZE = int(os.environ.get("NEUROWELL_TEXT_BATCH", "16"))
+TEXT_BATCH_WAIT_MS = float(os.environ.get("NEUROWELL_TEXT_BATCH_WAIT_MS", "5"))
+
+# Repeated phrases skip the model; NEUROWELL_TEXT_CACHE_DB keeps results across restarts, size 0 disables
+TEXT_CACHE_SIZE = int(os.environ.get("NEUROWELL_TEXT_CACHE_SIZE", "10000"))
+text_cache = ResultCache(max_entries=TEXT_CACHE_SIZE, db_path=os.environ.get("NEUROWELL_TEXT_CACHE_DB"))
+
+# Long texts are scored as overlapping windows of this many tokens (the model's limit is 512)
+TEXT_WINDOW = int(os.environ.get("NEUROWELL_TEXT_WINDOW", "256"))
+TEXT_OVERLAP = int(os.environ.get("NEUROWELL_TEXT_OVERLAP", "32"))
+# /analyze_text switches to windows past this many characters unless the request says otherwise
+LONG_TEXT_CHARS = 1500
+
+
+def load_torch_classifier():
+    """Emotion analysis model (Hugging Face); transformers is imported here, not at module import"""
+    from transformers import pipeline
+    return pipeline(
+        "text-classification",
+        model=MODEL_NAME,
+        revision=MODEL_REVISION,
+        return_all_scores=True
+    )
+
+
+def _load_classifier():
+    if TEXT_BACKEND == "onnx":
+        from voice_text_emotion.onnx_backend import load_classifier
+        return load_classifier(MODEL_NAME, MODEL_REVISION, intra_op_threads=TEXT_THREADS)
+    if TEXT_THREADS:
+        import torch
+        torch.set_num_threads(TEXT_THREADS)
+    return load_torch_classifier()
+
+
+# Loaded by the first request or by the backend's startup warmup
+registry.register("text_emotion", _load_classifier, warmup=lambda classifier: classifier("warming up"))
+
+
+def get_emotion_classifier():
+    """The shared text-classification pipeline, loaded through the model registry"""
+    return registry.get("text_emotion")
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(MODEL_NAME, revision=MODEL_REVISION)
+
+
+# With an inference pool the model lives in the workers; this process only needs the tokenizer
+registry.register("text_tokenizer", _load_tokenizer)
+
+
+def get_tokenizer():
+    """Tokenizer for bucketing and windowing, without loading the model when workers run it"""
+    if pool.service is not None and pool.service.serves("text_emotion"):
+        return registry.get("text_tokenizer")
+    return get_emotion_classifier().tokenizer
+
+
+def _token_bucket(text):
+    """Padded length class of a text: its token count rounded up to a power of two (min 8)"""
+    tokens = len(get_tokenizer()(text, truncation=True)["input_ids"])
+    return max(8, 1 << (tokens - 1).bit_length())
+
+
+def run_classifier(texts):
+    """One forward pass over texts of similar length; texts past the model's limit are truncated"""
+    with registry.lease("text_emotion") as classifier:
+        return classifier(texts, batch_size=len(texts), truncation=True)
+
+
+def _classify_batch(texts):
+    """run_classifier here, or in an inference worker process when the backend started a pool"""
+    if pool.service is not None and pool.service.serves("text_emotion"):
+        return pool.service.run("text_emotion", list(texts))
+    return run_classifier(texts)
+
+
+def _dispatch_batch(texts):
+    """Like _classify_batch, but returns the pool's Future so the batcher can keep every worker busy"""
+    if pool.service is not None and pool.service.serves("text_emotion"):
+        return pool.service.submit("text_emotion", list(texts))
+    return run_classifier(texts)
+
+
+text_batcher = MicroBatcher(_dispatch_batch, max_batch=TEXT_BATCH_SIZE, max_wait_ms=TEXT_BATCH_WAIT_MS,
+                            bucket=_token_bucket, name="text-emotion-batcher")
+
+
+def classify_text(text):
+    """Label scores for one text, computed in a micro-batch with concurrent callers"""
+    if TEXT_BATCH_SIZE <= 1:
+        return _classify_batch([text])[0]
+    # Batches in worker processes get the pool's timeout; a model loading here may take as long as it takes
+    timeout = pool.REQUEST_TIMEOUT if pool.service is not None and pool.service.serves("text_emotion") else None
+    return text_batcher.submit(text, timeout=timeout)
 
 def analyze_text_emotion(text):
     """
@@ -18,8 +128,90 @@ def analyze_text_emotion(text):
             "error": "Empty text input"
         }
 
-    out = emotion_classifier(text)[0]
+    result = text_cache.get(MODEL_ID, text) if TEXT_CACHE_SIZE > 0 else MISSING
+    if result is MISSING:
+        result = _label_scores_to_result(classify_text(text))
+        if TEXT_CACHE_SIZE > 0:
+            text_cache.set(MODEL_ID, text, result)
+
+    return {
+        "input_text": text,
+        **result
+    }
+
+
+def analyze_texts(texts):
+    """analyze_text_emotion for a list of texts, results in input order.
+
+    Cached texts skip the model; the rest are deduplicated and run in batches
+    of NEUROWELL_TEXT_BATCH sorted by length, so each batch pads little.
+    """
+    results = [None] * len(texts)
+    pending = {}
+    for i, text in enumerate(texts):
+        if not text or text.strip() == "":
+            results[i] = {"error": "Empty text input"}
+            continue
+        cached = text_cache.get(MODEL_ID, text) if TEXT_CACHE_SIZE > 0 else MISSING
+        if cached is MISSING:
+            pending.setdefault(text, []).append(i)
+        else:
+            results[i] = {"input_text": text, **cached}
+
+    unique = sorted(pending, key=len)
+    batch_size = max(TEXT_BATCH_SIZE, 1)
+    for start in range(0, len(unique), batch_size):
+        chunk = unique[start:start + batch_size]
+        for text, out in zip(chunk, _classify_batch(chunk)):
+            result = _label_scores_to_result(out)
+            if TEXT_CACHE_SIZE > 0:
+                text_cache.set(MODEL_ID, text, result)
+            for i in pending[text]:
+                results[i] = {"input_text": text, **result}
+    return results
+
 
+def analyze_long_text(text, aggregation="length", detail=False, window=None, overlap=None):
+    """analyze_text_emotion for texts of any length: tokenized once, cut into overlapping
+    windows that run through the classifier in batches, window scores aggregated
+    (see chunking.py). detail=True adds each window's span and scores.
+    """
+    if not text or text.strip() == "":
+        return {
+            "error": "Empty text input"
+        }
+    if aggregation not in chunking.AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {', '.join(chunking.AGGREGATIONS)}")
+    window, overlap = window or TEXT_WINDOW, TEXT_OVERLAP if overlap is None else overlap
+
+    spans, segments = chunking.split_text(get_tokenizer(), text, window, overlap)
+    if len(segments) == 1 and not detail:
+        return {**analyze_text_emotion(text), "chunks": 1, "aggregation": aggregation}
+
+    outputs = []
+    batch_size = max(TEXT_BATCH_SIZE, 1)
+    for start in range(0, len(segments), batch_size):
+        outputs += _classify_batch(segments[start:start + batch_size])
+    rows = [{entry["label"]: entry["score"] for entry in out} for out in outputs]
+    combined = chunking.aggregate(rows, [span["new_tokens"] for span in spans], aggregation)
+
+    result = {
+        "input_text": text,
+        **_label_scores_to_result([{"label": label, "score": score} for label, score in combined.items()]),
+        "chunks": len(segments),
+        "aggregation": aggregation
+    }
+    if detail:
+        result["chunk_details"] = [{
+            **span,
+            **{k: v for k, v in _label_scores_to_result(out).items() if k != "sentiment"},
+            "scores": {label: round(score, 4) for label, score in row.items()}
+        } for span, out, row in zip(spans, outputs, rows)]
+    return result
+
+
+def _label_scores_to_result(out):
+    """emotion, sentiment and confidence from the classifier's label scores"""
     # Handle pipeline output variations (list of dicts vs single dict)
     if isinstance(out, dict):
         top_emotion = out
@@ -38,7 +230,6 @@ def analyze_text_emotion(text):
         sentiment = "neutral"
 
     return {
-        "input_text": text,
         "emotion": emotion,
         "sentiment": sentiment,
         "confidence": confidence
@@ -0,0 +1,75 @@
+"""
+vad.py
+Purpose: Energy-based voice activity detection on decoded PCM, vectorized with NumPy
+Integrated with: voice_text_emotion/speech.py (runs before speech recognition)
+
+The audio is cut into 30 ms frames and each frame's energy is measured in dB
+relative to full scale. A frame is voiced when it is louder than both an
+absolute floor and the recording's own noise floor (a low percentile of its
+frame energies) plus a margin, so a quiet room and a noisy one both work;
+frames above SPEECH_DB always count. Voiced runs shorter than MIN_SPEECH_MS
+(clicks, taps) are dropped, and the remaining speech is padded by HANGOVER_MS
+on both sides before trimming so word onsets and trailing consonants survive.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+FRAME_MS = 30
+ABS_FLOOR_DB = -50.0       # quieter than this is never speech
+NOISE_MARGIN_DB = 12.0     # speech stands this far above the recording's noise floor
+NOISE_PERCENTILE = 10
+SPEECH_DB = -35.0          # louder than this always counts (recordings with no pauses have no noise floor)
+MIN_SPEECH_MS = 120
+HANGOVER_MS = 150
+
+
+def frame_energy_db(samples: np.ndarray, frame: int) -> np.ndarray:
+    """Energy in dBFS of each full frame of int16 samples"""
+    n_frames = len(samples) // frame
+    frames = samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame) / 32768.0
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def _runs(mask: np.ndarray):
+    """(starts, ends) of the True runs of a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech(pcm: bytes, sample_rate: int = 16000) -> Dict[str, Any]:
+    """Where the speech is in s16le mono PCM.
+
+    Returns speech (bool), start/end (sample offsets of the trimmed span),
+    speech_ratio (voiced frames / all frames) and total_seconds.
+    """
+    samples = np.frombuffer(pcm, dtype="<i2")
+    frame = sample_rate * FRAME_MS // 1000
+    total_seconds = len(samples) / sample_rate
+    energy = frame_energy_db(samples, frame)
+    if not len(energy):
+        return {"speech": False, "start": 0, "end": 0, "speech_ratio": 0.0, "total_seconds": total_seconds}
+
+    noise_floor = float(np.percentile(energy, NOISE_PERCENTILE))
+    threshold = max(ABS_FLOOR_DB, min(noise_floor + NOISE_MARGIN_DB, SPEECH_DB))
+    voiced = energy > threshold
+    # Each voiced frame gets the length of its run; frames of runs shorter than MIN_SPEECH_MS are dropped
+    starts, ends = _runs(voiced)
+    voiced[voiced] = np.repeat(ends - starts, ends - starts) * FRAME_MS >= MIN_SPEECH_MS
+
+    speech_ratio = float(voiced.mean())
+    if not voiced.any():
+        return {"speech": False, "start": 0, "end": 0, "speech_ratio": 0.0, "total_seconds": total_seconds}
+
+    voiced_frames = np.flatnonzero(voiced)
+    hangover = sample_rate * HANGOVER_MS // 1000
+    start = max(0, int(voiced_frames[0]) * frame - hangover)
+    end = min(len(samples), (int(voiced_frames[-1]) + 1) * frame + hangover)
+    return {"speech": True, "start": start, "end": end, "speech_ratio": speech_ratio,
+            "total_seconds": total_seconds}
+
+
+def trim(pcm: bytes, activity: Dict[str, Any]) -> bytes:
+    """The PCM between detect_speech's start and end"""
+    return pcm[activity["start"] * 2:activity["end"] * 2]